@@ -19,40 +19,68 @@ PLAN_FILE = "tradeplan/trade_plan_draft.json"
 
 # 全局进程列表（每个元素为 AccountProcess）
 procs = []
-# 顺序启动线程与控制事件
+# 全部启动线程与控制事件
 _seq_start_thread = None
 _seq_start_stop_event = threading.Event()
-# 每个账号之间的间隔秒数（全部启动时）
-SEQ_START_INTERVAL_SECONDS = 30
+# 全部启动：最多同时处于“启动中”的账户数；单个账户等待就绪的上限（秒）
+MAX_PARALLEL_STARTS = 3
+READY_TIMEOUT_SECONDS = 180
 
 
-def _sequential_start_worker(interval_seconds: int):
+def _parallel_start_worker(max_parallel: int, ready_timeout: float, on_done=None):
     """
-    在单独线程中按顺序启动 procs：
-    - 每次启动一个账号后等待 interval_seconds（中途若收到停止事件则退出）。
-    - 如果某个进程已经在运行，则跳过并继续下一项。
+    在单独线程中并行启动 procs（替代原来每隔 30s 顺序启动）：
+    - 同时最多 max_parallel 个账户处于启动中（等待就绪标记）。
+    - 共用同一 QMT 安装目录（conflict_key 相同）的账户串行：前一个就绪/失败/退出/超时后才启动下一个。
+    - 已在运行的账户跳过。全部结束后打印各账户就绪耗时与 time-to-all-ready，并回调 on_done(summary)。
     """
     global _seq_start_thread, _seq_start_stop_event
+    t0 = time.monotonic()
+    slots = threading.Semaphore(max(1, max_parallel))
+    key_locks = {}
+    results = {}
+
+    def start_one(p):
+        key = p.conflict_key()
+        key_lock = key_locks.setdefault(key, threading.Lock()) if key else None
+        if key_lock:
+            key_lock.acquire()
+        try:
+            with slots:
+                if _seq_start_stop_event.is_set():
+                    results[p.account] = ("cancelled", 0.0)
+                    return
+                t_start = time.monotonic()
+                p.start()
+                p.update_status()
+                outcome = p.wait_ready(ready_timeout, _seq_start_stop_event)
+                results[p.account] = (outcome, time.monotonic() - t_start)
+                print(f"[parallel_start] 账户 {p.account}: {outcome}，用时 {time.monotonic() - t_start:.1f}s，"
+                      f"阶段 {({k: round(v, 1) for k, v in p.stages.items()})}")
+        except Exception as e:
+            results[p.account] = (f"error: {e}", 0.0)
+            print(f"[parallel_start] 启动账号出错: {e}")
+        finally:
+            if key_lock:
+                key_lock.release()
+
     try:
+        threads = []
         for p in procs:
-            if _seq_start_stop_event.is_set():
-                break
-            try:
-                # 如果已经在运行，略过
-                if p.proc and p.proc.poll() is None:
-                    p.update_status()
-                    continue
-                p.start()
+            if p.proc and p.proc.poll() is None:
                 p.update_status()
-            except Exception as e:
-                print(f"[sequential_start] 启动账号出错: {e}")
-            # 等待 interval，但响应停止事件（每秒检查）
-            waited = 0
-            while waited < interval_seconds:
-                if _seq_start_stop_event.is_set():
-                    break
-                time.sleep(1)
-                waited += 1
+                continue
+            t = threading.Thread(target=start_one, args=(p,), daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        total = time.monotonic() - t0
+        ready = sum(1 for outcome, _ in results.values() if outcome == "ready")
+        summary = f"全部启动完成：{ready}/{len(results)} 就绪，time-to-all-ready {total:.1f}s"
+        print(f"[parallel_start] {summary}")
+        if on_done:
+            on_done(summary)
     finally:
         # 线程完成或被中断时清理标记
         _seq_start_thread = None
@@ -95,16 +123,25 @@ def main():
     top_frame.pack(side=TOP, fill=X, pady=2)
     global procs, _seq_start_thread, _seq_start_stop_event
 
-    # 顺序启动：在后台线程每隔 SEQ_START_INTERVAL_SECONDS 启动下一个账号
+    # 全部启动：后台线程并行启动，按就绪标记而非固定间隔推进
     def all_start():
         global _seq_start_thread, _seq_start_stop_event
-        # 如果已有顺序启动线程在运行，不重复启动
+        # 如果已有启动线程在运行，不重复启动
         if _seq_start_thread and _seq_start_thread.is_alive():
-            messagebox.showinfo("提示", "正在顺序启动账户，请稍候或先点击全部停止以终止本次顺序启动。")
+            messagebox.showinfo("提示", "正在启动账户，请稍候或先点击全部停止以终止本次启动。")
             return
         # 清理任何旧的停止事件，启动新线程
         _seq_start_stop_event.clear()
-        _seq_start_thread = threading.Thread(target=_sequential_start_worker, args=(SEQ_START_INTERVAL_SECONDS,), daemon=True)
+        start_summary_label.config(text="启动中...")
+
+        def on_done(summary):
+            try:
+                root.after(0, lambda: start_summary_label.config(text=summary))
+            except Exception:
+                pass
+
+        _seq_start_thread = threading.Thread(target=_parallel_start_worker,
+                                             args=(MAX_PARALLEL_STARTS, READY_TIMEOUT_SECONDS, on_done), daemon=True)
         _seq_start_thread.start()
 
     # 全部停止：需要同时中断顺序启动线程（如果有），并调用每个进程的 stop（逻辑与单独 stop 一致）
@@ -131,6 +168,8 @@ def main():
     tb.Button(top_frame, text="全部停止", width=13, command=all_stop, bootstyle="danger-outline").pack(side=LEFT, padx=6, pady=6)
     tb.Button(top_frame, text="全部刷新日志", width=15, command=all_refresh, bootstyle="info-outline").pack(side=LEFT, padx=6, pady=6)
     tb.Button(top_frame, text="退出", width=10, command=lambda: [all_stop(), root.destroy()], bootstyle="secondary-outline").pack(side=RIGHT, padx=6, pady=6)
+    start_summary_label = tb.Label(top_frame, text="", foreground="#2779aa")
+    start_summary_label.pack(side=LEFT, padx=12)
 
     accounts_frame = tb.Frame(exec_frame)
     accounts_frame.pack(fill=BOTH, expand=True)
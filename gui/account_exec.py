@@ -47,9 +47,16 @@ try:
 except Exception:
     reconcile_for_account_local = None
 
+from utils import readiness, account_registry, process_registry
+from gui.log_view import LogModel, LogView
+from gui.output_pump import OutputPump
+from gui.reconcile_service import get_reconcile_service
+
 MAIN_SCRIPT = "main.py"  # 注意：可根据实际后端文件调整路径
 ENV_TAG_KEY = "MINIQMT_MANAGED_ACCOUNT"  # 旧的环境标记（account）
 ENV_UI_ID = "MINIQMT_UI_ID"  # 新增：GUI 给子进程的唯一 id
+LOG_BUFFER_LINES = 1000  # 内存中保留的日志行数
+LOG_VIEW_LINES = 500     # 日志窗口显示的行数
 
 class AccountProcess:
     """
@@ -61,12 +68,51 @@ class AccountProcess:
         self.config = config
         self.proc = None
         self._started_with_group = False
-        self.log_buffer = []
-        self.log_thread = None
+        self.log_model = LogModel(LOG_BUFFER_LINES)
+        self.log_thread = None  # OutputPump：子进程输出的读 / 写线程
         self.running = False
         self.widgets = widgets  # dict: {status, log_text}
+        # 日志窗口按帧（100ms）批量追加，读线程只写 log_model，不再逐行 after(0, ...) 全量重绘
+        self.log_view = None
+        if widgets.get("log_text") is not None:
+            self.log_view = LogView(widgets["log_text"], self.log_model, max_lines=LOG_VIEW_LINES)
+            self.log_view.start()
         self._stop_lock = threading.Lock()
         self.ui_id = None  # 每次 start() 时生成并传递
+        # 就绪探针（子进程 stdout 中的 @@READY 标记，见 utils/readiness.py）
+        self.stages = {}
+        self.ready_event = threading.Event()
+        self.failed = False
+        self.started_at = None
+
+    def conflict_key(self):
+        """共用同一 QMT 安装目录的账户不能并行启动"""
+        return readiness.conflict_key(self.config if self.config.get("path_qmt") else _account_config_for(self.account))
+
+    def _on_ready_marker(self, payload):
+        stage = payload.get("stage")
+        self.stages[stage] = time.monotonic() - (self.started_at or time.monotonic())
+        if stage == readiness.STAGE_FAILED:
+            self.failed = True
+            self.ready_event.set()
+        elif stage == readiness.READY_STAGE:
+            self.ready_event.set()
+        try:
+            self.widgets["status"].after(0, self.update_status)
+        except Exception:
+            pass
+
+    def wait_ready(self, timeout, stop_event=None):
+        """等到就绪 / 失败 / 进程退出 / 超时，返回 'ready' | 'failed' | 'exited' | 'timeout' | 'cancelled'"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.ready_event.wait(0.2):
+                return "failed" if self.failed else "ready"
+            if stop_event is not None and stop_event.is_set():
+                return "cancelled"
+            if not self.proc or self.proc.poll() is not None:
+                return "exited"
+        return "timeout"
 
     def start(self):
         print(f"[AccountProcess] 启动账户参数: {self.account}")
@@ -77,6 +123,10 @@ class AccountProcess:
         log_dir = os.path.dirname(log_path)
         os.makedirs(log_dir, exist_ok=True)
         open(log_path, "w").close()
+        self.stages = {}
+        self.ready_event.clear()
+        self.failed = False
+        self.started_at = time.monotonic()
 
         # 生成唯一 ui_id（account + 时间 + uuid）
         uid = uuid.uuid4().hex[:8]
@@ -101,13 +151,11 @@ class AccountProcess:
         cmd = ["python", MAIN_SCRIPT, "-a", self.account, "--ui-id", self.ui_id]
 
         try:
+            # 二进制管道：输出由 OutputPump 大块读取并增量解码（utf-8），不再逐行 readline
             self.proc = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1,
-                encoding="utf-8",
                 creationflags=creationflags,
                 start_new_session=start_new_session,
                 env=env
@@ -118,16 +166,18 @@ class AccountProcess:
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1,
-                encoding="utf-8",
                 env=env
             )
             self._started_with_group = False
 
         self.running = True
-        self.log_thread = threading.Thread(target=self._read_log, daemon=True)
-        self.log_thread.start()
+        self.log_thread = OutputPump(
+            self.proc.stdout,
+            log_path=log_path,
+            on_lines=self.log_model.extend,
+            line_filter=self._consume_marker,
+            on_close=self.update_status,
+        ).start()
         self.update_status()
         print(f"[AccountProcess] 已启动 pid={self.proc.pid}, ui_id={self.ui_id}")
 
@@ -166,8 +216,19 @@ class AccountProcess:
             if self.proc and self.proc.poll() is None:
                 candidates.add(self.proc.pid)
 
-            # 1) 尝试按 ui_id 在系统进程中匹配（cmdline 或环境变量）
+            # 1) 先按 main.py 写入的 runtime/pids/{ui_id}.pid 定位（O(1)，校验 create_time）；
+            #    pid 文件缺失/失效（旧版本启动、异常退出）时才扫描系统进程（cmdline 或环境变量）
+            registry_hit = None
             if target_ui:
+                try:
+                    registry_hit = process_registry.lookup_ui_process(target_ui)
+                except Exception as e:
+                    print(f"[AccountProcess._do_stop] pid 文件查找失败，回退到进程扫描: {e}")
+                    registry_hit = None
+                if registry_hit is not None:
+                    candidates.add(registry_hit.pid)
+                    print(f"[AccountProcess._do_stop] pid 文件匹配 ui_id -> pid={registry_hit.pid}")
+            if target_ui and registry_hit is None:
                 for p in psutil.process_iter(['pid', 'cmdline', 'name']):
                     try:
                         info = p.info
@@ -261,8 +322,9 @@ class AccountProcess:
                 except Exception as e:
                     print(f"[AccountProcess._do_stop] 清理候选 pid 异常: {e}")
 
-            # 4) 全局兜底：再做一次基于 ui_id 的全系统扫描并强杀（防止 reparent）
-            if target_ui:
+            # 4) 全局兜底：pid 文件未命中时再做一次基于 ui_id 的全系统扫描并强杀（防止 reparent）；
+            #    命中时 pid 文件记录的就是 main.py 本身，其子进程已在 3) 中递归清理
+            if target_ui and registry_hit is None:
                 to_kill = []
                 for p in psutil.process_iter(['pid', 'cmdline']):
                     try:
@@ -307,41 +369,22 @@ class AccountProcess:
         if not self.proc:
             return "未启动"
         if self.proc.poll() is None:
-            return "运行中"
+            if self.failed:
+                return "启动失败"
+            return "运行中" if self.ready_event.is_set() else "启动中"
         return f"已退出({self.proc.returncode})"
 
-    def _read_log(self):
-        log_path = self.config["log_file"]
-        try:
-            with open(log_path, "a", encoding="utf-8") as f:
-                while True:
-                    if not self.proc:
-                        break
-                    stdout = getattr(self.proc, "stdout", None)
-                    if not stdout:
-                        break
-                    line = stdout.readline()
-                    if not line:
-                        if self.proc.poll() is not None:
-                            break
-                        time.sleep(0.1)
-                        continue
-                    f.write(line)
-                    f.flush()
-                    self.log_buffer.append(line)
-                    if len(self.log_buffer) > 1000:
-                        self.log_buffer = self.log_buffer[-1000:]
-                    try:
-                        self.widgets["log_text"].after(0, self.update_log)
-                    except Exception:
-                        pass
-        except Exception as e:
-            print(f"[AccountProcess._read_log] 异常: {e}")
-        finally:
-            self.update_status()
+    def _consume_marker(self, line):
+        """OutputPump 读线程逐行调用：就绪标记在此处理，不写入日志文件 / 窗口"""
+        marker = readiness.parse_marker(line)
+        if marker is None:
+            return False
+        self._on_ready_marker(marker)
+        return True
 
     def get_log(self, tail=100):
-        return "".join(self.log_buffer[-tail:]) if self.log_buffer else self._read_logfile()
+        lines = self.log_model.tail(tail)
+        return "".join(lines) if lines else self._read_logfile(tail)
 
     def _read_logfile(self, tail=100):
         path = self.config["log_file"]
@@ -352,13 +395,11 @@ class AccountProcess:
         return "".join(lines[-tail:])
 
     def update_log(self):
-        log = self.get_log(500)
-        try:
-            self.widgets["log_text"].delete(1.0, "end")
-            self.widgets["log_text"].insert("end", log)
-            self.widgets["log_text"].see("end")
-        except Exception:
-            pass
+        """整体重绘日志窗口（刷新按钮）；平时的增量追加由 log_view 按帧完成"""
+        if self.log_view is None:
+            return
+        fallback = None if len(self.log_model) else self._read_logfile(LOG_VIEW_LINES)
+        self.log_view.refresh(fallback)
 
     def update_status(self):
         try:
@@ -366,6 +407,10 @@ class AccountProcess:
         except Exception:
             pass
 
+def _account_config_for(account_id):
+    """account_id -> 账户配置 dict（utils.account_registry 索引，文件修改后自动重读）"""
+    return account_registry.get_config(account_id) or {}
+
 def _make_serializable(obj):
     # 递归把 Decimal -> float，其他不可序列化对象尽量转成 str
     if isinstance(obj, Decimal):
@@ -387,61 +432,90 @@ def _make_serializable(obj):
         pass
     return obj
 
-def _show_reconcile_dialog(parent, result, account_id):
+def _show_reconcile_dialog(parent, result, account_id, service=None):
+    """
+    对账结果窗口。传入 service（ReconcileService）时订阅该账户：
+    输入文件变化后台重算完成即刷新窗口内容，窗口关闭时取消订阅。
+    """
     dlg = Toplevel(parent)
     dlg.title("对账结果")
     dlg.geometry("900x700")
     dlg.transient(parent)
 
-    fetched_at = result.get('fetched_at', '') or result.get('fetched_at_iso', '')
-    warnings = result.get('warnings', []) or ( [result.get('warning')] if result.get('warning') else [] )
-    batches = result.get('batches', {}) or ( { "1": result.get('items', []) } if result.get('items') is not None else {} )
+    state = {"result": result}
 
-    header = tb.Label(dlg, text=f"爬取时间: {fetched_at}    批次数: {len(batches)}", font=("微软雅黑", 11, "bold"))
+    header = tb.Label(dlg, text="", font=("微软雅黑", 11, "bold"))
     header.pack(anchor="w", padx=10, pady=(8,4))
-
-    if warnings:
-        warn_label = tb.Label(dlg, text="警告: " + "; ".join([str(w) for w in warnings]), foreground="red")
-        warn_label.pack(anchor="w", padx=10, pady=(0,6))
+    warn_label = tb.Label(dlg, text="", foreground="red")
 
     txt = ScrolledText(dlg, height=30, wrap='none', font=("Consolas", 10))
-    txt.pack(fill=BOTH, expand=True, padx=10, pady=6)
-    try:
-        # Ensure the underlying text widget is writable before inserting
+
+    def _set_text_state(value):
         try:
-            txt.configure(state="normal")
+            txt.configure(state=value)
         except Exception:
             # Some ScrolledText implementations expose inner text as .text or .widget
             try:
-                getattr(txt, "text").configure(state="normal")
+                getattr(txt, "text").configure(state=value)
             except Exception:
                 pass
 
-        # make result JSON-serializable (handle Decimal etc.)
-        serial = _make_serializable(result)
+    def _render(res):
+        state["result"] = res
+        fetched_at = res.get('fetched_at', '') or res.get('fetched_at_iso', '')
+        warnings = res.get('warnings', []) or ( [res.get('warning')] if res.get('warning') else [] )
+        batches = res.get('batches', {}) or ( { "1": res.get('items', []) } if res.get('items') is not None else {} )
+        header.config(text=f"爬取时间: {fetched_at}    批次数: {len(batches)}    更新于: {time.strftime('%H:%M:%S')}")
+        if warnings:
+            warn_label.config(text="警告: " + "; ".join([str(w) for w in warnings]))
+            warn_label.pack(anchor="w", padx=10, pady=(0,6), after=header)
+        else:
+            warn_label.pack_forget()
+
+        # Ensure the underlying text widget is writable before inserting
+        _set_text_state("normal")
+        try:
+            txt.delete(1.0, "end")
+        except Exception:
+            pass
         try:
-            txt.insert("end", json.dumps(serial, ensure_ascii=False, indent=2))
+            # make result JSON-serializable (handle Decimal etc.)
+            serial = _make_serializable(res)
+            try:
+                txt.insert("end", json.dumps(serial, ensure_ascii=False, indent=2))
+            except Exception:
+                try:
+                    txt.delete(1.0, "end")
+                except Exception:
+                    pass
+                txt.insert("end", str(serial))
         except Exception:
+            # Best-effort insert; if that fails, ignore
             try:
-                txt.delete(1.0, "end")
+                txt.insert("end", str(res))
             except Exception:
                 pass
-            txt.insert("end", str(serial))
-    except Exception:
-        # Best-effort insert; if that fails, ignore
-        try:
-            txt.insert("end", str(result))
-        except Exception:
-            pass
+        # Try to set the text widget to disabled/read-only where supported
+        _set_text_state("disabled")
 
-    # Try to set the text widget to disabled/read-only where supported
-    try:
-        txt.configure(state="disabled")
-    except Exception:
-        try:
-            getattr(txt, "text").configure(state="disabled")
-        except Exception:
-            pass
+    txt.pack(fill=BOTH, expand=True, padx=10, pady=6)
+    _render(result)
+
+    if service is not None:
+        def _on_update(res):
+            # 后台线程回调，切回 Tk 主线程刷新
+            try:
+                dlg.after(0, lambda: dlg.winfo_exists() and _render(res))
+            except Exception:
+                pass
+
+        service.subscribe(account_id, _on_update)
+
+        def _on_destroy(event):
+            if event.widget is dlg:
+                service.unsubscribe(account_id, _on_update)
+
+        dlg.bind("<Destroy>", _on_destroy, add="+")
 
     # ----------------- buttons (保存/导出/可视化/关闭) -----------------
     btn_frame = tb.Frame(dlg)
@@ -454,7 +528,7 @@ def _show_reconcile_dialog(parent, result, account_id):
         if path:
             try:
                 with open(path, "w", encoding="utf-8") as f:
-                    json.dump(_make_serializable(result), f, ensure_ascii=False, indent=2)
+                    json.dump(_make_serializable(state["result"]), f, ensure_ascii=False, indent=2)
                 messagebox.showinfo("保存成功", f"已保存到 {path}")
             except Exception as e:
                 messagebox.showerror("保存失败", str(e))
@@ -464,7 +538,7 @@ def _show_reconcile_dialog(parent, result, account_id):
         try:
             # 优先使用 reconcile_ui.save_report_json if available
             if ru and hasattr(ru, "save_report_json"):
-                path = ru.save_report_json(result, account_id)
+                path = ru.save_report_json(state["result"], account_id)
             else:
                 # 本地实现回退
                 reports_dir = os.path.join(os.path.dirname(__file__), "..", "reports")
@@ -472,7 +546,7 @@ def _show_reconcile_dialog(parent, result, account_id):
                 fname = f"reconcile_{account_id}.json"
                 path = os.path.join(reports_dir, fname)
                 with open(path, "w", encoding="utf-8") as f:
-                    json.dump(_make_serializable(result), f, ensure_ascii=False, indent=2, default=str)
+                    json.dump(_make_serializable(state["result"]), f, ensure_ascii=False, indent=2, default=str)
             if path:
                 messagebox.showinfo("导出成功", f"已导出对账 JSON:\n{path}")
             else:
@@ -485,7 +559,7 @@ def _show_reconcile_dialog(parent, result, account_id):
         try:
             # 先确保 JSON 已保存
             if ru and hasattr(ru, "save_report_json"):
-                json_path = ru.save_report_json(result, account_id)
+                json_path = ru.save_report_json(state["result"], account_id)
             else:
                 # 本地回退保存到 reports/
                 reports_dir = os.path.join(os.path.dirname(__file__), "..", "reports")
@@ -493,7 +567,7 @@ def _show_reconcile_dialog(parent, result, account_id):
                 fname = f"reconcile_{account_id}.json"
                 json_path = os.path.join(reports_dir, fname)
                 with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(_make_serializable(result), f, ensure_ascii=False, indent=2, default=str)
+                    json.dump(_make_serializable(state["result"]), f, ensure_ascii=False, indent=2, default=str)
 
             if not json_path or not os.path.exists(json_path):
                 messagebox.showerror("可视化失败", "JSON 保存失败，无法生成可视化")
@@ -534,6 +608,29 @@ def _show_reconcile_dialog(parent, result, account_id):
     tb.Button(btn_frame, text="保存到文件", command=_save, bootstyle="secondary-outline").pack(side=LEFT, padx=6)
     tb.Button(btn_frame, text="关闭", command=dlg.destroy, bootstyle="secondary-outline").pack(side=RIGHT, padx=6)
 
+def _compute_reconcile(account_id):
+    """本地文件对账（ReconcileService 的计算函数）；网络抓取路径已禁用"""
+    # 优先使用本地 reconcile_for_account_local（以确保读取 account_data 下的最新快照）
+    if reconcile_for_account_local is not None:
+        try:
+            result = reconcile_for_account_local(account_id)
+            if result is not None:
+                return result
+        except Exception as e_local:
+            print(f"[reconcile] reconcile_for_account_local 失败: {e_local}")
+
+    # 若本地不可用，再尝试 generate_reconcile_report（兼容旧逻辑）
+    if generate_reconcile_report is not None:
+        try:
+            result = generate_reconcile_report(account_id, require_today=False)
+            if result is not None:
+                return result
+        except Exception as e_local:
+            print(f"[reconcile] generate_reconcile_report 失败: {e_local}")
+
+    # 重要改动：不再回退到网络抓取（已禁用）
+    raise RuntimeError("本地对账函数不可用；已禁用网络抓取，请确保本地文件存在并且格式正确。")
+
 def build_account_frame(root, acc_display, config):
     """
     acc_display: 显示用的别名（如 'shu'），用于 UI 标签
@@ -576,58 +673,26 @@ def build_account_frame(root, acc_display, config):
     btn_refresh.config(command=proc.update_log)
 
     # 对账按钮回调（仅使用本地文件对账，禁用网络抓取）
+    # 结果按输入文件指纹缓存：输入未变直接显示缓存；勾选“强制刷新”则忽略缓存重算
     def on_reconcile_click():
-        # 优先使用本地文件比对接口（无需网络抓取）
         btn_reconcile.config(state="disabled", text="检测中...")
         force = bool(chk_force_var.get())
+        service = get_reconcile_service(_compute_reconcile)
 
-        def worker():
-            result = None
-            err = None
-            used_local = False
-            try:
-                # 优先使用本地 reconcile_for_account_local（以确保读取 account_data 下的最新快照）
-                if reconcile_for_account_local is not None:
-                    try:
-                        res = reconcile_for_account_local(account_id)
-                        result = res
-                        used_local = True
-                    except Exception as e_local:
-                        print(f"[reconcile] reconcile_for_account_local 失败: {e_local}")
-                        result = None
-
-                # 若本地不可用，再尝试 generate_reconcile_report（兼容旧逻辑）
-                if result is None and generate_reconcile_report is not None:
-                    try:
-                        res = generate_reconcile_report(account_id, require_today=False)
-                        result = res
-                        used_local = True
-                    except Exception as e_local:
-                        print(f"[reconcile] generate_reconcile_report 失败: {e_local}")
-                        result = None
-
-                # 重要改动：不再回退到网络抓取（已禁用）
-                if not used_local:
-                    raise RuntimeError("本地对账函数不可用；已禁用网络抓取，请确保本地文件存在并且格式正确。")
-            except Exception as e:
-                err = e
-
+        def on_result(result, err, from_cache):
             def on_done():
+                btn_reconcile.config(state="normal", text="对账")
                 if err:
                     messagebox.showerror("对账失败", f"对账出错: {err}")
-                    btn_reconcile.config(state="normal", text="对账")
                     return
-
-                # 如果成功返回 result，直接展示
-                btn_reconcile.config(state="normal", text="对账")
-                _show_reconcile_dialog(root, result, account_id)
+                _show_reconcile_dialog(root, result, account_id, service=service)
 
             try:
                 root.after(0, on_done)
             except Exception:
                 on_done()
 
-        threading.Thread(target=worker, daemon=True).start()
+        service.request(account_id, on_result, force=force)
 
     btn_reconcile.config(command=on_reconcile_click)
 
@@ -0,0 +1,154 @@
+# gui/log_view.py
+"""
+账户日志窗口：环形缓冲日志模型 + 按帧批量追加的 Text 视图。
+
+旧实现每收到一行子进程输出就 after(0, update_log)，update_log 清空整个 ScrolledText 再插入最近 500 行，
+开盘等输出密集阶段每行都是 O(500) 的 Tk 操作，界面卡顿。现在：
+  - LogModel：读线程 append，deque(maxlen) 环形缓冲，按序号记录位置，不在读线程里碰 Tk；
+  - LogView：Tk 线程每 FRAME_MS 取一次新增行，一次 insert 追加到末尾，
+    超出 max_lines 时从顶部一次 delete 掉多余行；用户上翻查看时不强制滚到底部。
+"""
+import threading
+from collections import deque
+
+FRAME_MS = 100
+DEFAULT_CAPACITY = 1000
+DEFAULT_VIEW_LINES = 500
+
+
+class LogModel:
+    """线程安全的环形日志缓冲；seq 为累计追加行数，视图据此取增量"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._lines = deque(maxlen=capacity)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            self._lines.append(line)
+            self._seq += 1
+
+    def extend(self, lines):
+        with self._lock:
+            for line in lines:
+                self._lines.append(line)
+                self._seq += 1
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def __len__(self):
+        return len(self._lines)
+
+    def since(self, seq):
+        """返回 (当前 seq, seq 之后新增且仍在缓冲内的行, 已被挤出缓冲而丢失的行数)"""
+        with self._lock:
+            new = self._seq - seq
+            if new <= 0:
+                return self._seq, [], 0
+            kept = min(new, len(self._lines))
+            lines = list(self._lines)[-kept:] if kept else []
+            return self._seq, lines, new - kept
+
+    def tail(self, n):
+        with self._lock:
+            if n >= len(self._lines):
+                return list(self._lines)
+            return list(self._lines)[-n:]
+
+
+class LogView:
+    """把 LogModel 绑定到（ttkbootstrap）ScrolledText；所有 Tk 操作都在 after 回调中执行"""
+
+    def __init__(self, widget, model, max_lines=DEFAULT_VIEW_LINES, frame_ms=FRAME_MS):
+        self.widget = widget
+        self.text = getattr(widget, "text", widget)  # ttkbootstrap ScrolledText 内部的 Text
+        self.model = model
+        self.max_lines = max_lines
+        self.frame_ms = frame_ms
+        self._seq = 0
+        self._lines_in_view = 0
+        self._job = None
+        self._fallback = None  # 模型为空时显示的文本（如日志文件尾部），由 refresh(fallback) 提供
+
+    def start(self):
+        if self._job is None:
+            self._schedule()
+
+    def stop(self):
+        job, self._job = self._job, None
+        if job is not None:
+            try:
+                self.widget.after_cancel(job)
+            except Exception:
+                pass
+
+    def _schedule(self):
+        try:
+            self._job = self.widget.after(self.frame_ms, self._tick)
+        except Exception:
+            self._job = None
+
+    def _tick(self):
+        self._job = None
+        try:
+            self.flush()
+        finally:
+            self._schedule()
+
+    def _at_bottom(self):
+        try:
+            return self.text.yview()[1] >= 0.999
+        except Exception:
+            return True
+
+    def flush(self):
+        """把 seq 之后的新增行一次性追加到视图（Tk 线程调用）"""
+        seq, lines, dropped = self.model.since(self._seq)
+        if not lines and not dropped:
+            return
+        self._seq = seq
+        follow = self._at_bottom()
+        try:
+            if self._fallback is not None:
+                self.text.delete("1.0", "end")
+                self._lines_in_view = 0
+                self._fallback = None
+            if dropped:
+                lines = [f"... 省略 {dropped} 行 ...\n"] + lines
+            if len(lines) > self.max_lines:
+                lines = lines[-self.max_lines:]
+            self.text.insert("end", "".join(lines))
+            self._lines_in_view += len(lines)
+            excess = self._lines_in_view - self.max_lines
+            if excess > 0:
+                self.text.delete("1.0", f"{excess + 1}.0")
+                self._lines_in_view -= excess
+            if follow:
+                self.text.see("end")
+        except Exception:
+            pass
+
+    def refresh(self, fallback=None):
+        """整体重绘（“刷新日志”按钮）：显示缓冲尾部；缓冲为空时显示 fallback 文本"""
+        lines = self.model.tail(self.max_lines)
+        self._seq = self.model.seq
+        try:
+            self.text.delete("1.0", "end")
+            if lines:
+                self.text.insert("end", "".join(lines))
+                self._lines_in_view = len(lines)
+                self._fallback = None
+            else:
+                self._fallback = fallback or ""
+                self.text.insert("end", self._fallback)
+                self._lines_in_view = 0
+            self.text.see("end")
+        except Exception:
+            pass
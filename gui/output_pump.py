@@ -0,0 +1,174 @@
+# gui/output_pump.py
+"""
+子进程输出泵：读线程 + 写线程，读端永不阻塞子进程。
+
+旧 _read_log 用 readline() + sleep(0.1) 轮询，每行 write + flush 日志文件，log_buffer 列表切片裁剪；
+输出密集时读得慢，子进程写 stdout 管道满了就会被阻塞（交易线程里的 print/logging 也跟着卡住）。
+现在：
+  - 读线程：os.read 大块读取（CHUNK_SIZE），增量 utf-8 解码、按行切分，放入有界 deque；
+    队列满时丢弃新行并计数（不等待），腾出空间后补一行“丢弃 N 行”摘要；
+    line_filter(line) 返回 True 的行（如就绪标记）在读线程内直接处理，不入队；
+  - 写线程：每 FLUSH_INTERVAL 秒或攒够 BATCH_LINES 行，一次 write + flush 日志文件，再整批交给 on_lines。
+"""
+import os
+import time
+import codecs
+import threading
+from collections import deque
+
+CHUNK_SIZE = 64 * 1024
+MAX_QUEUE_LINES = 20000
+BATCH_LINES = 2000
+FLUSH_INTERVAL = 0.2
+
+
+class OutputPump:
+    def __init__(self, stream, log_path=None, on_lines=None, line_filter=None, on_close=None,
+                 max_queue_lines=MAX_QUEUE_LINES, flush_interval=FLUSH_INTERVAL):
+        """
+        stream: 子进程 stdout（二进制管道；文本模式对象会使用其 .buffer / fileno）
+        on_lines(list[str]): 写线程每批回调（如 LogModel.extend）
+        line_filter(str) -> bool: 读线程逐行调用，返回 True 表示已处理、不入队
+        on_close(): 读写都结束后回调一次
+        """
+        self.stream = stream
+        self.log_path = log_path
+        self.on_lines = on_lines
+        self.line_filter = line_filter
+        self.on_close = on_close
+        self.max_queue_lines = max_queue_lines
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._eof = False
+        self._dropped_pending = 0
+        self.stats = {"lines": 0, "dropped": 0, "written": 0, "batches": 0}
+        self._reader = threading.Thread(target=self._read_loop, name="output-pump-reader", daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="output-pump-writer", daemon=True)
+
+    def start(self):
+        self._reader.start()
+        self._writer.start()
+        return self
+
+    def join(self, timeout=None):
+        self._reader.join(timeout)
+        self._writer.join(timeout)
+
+    def is_alive(self):
+        return self._reader.is_alive() or self._writer.is_alive()
+
+    # ---------- reader ----------
+    def _read_chunk(self):
+        raw = getattr(self.stream, "buffer", self.stream)
+        try:
+            return os.read(raw.fileno(), CHUNK_SIZE)
+        except (AttributeError, OSError, ValueError):
+            # 无 fileno（测试用流等）或管道已关闭
+            try:
+                return raw.read1(CHUNK_SIZE) if hasattr(raw, "read1") else raw.read(CHUNK_SIZE)
+            except Exception:
+                return b""
+
+    def _push(self, lines):
+        with self._cond:
+            room = self.max_queue_lines - len(self._queue)
+            if self._dropped_pending and room > 1:
+                self._queue.append(f"... 输出过快，已丢弃 {self._dropped_pending} 行 ...\n")
+                self._dropped_pending = 0
+                room -= 1
+            if len(lines) > room:
+                dropped = len(lines) - max(room, 0)
+                lines = lines[:max(room, 0)]
+                self._dropped_pending += dropped
+                self.stats["dropped"] += dropped
+            self._queue.extend(lines)
+            self._cond.notify()
+
+    def _read_loop(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        try:
+            while True:
+                chunk = self._read_chunk()
+                if not chunk:
+                    break
+                parts = (partial + decoder.decode(chunk)).split("\n")
+                partial = parts.pop()
+                self._accept(parts)
+            tail = partial + decoder.decode(b"", final=True)
+            if tail:
+                self._accept([tail])
+        except Exception as e:
+            print(f"[OutputPump] 读取异常: {e}", flush=True)
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify()
+
+    def _accept(self, parts):
+        lines = []
+        for line in parts:
+            line = (line[:-1] if line.endswith("\r") else line) + "\n"
+            if self.line_filter is not None:
+                try:
+                    if self.line_filter(line):
+                        continue
+                except Exception:
+                    pass
+            lines.append(line)
+        if lines:
+            self.stats["lines"] += len(lines)
+            self._push(lines)
+
+    # ---------- writer ----------
+    def _take_batch(self):
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while not self._eof and len(self._queue) < BATCH_LINES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), BATCH_LINES)
+            batch = [self._queue.popleft() for _ in range(n)]
+            if self._dropped_pending and len(self._queue) == 0 and self._eof:
+                batch.append(f"... 输出过快，已丢弃 {self._dropped_pending} 行 ...\n")
+                self._dropped_pending = 0
+            done = self._eof and not self._queue
+        return batch, done
+
+    def _write_loop(self):
+        f = None
+        try:
+            if self.log_path:
+                f = open(self.log_path, "a", encoding="utf-8")
+            while True:
+                batch, done = self._take_batch()
+                if batch:
+                    if f is not None:
+                        try:
+                            f.write("".join(batch))
+                            f.flush()
+                        except Exception as e:
+                            print(f"[OutputPump] 写日志文件失败: {e}", flush=True)
+                    if self.on_lines is not None:
+                        try:
+                            self.on_lines(batch)
+                        except Exception:
+                            pass
+                    self.stats["written"] += len(batch)
+                    self.stats["batches"] += 1
+                if done:
+                    break
+        finally:
+            if f is not None:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+            if self.on_close is not None:
+                try:
+                    self.on_close()
+                except Exception:
+                    pass
@@ -21,8 +21,10 @@ import collections
 from typing import Optional, Dict, Any, List, Tuple
 
 # reuse loader & normalizer
-from utils.name_code_loader import load_code_index as load_code_index_from_loader, build_name_to_code_map
+from utils.name_code_loader import load_code_index as load_code_index_from_loader
+from utils.symbol_table import get_symbol_table
 from utils.code_normalizer import normalize_code, canonical_variants as canonical_variants_from_normalizer, _code_base as _cn_code_base  # noqa: F401
+from utils.account_store import get_account_store, store_available
 
 # Note: _code_base wrapper kept for compatibility below
 def _code_base(code: str) -> str:
@@ -89,26 +91,14 @@ def _load_code_index():
 def _resolve_code_to_name(code: str) -> Optional[str]:
     """
     Try to resolve a code (e.g. '513100' or '513100.SH') to a human-friendly name.
-    Uses code_index first, then name_vs_code file if present.
+    Uses the shared symbol table (core_stock_code > code_index > name_vs_code).
     """
     if not code:
         return None
-    base = str(code).split('.')[0]
-    idx = _load_code_index()
-    if base in idx and isinstance(idx[base], list) and idx[base]:
-        return idx[base][0]
     try:
-        if os.path.exists(NAME_VS_CODE_PATH):
-            nm = json.load(open(NAME_VS_CODE_PATH, 'r', encoding='utf-8'))
-            if code in nm:
-                return nm.get(code)
-            for s in (".SH", ".SZ"):
-                k = base + s
-                if k in nm:
-                    return nm.get(k)
+        return get_symbol_table().name_of(code)
     except Exception:
-        pass
-    return None
+        return None
 
 # ---------- core stock code map (for scripts that rely on core mapping) ----------
 _CORE_STOCK_CODE_CACHE = None
@@ -357,12 +347,19 @@ def load_parsed_strategies() -> List[dict]:
 
 def resolve_name_to_code_public(name: str) -> Optional[str]:
     """
-    Public helper: resolve a human name to code using code_index via shared loader.
+    Public helper: resolve a human name to code using the shared symbol table.
     """
-    mapping = build_name_to_code_map(CODE_INDEX_PATH)
-    return mapping.get(name)
+    return get_symbol_table().code_of(name)
 
 def load_account_asset_latest(account_id: str) -> Optional[dict]:
+    # prefer the account state store (latest SQLite snapshot), then fall back to the template export
+    if store_available():
+        try:
+            asset = get_account_store().latest_asset(str(account_id))
+            if asset:
+                return asset
+        except Exception:
+            pass
     p = os.path.join(REPO_ROOT, "public", "template_account_info", f"template_account_asset_info.json")
     data = _load_json(p)
     if not data:
@@ -373,6 +370,13 @@ def load_account_asset_latest(account_id: str) -> Optional[dict]:
     return data
 
 def load_account_positions_latest(account_id: str) -> List[dict]:
+    if store_available():
+        try:
+            ts, rows = get_account_store().latest_positions(str(account_id))
+            if ts:
+                return rows
+        except Exception:
+            pass
     p = os.path.join(REPO_ROOT, "account_data", "positions", f"position_{account_id}.json")
     data = _load_json(p)
     if not data:
@@ -520,6 +524,13 @@ def generate_reconcile_report(account_id: str, require_today: bool = False) -> D
     else:
         today_date = None
 
+    # strategy lookup index: built once per report instead of scanning per allocation entry
+    try:
+        from yunfei_ball.strategy_index import StrategyIndex
+        strategy_index = StrategyIndex(strategies)
+    except Exception:
+        strategy_index = None
+
     # 1) expected from allocation + parsed strategies
     for cfg in allocation_list:
         try:
@@ -529,9 +540,7 @@ def generate_reconcile_report(account_id: str, require_today: bool = False) -> D
 
         matched = None
         try:
-            # find_strategy_by_id_and_bracket defined in yunfei module; import lazily
-            from yunfei_ball.yunfei_connect_follow import find_strategy_by_id_and_bracket
-            matched = find_strategy_by_id_and_bracket(cfg, strategies)
+            matched = strategy_index.find(cfg) if strategy_index is not None else None
         except Exception:
             matched = None
 
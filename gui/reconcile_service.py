@@ -0,0 +1,179 @@
+# gui/reconcile_service.py
+"""
+对账结果缓存服务：按输入文件指纹（路径 + mtime_ns + size）缓存每个账户的对账报告。
+
+- request(account_id)：指纹未变直接返回缓存（点击“对账”立即出结果）；变了则后台重算，完成后回调；
+  同一账户同时只有一个重算任务（其余请求等同一次结果）。
+- subscribe(account_id, fn)：打开的对账窗口订阅结果；后台巡检线程每 POLL_SECONDS 秒检查有订阅者的账户，
+  输入变化（新快照写库、草稿/分配文件更新等）时自动重算并推送给所有订阅者。
+回调都在后台线程中执行，Tk 调用方需自行 after(0, ...) 切回主线程。
+"""
+import os
+import threading
+import time
+from datetime import date
+
+from utils import account_registry
+from utils.account_store import DEFAULT_DB_PATH
+
+try:
+    from gui import reconcile_ui as ru
+except Exception:
+    ru = None
+
+POLL_SECONDS = 5.0
+
+
+def input_paths(account_id):
+    """reconcile_for_account / generate_reconcile_report 读取的全部本地文件"""
+    paths = [DEFAULT_DB_PATH, DEFAULT_DB_PATH + "-wal"]
+    if ru is not None:
+        paths += [
+            ru.ALLOCATION_PATH,
+            ru.FETCH_CACHE_LATEST,
+            ru.DEBUG_OUT_ITEMS,
+            os.path.join(ru.BASE_DIR, "yunfei_ball", "debug_parsed_strategies.json"),
+            ru.TRADE_PLAN_DRAFT_PATH,
+            ru.CORE_STOCK_CODE_PATH,
+            os.path.join(ru.ASSET_DIR, f"asset_{account_id}.json"),
+            os.path.join(ru.POSITIONS_DIR, f"position_{account_id}.json"),
+        ]
+    return [os.path.abspath(p) for p in paths]
+
+
+def fingerprint(account_id):
+    """输入指纹：各文件 (mtime_ns, size)（缺失为 None）+ 账户配置版本 + 日期（报告中含“今日”判断）"""
+    parts = []
+    for p in input_paths(account_id):
+        try:
+            st = os.stat(p)
+            parts.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            parts.append((p, None))
+    try:
+        parts.append(("account_registry", account_registry.generation()))
+    except Exception:
+        pass
+    parts.append(("date", date.today().isoformat()))
+    return tuple(parts)
+
+
+class ReconcileService:
+    def __init__(self, compute, poll_seconds=POLL_SECONDS):
+        """compute(account_id) -> report（失败抛异常）"""
+        self.compute = compute
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._cache = {}        # account_id -> (fingerprint, report, computed_at)
+        self._inflight = {}     # account_id -> [callback, ...]
+        self._subs = {}         # account_id -> [fn, ...]
+        self._watcher = None
+
+    def cached(self, account_id):
+        """指纹未变时返回缓存报告，否则 None（不触发计算）"""
+        account_id = str(account_id)
+        with self._lock:
+            entry = self._cache.get(account_id)
+        if entry and entry[0] == fingerprint(account_id):
+            return entry[1]
+        return None
+
+    def request(self, account_id, callback, force=False):
+        """
+        callback(report, err, from_cache)；命中缓存时在调用线程同步回调，
+        否则在后台线程重算完成后回调（并推送给订阅者）。
+        """
+        account_id = str(account_id)
+        if not force:
+            report = self.cached(account_id)
+            if report is not None:
+                callback(report, None, True)
+                return
+        with self._lock:
+            waiting = self._inflight.get(account_id)
+            if waiting is not None:
+                waiting.append(callback)
+                return
+            self._inflight[account_id] = [callback]
+        threading.Thread(target=self._recompute, args=(account_id,), daemon=True).start()
+
+    def _recompute(self, account_id):
+        fp = fingerprint(account_id)
+        report, err = None, None
+        t0 = time.perf_counter()
+        try:
+            report = self.compute(account_id)
+        except Exception as e:
+            err = e
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            if err is None:
+                self._cache[account_id] = (fp, report, time.time())
+            callbacks = self._inflight.pop(account_id, [])
+            subs = list(self._subs.get(account_id, []))
+        print(f"[ReconcileService] 账户 {account_id} 对账重算 {elapsed:.2f}s{' 失败: ' + str(err) if err else ''}",
+              flush=True)
+        for cb in callbacks:
+            try:
+                cb(report, err, False)
+            except Exception:
+                pass
+        if err is None:
+            for fn in subs:
+                if fn in callbacks:
+                    continue
+                try:
+                    fn(report)
+                except Exception:
+                    pass
+
+    # ---------- 订阅 / 后台巡检 ----------
+    def subscribe(self, account_id, fn):
+        with self._lock:
+            self._subs.setdefault(str(account_id), []).append(fn)
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="reconcile-watch", daemon=True)
+                self._watcher.start()
+
+    def unsubscribe(self, account_id, fn):
+        with self._lock:
+            subs = self._subs.get(str(account_id), [])
+            if fn in subs:
+                subs.remove(fn)
+            if not subs:
+                self._subs.pop(str(account_id), None)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            with self._lock:
+                accounts = list(self._subs)
+                if not accounts:
+                    self._watcher = None
+                    return
+                cached_fp = {a: self._cache.get(a, (None,))[0] for a in accounts}
+                busy = set(self._inflight)
+            for account_id in accounts:
+                if account_id in busy:
+                    continue
+                try:
+                    if fingerprint(account_id) != cached_fp.get(account_id):
+                        self.request(account_id, lambda *a: None, force=True)
+                except Exception:
+                    pass
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_reconcile_service(compute=None):
+    """进程内单例；首次调用需传入 compute"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                if compute is None:
+                    raise RuntimeError("ReconcileService 未初始化：首次调用需提供 compute")
+                _service = ReconcileService(compute)
+    return _service
@@ -15,16 +15,18 @@ import ttkbootstrap as tb
 
 # Try to reuse existing yunfei helpers if available
 try:
-    from yunfei_ball.yunfei_connect_follow import find_strategy_by_id_and_bracket, load_name_to_code_map, CODE_INDEX_PATH
-    try:
-        from yunfei_ball.yunfei_connect_follow import name_to_code as NAME_TO_CODE_GLOBAL
-    except Exception:
-        NAME_TO_CODE_GLOBAL = None
+    from yunfei_ball.yunfei_connect_follow import find_strategy_by_id_and_bracket
 except Exception:
     find_strategy_by_id_and_bracket = None
-    load_name_to_code_map = None
-    CODE_INDEX_PATH = None
-    NAME_TO_CODE_GLOBAL = None
+
+try:
+    from yunfei_ball.strategy_index import StrategyIndex
+except Exception:
+    StrategyIndex = None
+
+from utils.account_store import get_account_store, store_available
+from utils.symbol_table import get_symbol_table
+from utils import account_registry
 
 # Paths
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -103,8 +105,9 @@ def _load_core_stock_code_map():
 
 # ---------- load mama proportions (per-account) ----------
 _MAMA_CACHE = None
-# cache map: account_id -> (Decimal(etf), Decimal(yf))
+# cache map: account_id -> (Decimal(etf), Decimal(yf))；账户配置被修改（registry generation 变化）时清空
 _MAMA_PROPORTIONS_CACHE = {}
+_MAMA_PROPORTIONS_GEN = None
 
 def _parse_proportion_value(prop):
     """
@@ -164,7 +167,8 @@ def _load_mama_proportions_for_account(account_id: str):
     Load proportion_ETF and proportion_YF for a specific account_id.
 
     Lookup priority:
-      1) core_parameters/account/{account_id}.json -> keys proportion_ETF / proportion_YF / proportion
+      1) account config for account_id (utils.account_registry: {account_id}.json or matching account_id field)
+         -> keys proportion_ETF / proportion_YF / proportion
       2) core_parameters/account/mama.json per-account map: mama.json may contain top-level keys named by account_id
          e.g. { "8886006288": {"proportion_ETF": "1", "proportion_YF": "1"}, ... }
       3) core_parameters/account/mama.json top-level keys proportion_ETF/proportion_YF/proportion
@@ -173,17 +177,20 @@ def _load_mama_proportions_for_account(account_id: str):
     Important: DO NOT attempt to infer proportion by picking the first numeric value in the file.
     Returns (Decimal(etf), Decimal(yf))
     """
-    global _MAMA_PROPORTIONS_CACHE
+    global _MAMA_PROPORTIONS_CACHE, _MAMA_PROPORTIONS_GEN
     if not account_id:
         account_id = str(account_id or "")
+    gen = account_registry.generation()
+    if gen != _MAMA_PROPORTIONS_GEN:
+        _MAMA_PROPORTIONS_CACHE = {}
+        _MAMA_PROPORTIONS_GEN = gen
     # cached?
     if account_id in _MAMA_PROPORTIONS_CACHE:
         return _MAMA_PROPORTIONS_CACHE[account_id]
     try:
-        # 1) try per-account config file core_parameters/account/{account_id}.json
-        acct_file = os.path.join(ACCOUNT_CONFIG_DIR, f"{account_id}.json")
-        if os.path.exists(acct_file):
-            data = _load_json(acct_file) or {}
+        # 1) per-account config (registry: file named {account_id}.json or whose account_id matches)
+        data = account_registry.get_config(account_id)
+        if data:
             if isinstance(data, dict):
                 # Keys can be nested; check top-level and under "account"
                 candidates = []
@@ -210,7 +217,7 @@ def _load_mama_proportions_for_account(account_id: str):
                     _MAMA_PROPORTIONS_CACHE[account_id] = result
                     return result
         # 2) try mama.json per-account map
-        mama = _load_json(MAMA_PATH) or {}
+        mama = account_registry.get_config("mama") or _load_json(MAMA_PATH) or {}
         if isinstance(mama, dict):
             # if there's a section for this account id
             acct_entry = mama.get(str(account_id))
@@ -315,26 +322,15 @@ def _find_current_mv_for_code(code_key: str, current_by_code: dict):
 def _resolve_code_to_name(code: str):
     """
     Try to resolve a code (e.g. '513100' or '513100.SH') to a human-friendly name.
-    Uses core_parameters/stocks/core_stock_code.json (loaded by _load_core_stock_code_map) by inverting the mapping,
-    and falls back to NAME_TO_CODE_GLOBAL if available.
+    Uses the shared symbol table (core_stock_code > code_index > name_vs_code), O(1).
     Returns None when unknown.
     """
     if not code:
         return None
     try:
-        core_map = _load_core_stock_code_map()  # name -> code
-        # invert by checking values
-        base = _code_base(code)
-        for name, c in core_map.items():
-            if c and _code_base(c) == base:
-                return name
-        if NAME_TO_CODE_GLOBAL:
-            for name, c in NAME_TO_CODE_GLOBAL.items():
-                if c and _code_base(c) == base:
-                    return name
+        return get_symbol_table().name_of(code)
     except Exception:
-        pass
-    return None
+        return None
 
 
 # --------- holdings parsing ----------
@@ -434,6 +430,14 @@ def load_parsed_strategies():
 
 
 def load_account_asset_latest(account_id):
+    # 优先读取账户状态库（SQLite 最新快照），没有再回退到 JSON 导出文件
+    if store_available():
+        try:
+            asset = get_account_store().latest_asset(str(account_id))
+            if asset:
+                return asset
+        except Exception:
+            pass
     p = os.path.join(ASSET_DIR, f"asset_{account_id}.json")
     data = _load_json(p)
     if not data:
@@ -442,6 +446,13 @@ def load_account_asset_latest(account_id):
 
 
 def load_account_positions_latest(account_id):
+    if store_available():
+        try:
+            ts, rows = get_account_store().latest_positions(str(account_id))
+            if ts:
+                return rows
+        except Exception:
+            pass
     p = os.path.join(POSITIONS_DIR, f"position_{account_id}.json")
     data = _load_json(p)
     if not data:
@@ -450,16 +461,10 @@ def load_account_positions_latest(account_id):
 
 
 def resolve_name_to_code(name):
-    # try global map if loaded
-    if NAME_TO_CODE_GLOBAL:
-        return NAME_TO_CODE_GLOBAL.get(name)
-    if load_name_to_code_map and CODE_INDEX_PATH:
-        try:
-            mapping = load_name_to_code_map(CODE_INDEX_PATH)
-            return mapping.get(name)
-        except Exception:
-            return None
-    return None
+    try:
+        return get_symbol_table().name_to_code.get(name)
+    except Exception:
+        return None
 
 
 # --------- trade plan draft parsing ----------
@@ -628,6 +633,14 @@ def reconcile_for_account(account_id, require_today: bool = False):
     else:
         today_date = None
 
+    # 策略查找索引：每次对账只构建一次
+    strategy_index = None
+    if StrategyIndex is not None:
+        try:
+            strategy_index = StrategyIndex(strategies)
+        except Exception:
+            strategy_index = None
+
     # Aggregate expected from allocation list (yunfei) -> use proportion_YF
     for cfg in allocation_list:
         try:
@@ -636,7 +649,12 @@ def reconcile_for_account(account_id, require_today: bool = False):
             config_pct = 0.0
 
         matched = None
-        if find_strategy_by_id_and_bracket:
+        if strategy_index is not None:
+            try:
+                matched = strategy_index.find(cfg)
+            except Exception:
+                matched = None
+        elif find_strategy_by_id_and_bracket:
             try:
                 matched = find_strategy_by_id_and_bracket(cfg, strategies)
             except Exception:
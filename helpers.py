@@ -5,6 +5,7 @@ import json
 import time
 import logging
 import argparse
+import functools
 import traceback
 from datetime import datetime
 import argparse
@@ -12,11 +13,16 @@ import argparse
 import psutil
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
 
 from processor.asset_connector import print_account_asset as _print_account_asset
 from processor.position_connector import print_positions as _print_positions
 from xtquant.xttrader import XtQuantTrader, XtQuantTraderCallback
 from yunfei_ball.yunfei_connect_follow import fetch_and_check_batch_with_trade_plan, INPUT_JSON
+from utils import precise_trigger
+from utils import job_timeline
+from utils import account_context
 
 # 云飞与自动交易时间常量（可放到 config 文件）
 YUNFEI_SCHEDULE_TIMES = [
@@ -121,6 +127,18 @@ def parse_args():
     return parser.parse_args()
 
 def check_duplicate_instance(script_name: str, account_name: str) -> bool:
+    """
+    账户单实例检查：优先获取 runtime/pids/account_{name}.lock（O(1)，本进程持有至退出）；
+    锁文件不可用（目录只读等）时才回退到遍历进程 cmdline。
+    """
+    try:
+        from utils import process_registry
+        return process_registry.acquire_account_lock(account_name)
+    except Exception as e:
+        logging.warning(f"账户锁不可用，回退到进程扫描: {e}")
+    return _scan_duplicate_instance(script_name, account_name)
+
+def _scan_duplicate_instance(script_name: str, account_name: str) -> bool:
     current_pid = os.getpid()
     for proc in psutil.process_iter(['pid', 'cmdline']):
         try:
@@ -132,41 +150,71 @@ def check_duplicate_instance(script_name: str, account_name: str) -> bool:
             cmdline = ' '.join(cmdline_list).lower()
             if script_name in cmdline and f"-a {account_name.lower()}" in cmdline:
                 return False
+            # 多账户宿主：main.py --accounts shu,mama
+            if script_name in cmdline and "--accounts" in cmdline_list:
+                idx = cmdline_list.index("--accounts")
+                hosted = (cmdline_list[idx + 1] if idx + 1 < len(cmdline_list) else "").lower().split(',')
+                if account_name.lower() in [h.strip() for h in hosted]:
+                    return False
         except Exception:
             continue
     return True
 
 # ----------------- XtQuantTrader init / callback -----------------
+def _in_account_context(method):
+    """xtquant 回调在其自身线程中执行，没有账户上下文：先绑定创建回调对象的账户，日志才会分流到该账户"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with account_context.use(self.account_name, self.account_id):
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class MyXtQuantTraderCallback(XtQuantTraderCallback):
+    def __init__(self, account_name=None, account_id=None):
+        super().__init__()
+        self.account_name = account_name
+        self.account_id = account_id
+
+    @_in_account_context
     def on_disconnected(self, *args, **kwargs):
         logging.error(f"{datetime.now()} - 连接断开")
 
+    @_in_account_context
     def on_stock_order(self, order):
         logging.info(f"{datetime.now()} - 委托回调: {getattr(order, 'order_remark', order)}")
 
+    @_in_account_context
     def on_stock_trade(self, trade):
         logging.info(
             f"{datetime.now()} - 成交回调: {getattr(trade, 'order_remark', trade)}, 成交价格: {getattr(trade, 'traded_price', '')}, 成交数量: {getattr(trade, 'traded_volume', '')}"
         )
 
+    @_in_account_context
     def on_order_error(self, order_error):
         logging.error(f"{datetime.now()} - 委托报错: {getattr(order_error, 'order_remark', order_error)}, 错误信息: {getattr(order_error, 'error_msg', '')}")
 
+    @_in_account_context
     def on_cancel_error(self, cancel_error):
         logging.error(f"{datetime.now()} - 撤单失败回调")
 
+    @_in_account_context
     def on_order_stock_async_response(self, response):
         logging.info(f"{datetime.now()} - 异步委托回调: {getattr(response, 'order_remark', response)}")
 
+    @_in_account_context
     def on_cancel_order_stock_async_response(self, response):
         logging.info(f"{datetime.now()} - 撤单异步回调")
 
+    @_in_account_context
     def on_account_status(self, status):
         logging.info(f"{datetime.now()} - 账户状态回调")
 
-def init_xt_trader(path_qmt, session_id):
+def init_xt_trader(path_qmt, session_id, account_name=None, account_id=None):
+    """account_name/account_id 缺省取当前线程的账户上下文（start_account 已 bind），回调据此分流日志"""
+    if account_name is None and account_id is None:
+        account_name, account_id = account_context.current()
     xt_trader = XtQuantTrader(path_qmt, session_id)
-    callback = MyXtQuantTraderCallback()
+    callback = MyXtQuantTraderCallback(account_name, account_id)
     xt_trader.register_callback(callback)
     xt_trader.start()
     logging.info("XtQuantTrader 已初始化并启动")
@@ -180,27 +228,95 @@ def _parse_hms(time_str: str):
         raise ValueError(f"时间格式错误: {time_str}")
     return h, m, s
 
-def create_scheduler():
-    return BackgroundScheduler()
+# 具名线程池：交易任务独占一个池，长时间运行的跟投轮询不会占满交易任务的工作线程
+EXECUTOR_TRADING = "trading"        # 卖出/买入、撤单重下、511880 买卖、开盘前预热
+EXECUTOR_POLLING = "polling"        # 云飞批次轮询等长任务 / IO
+EXECUTOR_HOUSEKEEPING = "default"   # 打印持仓、推送 git 等杂项（APScheduler 必须有 default）
+EXECUTOR_SIZES = {EXECUTOR_TRADING: 4, EXECUTOR_POLLING: 6, EXECUTOR_HOUSEKEEPING: 2}
+
+TRADING_MISFIRE_GRACE = 30   # 秒：交易任务晚到 30s 内仍执行（APScheduler 默认只有 1s）
+LATE_ALERT_SECONDS = 1.0     # 秒：交易任务实际开始晚于计划时刻超过该值时告警
 
-def add_cron_job(scheduler: BackgroundScheduler, func, time_str: str, args=None, job_id: str = None, replace_existing=True):
+def _on_job_missed(event):
+    job_id = getattr(event, "job_id", "")
+    when = getattr(event, "scheduled_run_time", None)
+    if getattr(event, "code", None) == EVENT_JOB_MAX_INSTANCES:
+        logging.warning(f"任务 {job_id} 上一次尚未结束，本次触发（{when}）被跳过")
+    else:
+        logging.error(f"⚠️ 任务 {job_id} 错过触发时刻 {when}，未执行")
+
+def create_scheduler(account_name=None, account_id=None):
+    """account_name/account_id：多账户同进程时，线程池线程绑定该账户上下文（日志分流、时间线归属）"""
+    pool_kwargs = None
+    if account_name or account_id:
+        pool_kwargs = {"initializer": account_context.bind, "initargs": (account_name, account_id)}
+    executors = {name: ThreadPoolExecutor(size, pool_kwargs=pool_kwargs) for name, size in EXECUTOR_SIZES.items()}
+    scheduler = BackgroundScheduler(executors=executors, job_defaults={"coalesce": True, "max_instances": 1})
+    scheduler.add_listener(_on_job_missed, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+    return scheduler
+
+def _late_alert_wrapper(func, job_id: str, time_str: str, threshold: float = LATE_ALERT_SECONDS):
+    """交易任务：开始执行时与当天计划时刻比较，延迟超过阈值告警（不影响执行）"""
     h, m, s = _parse_hms(time_str)
-    scheduler.add_job(func, trigger=CronTrigger(hour=h, minute=m, second=s), args=tuple(args or []), id=job_id, replace_existing=replace_existing)
-    logging.info(f"已添加定时任务: {job_id} @ {time_str}")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        now = datetime.now()
+        late = (now - now.replace(hour=h, minute=m, second=s, microsecond=0)).total_seconds()
+        if threshold < late < 3600:
+            logging.error(f"⚠️ 交易任务 {job_id} 延迟启动 {late:.3f}s（计划 {time_str}）")
+        return func(*args, **kwargs)
+    return wrapper
+
+def add_cron_job(scheduler: BackgroundScheduler, func, time_str: str, args=None, job_id: str = None, replace_existing=True,
+                 executor: str = EXECUTOR_HOUSEKEEPING, max_instances: int = 1, misfire_grace_time=None):
+    h, m, s = _parse_hms(time_str)
+    func = job_timeline.instrument(func, job_id, time_str)
+    if executor == EXECUTOR_TRADING:
+        func = _late_alert_wrapper(func, job_id, time_str)
+        if misfire_grace_time is None:
+            misfire_grace_time = TRADING_MISFIRE_GRACE
+    extra = {} if misfire_grace_time is None else {"misfire_grace_time": misfire_grace_time}
+    scheduler.add_job(func, trigger=CronTrigger(hour=h, minute=m, second=s), args=tuple(args or []), id=job_id,
+                      replace_existing=replace_existing, executor=executor, max_instances=max_instances, **extra)
+    logging.info(f"已添加定时任务: {job_id} @ {time_str} [{executor}]")
+
+def add_trigger_job(scheduler: BackgroundScheduler, func, time_str: str, job_id: str, account_id=None, precise=True):
+    """
+    对时刻敏感的任务（sell_time / buy_time）：默认用独占线程的高精度触发器（utils/precise_trigger.py），
+    precise=False 时退回 APScheduler cron。
+    """
+    if precise:
+        _parse_hms(time_str)
+        return precise_trigger.add_precise_job(job_timeline.instrument(func, job_id, time_str), time_str, job_id,
+                                               account_id=account_id)
+    add_cron_job(scheduler, func, time_str, job_id=job_id, executor=EXECUTOR_TRADING)
+    return None
 
 def add_multiple_cron_jobs(scheduler: BackgroundScheduler, jobs: list):
     for j in jobs:
         try:
-            add_cron_job(scheduler, j['func'], j['time'], args=j.get('args', []), job_id=j.get('id'))
+            add_cron_job(scheduler, j['func'], j['time'], args=j.get('args', []), job_id=j.get('id'),
+                         executor=j.get('executor', EXECUTOR_HOUSEKEEPING), max_instances=j.get('max_instances', 1))
         except Exception as e:
             logging.error(f"添加任务失败 {j.get('id')} @ {j.get('time')}: {e}")
 
 # ----------------- trade plan / draft helpers -----------------
+_trade_plan_cache = {}
+
 def load_trade_plan(file_path):
+    """读取交易计划；按 (mtime, size) 缓存解析结果，预热阶段加载后触发时直接复用"""
     abs_path = os.path.abspath(file_path)
     try:
+        st = os.stat(abs_path)
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = _trade_plan_cache.get(abs_path)
+        if cached and cached[0] == sig:
+            logging.info(f"交易计划已从缓存加载 `{abs_path}`")
+            return cached[1]
         with open(abs_path, 'r', encoding='utf-8') as f:
             trade_plan = json.load(f)
+        _trade_plan_cache[abs_path] = (sig, trade_plan)
         logging.info(f"交易计划已从文件 `{abs_path}` 加载")
         return trade_plan
     except Exception as e:
@@ -267,7 +383,7 @@ def add_yunfei_jobs(scheduler: BackgroundScheduler, xt_trader, config, account_a
 
         job_id = f"yunfei_batch_{idx}_at_{tstr.replace(':', '')}"
         scheduler.add_job(
-            fetch_and_check_batch_with_trade_plan,
+            job_timeline.instrument(fetch_and_check_batch_with_trade_plan, job_id, tstr),
             trigger=CronTrigger(hour=h, minute=m, second=s),
             args=[
                 idx,
@@ -282,7 +398,11 @@ def add_yunfei_jobs(scheduler: BackgroundScheduler, xt_trader, config, account_a
                 account
             ],
             id=job_id,
-            replace_existing=True
+            replace_existing=True,
+            executor=EXECUTOR_POLLING,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=60
         )
 
         # 使用统一的日志封装（避免暴露 "云飞跟投" 与策略名）
@@ -299,17 +419,24 @@ def add_seconds_to_hms(h: int, m: int, s: int, delta: int = 20):
     return nh, nm, ns
 
 def register_signal_handlers(scheduler, xt_trader):
+    """scheduler / xt_trader 可为单个对象或列表（多账户宿主）"""
     import signal
+    schedulers = scheduler if isinstance(scheduler, (list, tuple)) else [scheduler]
+    xt_traders = xt_trader if isinstance(xt_trader, (list, tuple)) else [xt_trader]
+
     def handle_exit(signum, frame):
         logging.info(f"收到终止信号({signum})，开始清理")
-        try:
-            scheduler.shutdown(wait=False)
-        except Exception:
-            logging.exception("scheduler 关闭异常")
-        try:
-            xt_trader.stop()
-        except Exception:
-            logging.exception("xt_trader 停止异常")
+        for sch in schedulers:
+            try:
+                sch.shutdown(wait=False)
+            except Exception:
+                logging.exception("scheduler 关闭异常")
+        precise_trigger.stop_all()
+        for trader in xt_traders:
+            try:
+                trader.stop()
+            except Exception:
+                logging.exception("xt_trader 停止异常")
         # 尽量清理子进程（参考原实现）
         try:
             parent = psutil.Process(os.getpid())
@@ -11,7 +11,7 @@ import re
 import ctypes
 from datetime import datetime
 
-from utils.log_utils import ensure_utf8_stdio, setup_logging
+from utils.log_utils import ensure_utf8_stdio, setup_logging, add_account_log_file
 from utils.config_loader import load_json_file
 from utils.stock_data_loader import load_stock_code_maps
 from utils.asset_helpers import positions_to_dict
@@ -19,13 +19,13 @@ from preprocessing.qmt_connector import ensure_qmt_and_connect
 from preprocessing.qmt_daily_restart_checker import check_and_restart
 from processor.trade_plan_generation import print_trade_plan as generate_trade_plan_final_func
 from utils.git_push_tool import push_project_to_github
+from utils import precise_trigger, job_timeline, account_context, readiness, process_registry, account_registry
 from xtquant.xttype import StockAccount
 from xtquant import xtdata
 
 # 本地拆分模块
 import helpers
 import tasks
-import psutil
 
 # 常量（保留你的原配置或改为外部配置）
 ACCOUNT_CONFIG_MAP = {
@@ -38,25 +38,15 @@ AUTO_BUY_511880_TIME = helpers.AUTO_BUY_511880_TIME
 AUTO_SELL_511880_TIME = helpers.AUTO_SELL_511880_TIME
 
 # PID file directory for ui-launched processes
-_PID_DIR = os.path.join("runtime", "pids")
+_PID_DIR = process_registry.PIDS_DIR
 
 
 def _write_ui_pid_file(ui_id: str):
     """
     Write a small pid file for the given ui_id. Returns path or None.
+    格式与写入由 utils.process_registry 统一（GUI 停止时按此文件 O(1) 定位进程）。
     """
-    try:
-        if not ui_id:
-            return None
-        os.makedirs(_PID_DIR, exist_ok=True)
-        fname = os.path.join(_PID_DIR, f"{ui_id}.pid")
-        with open(fname, "w", encoding="utf-8") as f:
-            f.write(f"pid: {os.getpid()}\n")
-            f.write(f"cmd: {' '.join(sys.argv)}\n")
-            f.write(f"started_at: {datetime.now().isoformat()}\n")
-        return fname
-    except Exception:
-        return None
+    return process_registry.write_ui_pid_file(ui_id)
 
 
 def _remove_ui_pid_file(path):
@@ -147,28 +137,12 @@ def _find_processes_by_exe_names(candidate_names):
     """
     Return list of psutil.Process for processes whose name() matches any in candidate_names (case-insensitive).
     candidate_names: list of strings like ['XtMiniQmt.exe', 'XtMiniQmt']
+    先查 runtime/pids 中记录的 QMT 进程（重启时写入），记录失效才遍历全部进程。
     """
-    procs = []
-    lower_names = [n.lower() for n in candidate_names]
-    for p in psutil.process_iter(['pid', 'name', 'exe', 'cmdline']):
-        try:
-            nm = (p.info.get('name') or "").lower()
-            exe = (p.info.get('exe') or "")
-            if nm in lower_names:
-                procs.append(p)
-                continue
-            # also check exe basename
-            be = os.path.basename(exe).lower() if exe else ""
-            if be in lower_names:
-                procs.append(p)
-                continue
-            # sometimes the cmdline contains exe path
-            cmd0 = (p.info.get('cmdline') or [])
-            if cmd0 and len(cmd0) > 0 and os.path.basename(cmd0[0]).lower() in lower_names:
-                procs.append(p)
-        except Exception:
-            continue
-    return procs
+    try:
+        return process_registry.find_qmt_processes(candidate_names)
+    except Exception:
+        return process_registry.scan_processes_by_names(candidate_names)
 
 
 def minimize_qmt_window_improved(timeout=10):
@@ -276,127 +250,29 @@ def minimize_window_by_title_regex(title_regex: str, timeout: float = 1.0) -> bo
 # -----------------------------------------------------------------------------
 
 
-def main():
-    ensure_utf8_stdio()
-    helpers.install_console_stream_filters()
-
-    # parse args here (include optional --ui-id for GUI-launched processes)
-    parser = argparse.ArgumentParser()
-    parser.add_argument('-a', '--account', required=True, help='账户别名或ID')
-    parser.add_argument('--ui-id', required=False, help='来自 GUI 的唯一进程标识（可选）')
-    args = None
-    try:
-        args = parser.parse_args()
-        account_name = args.account
-        ui_id = getattr(args, "ui_id", None)
-    except SystemExit:
-        # keep behaviour consistent with previous code: let SystemExit propagate
-        raise
-    except Exception as e:
-        print("解析参数失败:", e)
-        raise
-
-    # If GUI passed a ui_id, write a pid file and register cleanup handlers.
-    pidfile_path = None
-    if ui_id:
-        pidfile_path = _write_ui_pid_file(ui_id)
-        if pidfile_path:
-            # ensure pidfile is removed on normal exit
-            atexit.register(lambda: _remove_ui_pid_file(pidfile_path))
-
-            # signal cleanup: try to remove pidfile on abrupt termination as well
-            try:
-                import signal
-
-                def _safe_exit(signum, frame):
-                    _remove_ui_pid_file(pidfile_path)
-                    # re-raise default behavior / exit
-                    sys.exit(0)
-
-                signal.signal(signal.SIGTERM, _safe_exit)
-                signal.signal(signal.SIGINT, _safe_exit)
-                try:
-                    signal.signal(signal.SIGBREAK, _safe_exit)  # Windows
-                except Exception:
-                    pass
-            except Exception:
-                pass
-
-    # Single-instance check (same as before)
-    if not helpers.check_duplicate_instance('main.py', account_name):
-        print(f"账户[{account_name}]已有实例运行，退出")
-        sys.exit(0)
-
-    # Optionally set process title if ui_id is provided and setproctitle is installed
-    if ui_id:
-        try:
-            from setproctitle import setproctitle
-            try:
-                setproctitle(f"miniQMT:{ui_id}")
-            except Exception:
-                pass
-        except Exception:
-            # setproctitle not installed — it's optional
-            pass
+def _resolve_config_path(account_name):
+    """
+    账户别名或ID -> 配置文件路径；找不到返回 None。
+    由 utils.account_registry 按 映射表别名 / 文件名 / 文件内 account_id 建索引查找，不再逐个读取目录下文件。
+    """
+    account_registry.register_aliases(ACCOUNT_CONFIG_MAP)
+    config_path = account_registry.config_path(account_name)
+    if config_path:
+        logging.info(f"账户配置: {account_name} -> {config_path}")
+    return config_path
 
-    setup_logging(console=True, file=True, account_name=account_name)
-
-    logging.info("===============程序开始执行================")
-    logging.info(f"sys.argv = {sys.argv}")
-    logging.info(f"账户参数解析成功: {account_name}")
-    if ui_id:
-        logging.info(f"ui_id = {ui_id}, pidfile = {pidfile_path}")
-
-    # --- enhanced config lookup: try map, direct filename, then scan for matching account_id in files ---
-    config_path = ACCOUNT_CONFIG_MAP.get(account_name)
-    if not config_path:
-        # 1) try direct filename under core_parameters/account/{account_name}.json
-        direct_candidate = os.path.join("core_parameters", "account", f"{account_name}.json")
-        if os.path.exists(direct_candidate):
-            config_path = direct_candidate
-            logging.info(f"通过文件名直接找到账户配置: {config_path}")
-        else:
-            # 2) scan directory for json files whose content contains matching account_id
-            acc_dir = os.path.join("core_parameters", "account")
-            try:
-                if os.path.isdir(acc_dir):
-                    for fn in os.listdir(acc_dir):
-                        if not fn.lower().endswith(".json"):
-                            continue
-                        fp = os.path.join(acc_dir, fn)
-                        try:
-                            data = load_json_file(fp)
-                        except Exception:
-                            data = None
-                        if not data:
-                            continue
-                        # check common field names for account id
-                        candidate_ids = []
-                        if isinstance(data, dict):
-                            # standard field
-                            if data.get("account_id") is not None:
-                                candidate_ids.append(str(data.get("account_id")))
-                            # some configs might nest under "account" or other key
-                            if data.get("account") and isinstance(data.get("account"), dict):
-                                if data["account"].get("account_id") is not None:
-                                    candidate_ids.append(str(data["account"].get("account_id")))
-                            # fallback: check any top-level value that equals account_name
-                            for v in data.values():
-                                try:
-                                    if str(v) == str(account_name):
-                                        candidate_ids.append(str(account_name))
-                                except Exception:
-                                    pass
-                        if any(str(account_name) == cid for cid in candidate_ids):
-                            config_path = fp
-                            logging.info(f"通过文件内容匹配到账户配置: {config_path}")
-                            break
-            except Exception as e:
-                logging.debug(f"扫描 account 配置目录失败: {e}")
 
+def start_account(account_name):
+    """
+    启动单个账户：加载配置、连接 QMT、生成最终交易计划、布置并启动该账户的定时任务。
+    返回 {"name", "account_id", "scheduler", "xt_trader"}；失败返回 None。
+    多账户模式（--accounts）在同一进程内对每个账户各调用一次，
+    xtdata 行情订阅、合约信息缓存、符号表与策略页抓取均为进程内共享。
+    """
+    config_path = _resolve_config_path(account_name)
     if not config_path:
         logging.error("找不到账户配置，退出")
-        return
+        return None
 
     try:
         config = load_json_file(config_path)
@@ -404,36 +280,42 @@ def main():
     except Exception as e:
         logging.error(f"加载 config_path 出错：{e}")
         logging.error(traceback.format_exc())
-        return
+        return None
 
     path_qmt = config['path_qmt']
     session_id = config['session_id']
     account_id = config['account_id']
+    account_context.bind(account_name, account_id)
+    readiness.report(readiness.STAGE_CONFIG_LOADED, account_id, config_path=config_path)
     sell_time = config['sell_time']
     buy_time = config['buy_time']
     check_time_first = config['check_time_first']
     check_time_second = config['check_time_second']
 
-    # 检查 miniQMT 并保证连接（内部可能会自动重启并登录）
-    check_and_restart(config_path)
+    # 重启 / 自动登录 / 最小化窗口操作共享桌面（按标题聚焦窗口、剪贴板粘贴密码），
+    # 跨账户串行到 qmt_connected 为止；之后的快照、计划生成、调度各账户并行
+    with process_registry.qmt_desktop_session():
+        # 检查 miniQMT 并保证连接（内部可能会自动重启并登录）
+        check_and_restart(config_path)
 
-    # 初始化 xt_trader（回调在 helpers 中定义并注册）
-    xt_trader = helpers.init_xt_trader(path_qmt, session_id)
+        # 初始化 xt_trader（回调在 helpers 中定义并注册）
+        xt_trader = helpers.init_xt_trader(path_qmt, session_id, account_name, account_id)
 
-    # 确保 qmt 连接（会使用 xt_trader）
-    ensure_qmt_and_connect(config_path, xt_trader, logger=logging)
+        # 确保 qmt 连接（会使用 xt_trader）
+        ensure_qmt_and_connect(config_path, xt_trader, logger=logging)
+        readiness.report(readiness.STAGE_QMT_CONNECTED, account_id)
 
-    # At this point auto-login should have completed (if configured).
-    # Attempt to minimize the QMT window (Windows only). This is best-effort.
-    try:
-        # 增加更长的 timeout 以适应窗口创建/标题更新延迟
-        minimized = minimize_qmt_window_improved(timeout=12)
-        if minimized:
-            logging.info("在自动登录后已最小化 QMT 窗口（尝试成功）。")
-        else:
-            logging.info("未能找到或最小化 QMT 窗口（可能不是 Windows 或窗口标题/进程名不匹配）。")
-    except Exception as e:
-        logging.exception(f"尝试最小化 QMT 窗口时发生异常: {e}")
+        # At this point auto-login should have completed (if configured).
+        # Attempt to minimize the QMT window (Windows only). This is best-effort.
+        try:
+            # 增加更长的 timeout 以适应窗口创建/标题更新延迟
+            minimized = minimize_qmt_window_improved(timeout=12)
+            if minimized:
+                logging.info("在自动登录后已最小化 QMT 窗口（尝试成功）。")
+            else:
+                logging.info("未能找到或最小化 QMT 窗口（可能不是 Windows 或窗口标题/进程名不匹配）。")
+        except Exception as e:
+            logging.exception(f"尝试最小化 QMT 窗口时发生异常: {e}")
 
     # 加载股票代码与 reverse mapping
     try:
@@ -442,12 +324,13 @@ def main():
     except Exception as e:
         logging.error(f"加载股票代码失败: {e}")
         xt_trader.stop()
-        return
+        return None
 
     # 初始资产/持仓快照（用于生成交易计划）
     account_asset_info = helpers.print_account_asset(xt_trader, account_id)
     positions = helpers.print_positions(xt_trader, account_id, reverse_mapping, account_asset_info)
     positions_dict = positions_to_dict(positions)
+    readiness.report(readiness.STAGE_SNAPSHOT_TAKEN, account_id)
 
     # 生成最终交易计划（覆盖或创建文件）
     trade_plan_draft_file_path = 'tradeplan/trade_plan_draft.json'
@@ -463,16 +346,38 @@ def main():
         trade_plan_file=trade_plan_file
     )
 
+    # 行情推送订阅：计划代码 ∪ 持仓代码 ∪ 511880，之后取价优先读推送 tick 表
+    try:
+        from processor.trade_plan_execution import plan_codes
+        from utils.live_quotes import subscribe_for_account
+        subscribe_for_account(plan_codes(helpers.load_trade_plan(trade_plan_file) or {}), positions_dict)
+    except Exception as e:
+        logging.warning(f"行情订阅失败（取价将回退为拉取）: {e}")
+
+    # 定时任务时间线：xt_trader 换成计数代理，任务内的柜台调用计入 runtime/timeline
+    job_timeline.set_account(account_id)
+    xt_trader = job_timeline.CountingTrader(xt_trader)
+
     time.sleep(1)
     logging.info("布置定时任务")
-    scheduler = helpers.create_scheduler()
+    scheduler = helpers.create_scheduler(account_name=account_name, account_id=account_id)
 
     # 注册关键任务（使用 tasks 中的工厂）
+    # 卖出/买入对触发时刻敏感：使用独占线程的高精度触发器（config 中 precise_trigger=false 可退回 cron）
+    use_precise = bool(config.get('precise_trigger', True))
     sell_task = tasks.sell_execution_task_factory(xt_trader, account_id, trade_plan_file, trade_plan_draft_file_path)
-    helpers.add_cron_job(scheduler, sell_task, sell_time, job_id="sell_execution_task")
+    helpers.add_trigger_job(scheduler, sell_task, sell_time, "sell_execution_task", account_id=account_id, precise=use_precise)
 
     buy_task = tasks.buy_execution_task_factory(xt_trader, account_id, trade_plan_file, trade_plan_draft_file_path)
-    helpers.add_cron_job(scheduler, buy_task, buy_time, job_id="buy_execution_task")
+    helpers.add_trigger_job(scheduler, buy_task, buy_time, "buy_execution_task", account_id=account_id, precise=use_precise)
+
+    # 开盘前预热：sell_time 前 warmup_lead_seconds 秒（默认 45，配置 0 关闭）
+    warmup_lead = int(config.get('warmup_lead_seconds', 45) or 0)
+    if warmup_lead > 0:
+        s_h, s_m, s_s = map(int, sell_time.split(':'))
+        w_h, w_m, w_s = helpers.add_seconds_to_hms(s_h, s_m, s_s, -warmup_lead)
+        helpers.add_cron_job(scheduler, tasks.warmup_task_factory(xt_trader, account_id, trade_plan_file, trade_plan_draft_file_path),
+                             f"{w_h:02d}:{w_m:02d}:{w_s:02d}", job_id="pre_open_warmup", executor=helpers.EXECUTOR_TRADING)
 
     cancel_times = [check_time_first, check_time_second, "13:00:03"]
     cancel_jobs = []
@@ -480,7 +385,8 @@ def main():
         cancel_jobs.append({
             "func": tasks.cancel_and_reorder_task_factory(xt_trader, account_id, reverse_mapping),
             "time": t,
-            "id": f"cancel_and_reorder_task_{idx}"
+            "id": f"cancel_and_reorder_task_{idx}",
+            "executor": helpers.EXECUTOR_TRADING
         })
     helpers.add_multiple_cron_jobs(scheduler, cancel_jobs)
 
@@ -493,17 +399,21 @@ def main():
     # 511880 自动买卖
     buy_h, buy_m, buy_s = AUTO_BUY_511880_TIME
     buy_511880_job = tasks.buy_all_funds_to_511880_factory(xt_trader, account_id)
-    helpers.add_cron_job(scheduler, buy_511880_job, f"{buy_h:02d}:{buy_m:02d}:{buy_s:02d}", job_id="auto_buy_511880")
+    helpers.add_cron_job(scheduler, buy_511880_job, f"{buy_h:02d}:{buy_m:02d}:{buy_s:02d}", job_id="auto_buy_511880",
+                         executor=helpers.EXECUTOR_TRADING)
     chk_buy_h, chk_buy_m, chk_buy_s = helpers.add_seconds_to_hms(buy_h, buy_m, buy_s, 20)
     helpers.add_cron_job(scheduler, tasks.cancel_and_reorder_task_factory(xt_trader, account_id, reverse_mapping),
-                         f"{chk_buy_h:02d}:{chk_buy_m:02d}:{chk_buy_s:02d}", job_id="check_after_511880_buy")
+                         f"{chk_buy_h:02d}:{chk_buy_m:02d}:{chk_buy_s:02d}", job_id="check_after_511880_buy",
+                         executor=helpers.EXECUTOR_TRADING)
 
     sell_h, sell_m, sell_s = AUTO_SELL_511880_TIME
     sell_511880_job = tasks.sell_all_511880_factory(xt_trader, account_id)
-    helpers.add_cron_job(scheduler, sell_511880_job, f"{sell_h:02d}:{sell_m:02d}:{sell_s:02d}", job_id="auto_sell_511880")
+    helpers.add_cron_job(scheduler, sell_511880_job, f"{sell_h:02d}:{sell_m:02d}:{sell_s:02d}", job_id="auto_sell_511880",
+                         executor=helpers.EXECUTOR_TRADING)
     chk_sell_h, chk_sell_m, chk_sell_s = helpers.add_seconds_to_hms(sell_h, sell_m, sell_s, 20)
     helpers.add_cron_job(scheduler, tasks.cancel_and_reorder_task_factory(xt_trader, account_id, reverse_mapping),
-                         f"{chk_sell_h:02d}:{chk_sell_m:02d}:{chk_sell_s:02d}", job_id="check_after_511880_sell")
+                         f"{chk_sell_h:02d}:{chk_sell_m:02d}:{chk_sell_s:02d}", job_id="check_after_511880_sell",
+                         executor=helpers.EXECUTOR_TRADING)
 
     # 自动推送 frontend（保持原有 lambda 调用方式）
     helpers.add_cron_job(
@@ -518,6 +428,103 @@ def main():
     helpers.add_yunfei_jobs(scheduler, xt_trader, config, account_asset_info, positions_dict, StockAccount(account_id), generate_trade_plan_final_func)
 
     scheduler.start()
+    readiness.report(readiness.STAGE_SCHEDULER_STARTED, account_id)
+    return {"name": account_name, "account_id": account_id, "scheduler": scheduler, "xt_trader": xt_trader}
+
+
+def _stop_account(rt):
+    try:
+        rt["scheduler"].shutdown()
+    except Exception:
+        pass
+    try:
+        rt["xt_trader"].stop()
+    except Exception:
+        pass
+
+
+def main():
+    ensure_utf8_stdio()
+    helpers.install_console_stream_filters()
+
+    # parse args here (include optional --ui-id for GUI-launched processes)
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-a', '--account', help='账户别名或ID')
+    group.add_argument('--accounts', help='多账户模式：逗号分隔的账户别名或ID，在同一进程内运行')
+    parser.add_argument('--ui-id', required=False, help='来自 GUI 的唯一进程标识（可选）')
+    args = None
+    try:
+        args = parser.parse_args()
+        account_name = args.account
+        ui_id = getattr(args, "ui_id", None)
+    except SystemExit:
+        # keep behaviour consistent with previous code: let SystemExit propagate
+        raise
+    except Exception as e:
+        print("解析参数失败:", e)
+        raise
+
+    if args.accounts:
+        names = [n.strip() for n in args.accounts.split(',') if n.strip()]
+        return run_host(names, ui_id)
+
+    # If GUI passed a ui_id, write a pid file and register cleanup handlers.
+    pidfile_path = None
+    if ui_id:
+        pidfile_path = _write_ui_pid_file(ui_id)
+        if pidfile_path:
+            # ensure pidfile is removed on normal exit
+            atexit.register(lambda: _remove_ui_pid_file(pidfile_path))
+
+            # signal cleanup: try to remove pidfile on abrupt termination as well
+            try:
+                import signal
+
+                def _safe_exit(signum, frame):
+                    _remove_ui_pid_file(pidfile_path)
+                    # re-raise default behavior / exit
+                    sys.exit(0)
+
+                signal.signal(signal.SIGTERM, _safe_exit)
+                signal.signal(signal.SIGINT, _safe_exit)
+                try:
+                    signal.signal(signal.SIGBREAK, _safe_exit)  # Windows
+                except Exception:
+                    pass
+            except Exception:
+                pass
+
+    # Single-instance check (same as before)
+    if not helpers.check_duplicate_instance('main.py', account_name):
+        print(f"账户[{account_name}]已有实例运行，退出")
+        sys.exit(0)
+
+    # Optionally set process title if ui_id is provided and setproctitle is installed
+    if ui_id:
+        try:
+            from setproctitle import setproctitle
+            try:
+                setproctitle(f"miniQMT:{ui_id}")
+            except Exception:
+                pass
+        except Exception:
+            # setproctitle not installed — it's optional
+            pass
+
+    setup_logging(console=True, file=True, account_name=account_name)
+
+    logging.info("===============程序开始执行================")
+    logging.info(f"sys.argv = {sys.argv}")
+    logging.info(f"账户参数解析成功: {account_name}")
+    if ui_id:
+        logging.info(f"ui_id = {ui_id}, pidfile = {pidfile_path}")
+
+    rt = start_account(account_name)
+    if rt is None:
+        readiness.report(readiness.STAGE_FAILED, account_name)
+        return
+    scheduler, xt_trader = rt["scheduler"], rt["xt_trader"]
 
     # 信号注册（会在 handle_exit 中停止 scheduler 和 xt_trader）
     helpers.register_signal_handlers(scheduler, xt_trader)
@@ -528,17 +535,72 @@ def main():
     except (KeyboardInterrupt, SystemExit):
         logging.info("程序被手动终止。")
     finally:
-        try:
-            scheduler.shutdown()
-        except Exception:
-            pass
-        try:
-            xt_trader.stop()
-        except Exception:
-            pass
+        _stop_account(rt)
+        precise_trigger.stop_all()
         # remove pidfile if any (redundant with atexit but helps in case of direct exit paths)
         if ui_id and pidfile_path:
             _remove_ui_pid_file(pidfile_path)
+        process_registry.release_account_lock(account_name)
+        logging.info("交易线程已停止.")
+
+
+def run_host(account_names, ui_id=None):
+    """
+    多账户宿主：main.py --accounts shu,mama 在一个进程内运行多个账户。
+    每个账户各自的 XtQuantTrader、调度器与日志文件（zz_log/log_{账户}_YYYYMMDD.log，按线程账户上下文分流）；
+    宿主日志 log_host_..._YYYYMMDD.log 包含全部账户（带 [账户] 前缀）。单个账户启动失败不影响其余账户。
+    """
+    pidfile_path = _write_ui_pid_file(ui_id) if ui_id else None
+    if pidfile_path:
+        atexit.register(lambda: _remove_ui_pid_file(pidfile_path))
+
+    for name in account_names:
+        if not helpers.check_duplicate_instance('main.py', name):
+            print(f"账户[{name}]已有实例运行，退出")
+            sys.exit(0)
+
+    setup_logging(console=True, file=True, account_name="host_" + "_".join(account_names), tag_account=True)
+    for name in account_names:
+        add_account_log_file(name)
+
+    logging.info("===============多账户宿主开始执行================")
+    logging.info(f"sys.argv = {sys.argv}")
+    logging.info(f"账户列表: {account_names}")
+
+    runtimes = []
+    for name in account_names:
+        with account_context.use(name):
+            try:
+                rt = start_account(name)
+            except Exception as e:
+                logging.error(f"账户[{name}]启动异常: {e}")
+                logging.error(traceback.format_exc())
+                rt = None
+        if rt is None:
+            readiness.report(readiness.STAGE_FAILED, name)
+            logging.error(f"账户[{name}]启动失败，其余账户继续运行")
+        else:
+            runtimes.append(rt)
+    if not runtimes:
+        logging.error("没有成功启动的账户，退出")
+        return
+
+    helpers.register_signal_handlers([rt["scheduler"] for rt in runtimes], [rt["xt_trader"] for rt in runtimes])
+    logging.info(f"多账户宿主已就绪: {[rt['name'] for rt in runtimes]}")
+
+    try:
+        while True:
+            time.sleep(5)
+    except (KeyboardInterrupt, SystemExit):
+        logging.info("程序被手动终止。")
+    finally:
+        for rt in runtimes:
+            _stop_account(rt)
+        precise_trigger.stop_all()
+        if pidfile_path:
+            _remove_ui_pid_file(pidfile_path)
+        for name in account_names:
+            process_registry.release_account_lock(name)
         logging.info("交易线程已停止.")
 
 
@@ -5,6 +5,8 @@ import time
 import subprocess
 import logging
 
+from utils import process_registry
+
 def restart_self():
     """
     重启本main.py进程（原地拉起同参数的自己）
@@ -13,6 +15,19 @@ def restart_self():
     python = sys.executable
     os.execv(python, [python] + sys.argv)
 
+def _record_launched_qmt(popen, program_name, program_path):
+    """记录新拉起的 QMT pid（shell=True 时为 cmd 的子进程；cmd 已退出则留给下次查找时扫描补记）"""
+    try:
+        shell = psutil.Process(popen.pid)
+        for p in [shell] + shell.children(recursive=True):
+            if p.name().lower() == program_name.lower():
+                process_registry.record_qmt_process(program_path, p.pid)
+                logging.info(f"已记录 QMT 进程 pid={p.pid}")
+                return
+    except psutil.Error:
+        pass
+
+
 def qmt_restart_program(program_name, program_path, account_password: str = None):
     """
     只关闭指定路径和名称的QMT进程，并重启该程序。
@@ -20,21 +35,27 @@ def qmt_restart_program(program_name, program_path, account_password: str = None
 
     account_password: 可选，若提供则传给 preprocessing.qmt_auto_login.run_auto_fill_and_login
     """
+    # 重启 + 自动登录期间持有 QMT 桌面操作锁（跨进程），避免密码粘贴到其他账户的登录窗口；
+    # main.start_account 已持有时可重入
+    with process_registry.qmt_desktop_session():
+        _restart_and_login(program_name, program_path, account_password)
+
+
+def _restart_and_login(program_name, program_path, account_password=None):
     # 1. 关闭该账户相关的QMT进程
+    # 先按 runtime/pids 中上次启动时记录的 pid 定位（校验 exe 路径与创建时间），记录失效才遍历全部进程
     closed = False
-    for process in psutil.process_iter(['pid', 'name', 'exe', 'cmdline']):
-        # 检查进程名和exe路径是否都匹配（防止影响其他账户QMT）
-        exe_match = process.info.get('exe') and os.path.normcase(process.info['exe']) == os.path.normcase(program_path)
-        name_match = process.info.get('name') and process.info['name'].lower() == program_name.lower()
-        if exe_match and name_match:
-            logging.info(f"正在关闭任务: {program_name} (PID: {process.info['pid']}) 路径: {process.info['exe']}")
-            try:
-                process.terminate()
-                process.wait(timeout=5)
-                logging.info(f"任务 {program_name} 已关闭。")
-                closed = True
-            except Exception as e:
-                logging.warning(f"关闭进程 {process.info['pid']} 失败: {e}")
+    for process in process_registry.find_qmt_processes([program_name], program_path):
+        pid = process.pid
+        logging.info(f"正在关闭任务: {program_name} (PID: {pid}) 路径: {program_path}")
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+            logging.info(f"任务 {program_name} 已关闭。")
+            closed = True
+        except Exception as e:
+            logging.warning(f"关闭进程 {pid} 失败: {e}")
+    process_registry.forget_qmt_process(program_path)
     if not closed:
         logging.info(f"没有找到路径和名称都匹配的QMT进程，无需关闭。")
     # 2. 等待一段时间确保任务完全关闭
@@ -42,10 +63,11 @@ def qmt_restart_program(program_name, program_path, account_password: str = None
     # 3. 打开程序
     if os.path.exists(program_path):
         logging.info(f"正在打开程序: {program_path}")
-        subprocess.Popen(program_path, shell=True)
+        popen = subprocess.Popen(program_path, shell=True)
         logging.info(f"程序 {program_name} 已成功启动。")
         logging.info(f"请输入账号信息，4秒后将继续连接。")
         time.sleep(4)
+        _record_launched_qmt(popen, program_name, program_path)
 
         # === 自动登录尝试（安全、可回退） ===
         # 在程序启动并等待一定时间后，尝试调用 preprocessing.qmt_auto_login.run_auto_fill_and_login(silent=True, password=...)
@@ -3,29 +3,12 @@ from tabulate import tabulate
 import os
 import json
 import logging
-import tempfile
 import datetime
 
-def _atomic_write_json(path, data):
-    """
-    原子写 JSON：先写入临时文件再替换目标文件，避免中间状态文件。
-    """
-    dirpath = os.path.dirname(path)
-    os.makedirs(dirpath, exist_ok=True)
-    fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix=".tmp_", suffix=".json")
-    try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        # 原子替换
-        os.replace(tmp_path, path)
-    except Exception:
-        # 若失败，确保临时文件被清理
-        try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
-        raise
+from utils.account_store import get_account_store, json_export_enabled
+from utils.persistence import write_json_async
+from utils.account_changes import record_asset
+
 
 def print_account_asset(trader, account_id):
     """
@@ -102,20 +85,33 @@ def print_account_asset(trader, account_id):
             "percent_market": percent_market,
         }
 
-        # 保存每个账号的最新资产信息到 account_data/assets/asset_{account_id}.json
+        # 写入账户状态库（SQLite，保留历史快照；后台批量落盘，不阻塞）
+        snapshot_ts = datetime.datetime.now().isoformat()
         try:
-            save_dir = os.path.join("account_data", "assets")
-            os.makedirs(save_dir, exist_ok=True)
-            # 注意：文件名使用传入参数 account_id（ID），保证与后续读取一致
-            save_path = os.path.join(save_dir, f"asset_{str(account_id)}.json")
-            data_to_save = {
-                "last_update": datetime.datetime.now().isoformat(),
-                "asset": asset_dict
-            }
-            _atomic_write_json(save_path, data_to_save)
-            logging.info(f"已写入账户资产文件: {save_path} account_id={str(account_id)} total_asset={asset_dict['total_asset']}")
+            record_asset(str(account_id), asset_dict, snapshot_ts)
         except Exception as e:
-            logging.exception(f"写入账户资产文件失败: {e}")
+            logging.exception(f"计算资产变化失败: {e}")
+        try:
+            get_account_store().write_asset(str(account_id), asset_dict, ts=snapshot_ts)
+        except Exception as e:
+            logging.exception(f"写入账户状态库失败: {e}")
+
+        # 可选导出：每个账号的最新资产信息 account_data/assets/asset_{account_id}.json（ACCOUNT_JSON_EXPORT=0 关闭）
+        if json_export_enabled():
+            try:
+                save_dir = os.path.join("account_data", "assets")
+                os.makedirs(save_dir, exist_ok=True)
+                # 注意：文件名使用传入参数 account_id（ID），保证与后续读取一致
+                save_path = os.path.join(save_dir, f"asset_{str(account_id)}.json")
+                data_to_save = {
+                    "last_update": snapshot_ts,
+                    "asset": asset_dict
+                }
+                # 导出文件非关键：后台落盘，不占用作业时间
+                write_json_async(save_path, data_to_save, label="asset_export")
+                logging.info(f"已提交账户资产文件: {save_path} account_id={str(account_id)} total_asset={asset_dict['total_asset']}")
+            except Exception as e:
+                logging.exception(f"写入账户资产文件失败: {e}")
 
         # 控制写入模板的期望账号（可通过环境变量覆盖）
         EXPECTED_TEMPLATE_ACCOUNT_ID = os.getenv("EXPECTED_TEMPLATE_ACCOUNT_ID", "8886006288")
@@ -127,7 +123,7 @@ def print_account_asset(trader, account_id):
             if should_save_template:
                 save_dir = "template_account_info"
                 save_path = os.path.join(save_dir, "template_account_asset_info.json")
-                _atomic_write_json(save_path, asset_dict)
+                write_json_async(save_path, dict(asset_dict), pretty=True, label="asset_template")
                 logging.info(f"已写入本地模板: {save_path} account_id={str(account_id)} total_asset={asset_dict['total_asset']}")
             else:
                 logging.info(f"跳过写入本地模板（非期望账号 {EXPECTED_TEMPLATE_ACCOUNT_ID}），当前 account_id={str(account_id)}")
@@ -138,7 +134,7 @@ def print_account_asset(trader, account_id):
             if should_save_template:
                 fe_save_dir = r"C:\Users\ceicei\PycharmProjects\miniQMT-frontend\public\template_account_info"
                 fe_save_path = os.path.join(fe_save_dir, "template_account_asset_info.json")
-                _atomic_write_json(fe_save_path, asset_dict)
+                write_json_async(fe_save_path, dict(asset_dict), pretty=True, label="asset_template")
                 logging.info(f"已写入前端模板: {fe_save_path} account_id={str(account_id)} total_asset={asset_dict['total_asset']}")
             else:
                 logging.info(f"跳过写入前端模板（非期望账号 {EXPECTED_TEMPLATE_ACCOUNT_ID}）")
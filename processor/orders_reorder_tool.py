@@ -1,9 +1,11 @@
 from xtquant.xttype import StockAccount
-from xtquant import xtconstant, xtdata
+from xtquant import xtconstant
 from datetime import datetime, timedelta
 import os
 import json
 import logging
+from utils.live_quotes import get_live_quotes
+from processor.trade_plan_execution import get_instrument_detail_cached
 REORDER_RECORD_DIR = "runtime/reorder_records"
 def _get_today_reorder_record_file():
     today_str = datetime.now().strftime("%Y%m%d")
@@ -105,9 +107,8 @@ def reorder_orders(trader, account_id, code_to_name_dict, window_min=10, price_o
         left_volume = (left_volume // min_hand) * min_hand
 
         try:
-            full_tick = xtdata.get_full_tick([stock_code])
-            current_price = full_tick[stock_code]['lastPrice']
-            instrument_detail = xtdata.get_instrument_detail(stock_code)
+            current_price = get_live_quotes().get_tick(stock_code)['lastPrice']
+            instrument_detail = get_instrument_detail_cached(stock_code)
             if not instrument_detail:
                 logging.warning(f"⚠️ 未能获取 {stock_code} 的详细信息，跳过重下单")
                 continue
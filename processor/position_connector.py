@@ -6,26 +6,10 @@ import json
 import logging
 import datetime
 
-def _atomic_write_json(path, data):
-    """
-    原子写 JSON：先写入临时文件再替换目标文件，避免中间状态文件。
-    （与 asset_connector.py 中的实现保持一致，独立定义以避免循环依赖）
-    """
-    import tempfile
-    dirpath = os.path.dirname(path)
-    os.makedirs(dirpath, exist_ok=True)
-    fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix=".tmp_", suffix=".json")
-    try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_path, path)
-    except Exception:
-        try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
-        raise
+from utils.account_store import get_account_store, json_export_enabled
+from utils.persistence import write_json_async
+from utils.account_changes import record_positions
+
 
 def print_positions(trader, account_id, code_to_name_dict, account_asset_info):
     """
@@ -91,51 +75,63 @@ def print_positions(trader, account_id, code_to_name_dict, account_asset_info):
 
             result.append((stock_code, percent_position))
 
-        # 将每个账号的持仓保存到 account_data/positions/position_{account_id}.json
+        # 持仓快照：写入账户状态库（SQLite，保留历史），并可选导出
+        # account_data/positions/position_{account_id}.json（ACCOUNT_JSON_EXPORT=0 关闭）
+        snapshot_ts = datetime.datetime.now().isoformat()
+        positions_list = []
+        for p in positions:
+            avg_price = nan_to_none(getattr(p, "avg_price", None))
+            market_value = nan_to_none(getattr(p, "market_value", None))
+            positions_list.append({
+                "stock_code": getattr(p, "stock_code", ""),
+                "stock_name": code_to_name_dict.get(getattr(p, "stock_code", "").split('.')[0], '未知股票'),
+                "volume": getattr(p, "volume", 0),
+                "can_use_volume": getattr(p, "can_use_volume", 0),
+                "avg_price": avg_price,
+                "market_value": market_value
+            })
+        # 与上一次快照比较，变化写入 account_data/changes/ 变更流（须在写入状态库之前）
+        try:
+            changes = record_positions(str(account_id), positions_list, snapshot_ts)
+            if changes:
+                logging.info(f"持仓变化 {len(changes)} 项: " + "; ".join(f"{c['type']} {c['stock_code']}" for c in changes))
+        except Exception as e:
+            logging.exception(f"计算持仓变化失败: {e}")
         try:
-            save_dir = os.path.join("account_data", "positions")
-            os.makedirs(save_dir, exist_ok=True)
-            # 保证 filename 使用传入的 account_id（ID），与读取逻辑一致
-            save_path = os.path.join(save_dir, f"position_{str(account_id)}.json")
-            positions_list = []
-            for p in positions:
-                avg_price = nan_to_none(getattr(p, "avg_price", None))
-                market_value = nan_to_none(getattr(p, "market_value", None))
-                positions_list.append({
-                    "stock_code": getattr(p, "stock_code", ""),
-                    "stock_name": code_to_name_dict.get(getattr(p, "stock_code", "").split('.')[0], '未知股票'),
-                    "volume": getattr(p, "volume", 0),
-                    "can_use_volume": getattr(p, "can_use_volume", 0),
-                    "avg_price": avg_price,
-                    "market_value": market_value
-                })
-            data_to_save = {
-                "last_update": datetime.datetime.now().isoformat(),
-                "positions": positions_list
-            }
-            _atomic_write_json(save_path, data_to_save)
-            logging.info(f"已写入账户持仓文件: {save_path} account_id={str(account_id)} positions_count={len(positions_list)}")
+            get_account_store().write_positions(str(account_id), positions_list, ts=snapshot_ts)
         except Exception as e:
-            logging.exception(f"写入账户持仓文件失败: {e}")
+            logging.exception(f"写入账户状态库失败: {e}")
+
+        if json_export_enabled():
+            try:
+                save_dir = os.path.join("account_data", "positions")
+                os.makedirs(save_dir, exist_ok=True)
+                # 保证 filename 使用传入的 account_id（ID），与读取逻辑一致
+                save_path = os.path.join(save_dir, f"position_{str(account_id)}.json")
+                data_to_save = {
+                    "last_update": snapshot_ts,
+                    "positions": positions_list
+                }
+                # 导出文件非关键：后台落盘，不占用作业时间
+                write_json_async(save_path, data_to_save, label="position_export")
+                logging.info(f"已提交账户持仓文件: {save_path} account_id={str(account_id)} positions_count={len(positions_list)}")
+            except Exception as e:
+                logging.exception(f"写入账户持仓文件失败: {e}")
 
         # 兼容旧逻辑：如果是模板账号，仍然写入 template_account_info 和前端目录（保留原有行为）
         try:
             if account_id == "8886006288":
                 save_dir = "template_account_info"
                 save_path = os.path.join(save_dir, "template_account_position_info.json")
-                os.makedirs(save_dir, exist_ok=True)
                 data_to_save_template = {
                     "last_update": datetime.datetime.now().isoformat(),
                     "positions": positions_list
                 }
-                with open(save_path, "w", encoding="utf-8") as f:
-                    json.dump(data_to_save_template, f, ensure_ascii=False, indent=2)
+                write_json_async(save_path, data_to_save_template, pretty=True, label="position_template")
                 # 额外保存到前端 public 目录
                 fe_save_dir = r"C:\Users\ceicei\PycharmProjects\miniQMT-frontend\public\template_account_info"
                 fe_save_path = os.path.join(fe_save_dir, "template_account_position_info.json")
-                os.makedirs(fe_save_dir, exist_ok=True)
-                with open(fe_save_path, "w", encoding="utf-8") as f:
-                    json.dump(data_to_save_template, f, ensure_ascii=False, indent=2)
+                write_json_async(fe_save_path, data_to_save_template, pretty=True, label="position_template")
         except Exception as e:
             logging.exception(f"写入 template/前端 持仓文件失败: {e}")
 
@@ -10,6 +10,7 @@ import logging
 from typing import Optional, Dict, Any
 
 from utils.code_normalizer import normalize_code, match_available_code_in_dict, canonical_variants
+from utils.live_quotes import get_live_quotes
 from xtquant import xtdata
 from xtquant.xttype import StockAccount
 
@@ -43,13 +44,60 @@ def _get_board_lot(detail: dict, default_lot: int = 100) -> int:
     except Exception:
         return default_lot
 
+# 合约基础信息缓存（按自然日失效：涨跌停价等每日变化，板块手数等不变）
+_detail_cache: Dict[str, dict] = {}
+_detail_cache_day: Optional[str] = None
+
+def get_instrument_detail_cached(code: str) -> dict:
+    """xtdata.get_instrument_detail 的当日缓存；失败返回 {}（不缓存失败结果）"""
+    global _detail_cache_day
+    today = datetime.date.today().isoformat()
+    if _detail_cache_day != today:
+        _detail_cache.clear()
+        _detail_cache_day = today
+    hit = _detail_cache.get(code)
+    if hit is not None:
+        return hit
+    try:
+        detail = xtdata.get_instrument_detail(code) or {}
+    except Exception:
+        detail = {}
+    if detail:
+        _detail_cache[code] = detail
+    return detail
+
+def plan_codes(trade_plan: dict) -> list:
+    """交易计划中出现的全部代码（规范化、去重、保持顺序）"""
+    codes = []
+    for side in ("sell", "buy"):
+        for item in (trade_plan or {}).get(side, []) or []:
+            stock = item.get("code") or item.get("stock_code") or item.get("stock")
+            if stock:
+                nc = normalize_code(stock)
+                if nc not in codes:
+                    codes.append(nc)
+    return codes
+
+def prefetch_for_plan(trade_plan: dict) -> Dict[str, int]:
+    """预热：拉取计划内全部代码的合约信息（写入缓存），订阅其行情并取一次快照；返回各项数量"""
+    codes = plan_codes(trade_plan)
+    details = sum(1 for c in codes if get_instrument_detail_cached(c))
+    ticks = 0
+    if codes:
+        try:
+            get_live_quotes().subscribe(codes)
+            ticks = len(get_live_quotes().get_ticks(codes))
+        except Exception:
+            ticks = 0
+    return {"codes": len(codes), "details": details, "ticks": ticks}
+
 def _safe_get_tick(stock: str, side: str = "sell") -> dict:
     """
-    get tick from xtdata; returns {} on failure
+    get tick from the live quote table (falls back to get_full_tick when stale); returns {} on failure
     side used to pick bid/ask if necessary.
     """
     try:
-        tick = xtdata.get_full_tick([stock]).get(stock) or {}
+        tick = get_live_quotes().get_tick(stock) or {}
         return tick
     except Exception:
         return {}
@@ -170,10 +218,7 @@ def execute_trade_plan(trader, account: StockAccount, trade_plan: dict, action:
                 continue
 
             # determine board lot and lots to sell (round down to board lot)
-            try:
-                detail = xtdata.get_instrument_detail(matched_key or norm_code) or {}
-            except Exception:
-                detail = {}
+            detail = get_instrument_detail_cached(matched_key or norm_code)
             board_lot = _get_board_lot(detail, default_lot=100)
             lots_to_sell = (can_use_volume // board_lot) * board_lot
             if lots_to_sell <= 0:
@@ -225,7 +270,7 @@ def execute_trade_plan(trader, account: StockAccount, trade_plan: dict, action:
                 break
 
             # get price and board_lot
-            detail = xtdata.get_instrument_detail(norm_code) or {}
+            detail = get_instrument_detail_cached(norm_code)
             board_lot = _get_board_lot(detail, default_lot=100)
             tick = _safe_get_tick(norm_code, side="buy")
             price = _extract_working_price(tick, side="buy")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+bench_log_view.py
+
+对比日志窗口两种刷新方式在高频输出下的 CPU 占用与界面响应：
+  legacy  : 每行 after(0, ...)，清空 Text 后重新插入最近 500 行（旧 AccountProcess.update_log）
+  batched : gui.log_view.LogModel + LogView，每 100ms 一次性追加新增行并从顶部裁剪
+
+一个后台线程按 --rate 行/秒 持续产生日志（模拟开盘时段子进程输出），
+主线程跑 Tk 事件循环；同时用 50ms 心跳测量事件循环延迟（界面卡顿程度）。
+需要图形环境（Tk 能创建窗口）；只用标准库 tkinter，不依赖 ttkbootstrap。
+
+Usage:
+  python scripts/bench_log_view.py
+  python scripts/bench_log_view.py --rate 1000 --duration 10 --modes legacy,batched
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+from tkinter.scrolledtext import ScrolledText
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from gui.log_view import LogModel, LogView  # noqa: E402
+
+HEARTBEAT_MS = 50
+
+
+def _producer(emit, rate, duration, stop):
+    """按固定速率调用 emit(line)，返回实际产生的行数"""
+    count = 0
+    t0 = time.perf_counter()
+    interval = 1.0 / rate
+    while not stop.is_set():
+        elapsed = time.perf_counter() - t0
+        if elapsed >= duration:
+            break
+        due = int(elapsed / interval) + 1
+        while count < due:
+            count += 1
+            emit(f"2025-01-02 09:30:{count % 60:02d} - INFO - [bench] 委托回调 order_id={count} 成交价格: 1.234 数量: 100\n")
+        time.sleep(0.001)
+    return count
+
+
+def run_mode(mode, rate, duration):
+    root = tk.Tk()
+    root.title(f"bench_log_view - {mode}")
+    text = ScrolledText(root, height=20, width=100)
+    text.pack(fill="both", expand=True)
+
+    lags = []
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        lags.append(now - last[0] - HEARTBEAT_MS / 1000.0)
+        last[0] = now
+        root.after(HEARTBEAT_MS, heartbeat)
+
+    if mode == "legacy":
+        buf = []
+        lock = threading.Lock()
+
+        def update_log():
+            with lock:
+                log = "".join(buf[-500:])
+            text.delete(1.0, "end")
+            text.insert("end", log)
+            text.see("end")
+
+        def emit(line):
+            with lock:
+                buf.append(line)
+                if len(buf) > 1000:
+                    del buf[:-1000]
+            root.after(0, update_log)
+        view = None
+    else:
+        model = LogModel(1000)
+        view = LogView(text, model, max_lines=500)
+        view.start()
+        emit = model.append
+
+    stop = threading.Event()
+    produced = [0]
+    worker = threading.Thread(target=lambda: produced.__setitem__(0, _producer(emit, rate, duration, stop)), daemon=True)
+
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    root.after(HEARTBEAT_MS, heartbeat)
+    worker.start()
+
+    def check_done():
+        if worker.is_alive():
+            root.after(100, check_done)
+        else:
+            root.quit()
+
+    root.after(100, check_done)
+    root.mainloop()
+    # 把积压的回调跑完，计入总耗时
+    drain0 = time.perf_counter()
+    root.update()
+    drain = time.perf_counter() - drain0
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    if view is not None:
+        view.stop()
+    root.destroy()
+    stop.set()
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    return {
+        "mode": mode,
+        "lines": produced[0],
+        "wall": wall,
+        "cpu_pct": cpu / wall * 100.0 if wall > 0 else 0.0,
+        "lag_p99_ms": p99 * 1000.0,
+        "lag_max_ms": (max(lags) if lags else 0.0) * 1000.0,
+        "drain_ms": drain * 1000.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="日志窗口刷新方式的 CPU / 响应对比")
+    ap.add_argument("--rate", type=int, default=1000, help="每秒产生的日志行数")
+    ap.add_argument("--duration", type=float, default=10.0, help="每种方式的运行秒数")
+    ap.add_argument("--modes", default="legacy,batched", help="逗号分隔：legacy,batched")
+    args = ap.parse_args()
+
+    results = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        print(f"[{mode}] {args.rate} 行/秒，运行 {args.duration:.0f}s ...", flush=True)
+        results.append(run_mode(mode, args.rate, args.duration))
+
+    print()
+    print(f"{'方式':<10}{'行数':>8}{'耗时(s)':>10}{'CPU%':>8}{'延迟P99(ms)':>14}{'最大延迟(ms)':>14}{'积压(ms)':>10}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['lines']:>8}{r['wall']:>10.1f}{r['cpu_pct']:>8.1f}{r['lag_p99_ms']:>14.1f}"
+              f"{r['lag_max_ms']:>14.1f}{r['drain_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+bench_persistence.py
+
+对比旧的 JSON 落盘方式（indent=2 + fsync / indent=2 原子替换）与 utils.persistence 的各策略，
+统计“作业内耗时”（调用方被阻塞的时间）。负载模拟一次交易作业中的典型写入：
+资产导出、持仓导出（可调行数）、若干策略草稿、一次合并计划。
+
+Usage:
+  python scripts/bench_persistence.py
+  python scripts/bench_persistence.py --rounds 50 --positions 120 --drafts 8
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils import persistence  # noqa: E402
+from utils.persistence import (  # noqa: E402
+    write_json, write_json_async, flush_pending,
+    DURABILITY_NONE, DURABILITY_ATOMIC, DURABILITY_FSYNC,
+)
+
+
+def make_payloads(n_positions, n_drafts):
+    asset = {"account_id": "8886006288", "cash": 123456.78, "frozen_cash": 0.0, "market_value": 987654.32,
+             "total_asset": 1111111.1, "percent_cash": 11.11, "percent_frozen": 0.0, "percent_market": 88.89}
+    positions = [{"stock_code": f"{600000 + i}.SH", "stock_name": f"测试证券{i}", "volume": 1000 + i,
+                  "can_use_volume": 1000 + i, "avg_price": 10.0 + i / 100, "market_value": 10000.0 + i}
+                 for i in range(n_positions)]
+    draft = {"sell_stocks_info": [{"name": "黄金ETF", "code": "518880.SH", "ratio": "0.2", "sample_amount": 100000.0}],
+             "buy_stocks_info": [{"name": "国债ETF", "code": "511010.SH", "ratio": "0.2", "sample_amount": 100000.0}],
+             "meta": {"batch_no": 1, "strategy_id": "123", "account_id": "8886006288",
+                      "created_at": "2026-01-01T09:30:00"}}
+    out = [("asset.json", {"last_update": "2026-01-01T09:30:00", "asset": asset}, "export"),
+           ("position.json", {"last_update": "2026-01-01T09:30:00", "positions": positions}, "export")]
+    out += [(f"draft_{i}.json", draft, "draft") for i in range(n_drafts)]
+    out.append(("merged.json", {"sell": draft["sell_stocks_info"] * n_drafts,
+                                "buy": draft["buy_stocks_info"] * n_drafts}, "merge"))
+    return out
+
+
+def legacy_write(path, obj, fsync):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def run(label, workdir, payloads, rounds, writer):
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for name, obj, kind in payloads:
+            writer(os.path.join(workdir, name), obj, kind)
+        samples.append(time.perf_counter() - t0)
+    flush_pending()
+    samples.sort()
+    avg = sum(samples) / len(samples) * 1000
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+    print(f"{label:<44} avg {avg:8.2f} ms   p95 {p95:8.2f} ms   (每轮 {len(payloads)} 个文件)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=30)
+    ap.add_argument("--positions", type=int, default=80)
+    ap.add_argument("--drafts", type=int, default=6)
+    ap.add_argument("--dir", default=None, help="测试目录（默认系统临时目录；要测真实磁盘请指向账户数据所在盘）")
+    args = ap.parse_args()
+
+    payloads = make_payloads(args.positions, args.drafts)
+    workdir = tempfile.mkdtemp(prefix="bench_persist_", dir=args.dir)
+    print(f"codec={persistence.CODEC_NAME} dir={workdir}")
+    try:
+        run("旧实现: indent=2 + fsync（全部）", workdir, payloads, args.rounds,
+            lambda p, o, k: legacy_write(p, o, fsync=True))
+        run("旧实现: indent=2 原子替换（不 fsync）", workdir, payloads, args.rounds,
+            lambda p, o, k: legacy_write(p, o, fsync=False))
+        run("persistence: 全部 FSYNC", workdir, payloads, args.rounds,
+            lambda p, o, k: write_json(p, o, durability=DURABILITY_FSYNC))
+        run("persistence: 全部 ATOMIC", workdir, payloads, args.rounds,
+            lambda p, o, k: write_json(p, o, durability=DURABILITY_ATOMIC))
+        run("persistence: 全部 NONE", workdir, payloads, args.rounds,
+            lambda p, o, k: write_json(p, o, durability=DURABILITY_NONE))
+
+        def production(p, o, k):
+            # 与当前接线一致：导出走后写队列，草稿原子写，合并计划 fsync
+            if k == "export":
+                write_json_async(p, o)
+            elif k == "draft":
+                write_json(p, o, durability=DURABILITY_ATOMIC)
+            else:
+                write_json(p, o, durability=DURABILITY_FSYNC)
+        run("persistence: 当前接线（导出后台/草稿原子/合并fsync）", workdir, payloads, args.rounds, production)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+check_name_annotator.py
+
+utils.name_annotator 的回归用例：名称标注必须在分隔处结束（空白 / 数字 / % / 标点 / 结尾），
+只是更长证券名前缀的名称（如 '芯片' 之于 '芯片设计ETF'）不得被标注，否则 parse_trade_operations 会交易错代码。
+
+默认用固定的 name->code 映射校验；加 --symbol-table 时再用真实符号表跑一遍（需 core_parameters 数据齐全）。
+
+Usage:
+  python scripts/check_name_annotator.py
+  python scripts/check_name_annotator.py --symbol-table
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.name_annotator import NameAnnotator  # noqa: E402
+
+NAME_TO_CODE = {
+    "芯片": "159995.SZ",
+    "中证500ETF": "159922.SZ",
+    "标普500ETF": "159612.SZ",
+    "黄金ETF": "518880.SH",
+    "纳指ETF": "513100.SH",
+}
+
+# (输入, 期望输出)
+CASES = [
+    # 前缀匹配不标注
+    ("卖出 芯片设计ETF 5%", "卖出 芯片设计ETF 5%"),
+    ("买入 中证500ETF增强", "买入 中证500ETF增强"),
+    ("买入 标普500ETF基金", "买入 标普500ETF基金"),
+    # 正常标注：后接空白 / 数字 / % / 标点 / 结尾
+    ("卖出 芯片 5%", "卖出 芯片(159995.SZ) 5%"),
+    ("买入 中证500ETF 10%", "买入 中证500ETF(159922.SZ) 10%"),
+    ("买入黄金ETF20%", "买入 黄金ETF(518880.SH)20%"),
+    ("买入 标普500ETF", "买入 标普500ETF(159612.SZ)"),
+    ("卖出 纳指ETF，买入 黄金ETF 20%", "卖出 纳指ETF(513100.SH)，买入 黄金ETF(518880.SH) 20%"),
+    # 已带代码保持原样
+    ("买入 黄金ETF(518880.SH) 20%", "买入 黄金ETF(518880.SH) 20%"),
+]
+
+# 真实符号表下只校验“不得误标注”的用例
+SYMBOL_TABLE_NO_ANNOTATION = ["卖出 芯片设计ETF 5%", "买入 中证500ETF增强", "买入 标普500ETF基金"]
+
+
+def _run(annotator, cases):
+    failed = 0
+    for text, expected in cases:
+        got = annotator.annotate(text)
+        ok = got == expected
+        failed += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {text!r} -> {got!r}" + ("" if ok else f"  期望 {expected!r}"))
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="名称标注回归用例")
+    ap.add_argument("--symbol-table", action="store_true", help="同时用真实符号表校验前缀误标注用例")
+    args = ap.parse_args()
+
+    failed = _run(NameAnnotator(NAME_TO_CODE), CASES)
+    if args.symbol_table:
+        from utils.name_annotator import get_annotator
+        ann = get_annotator()
+        for text in SYMBOL_TABLE_NO_ANNOTATION:
+            got = ann.annotate(text)
+            # 符号表中若有完整名称可以标注，但不允许只标注其前缀
+            token = text.split()[1]
+            name = got.split(" ", 1)[1].split("(")[0]
+            bad = "(" in got and len(name) < len(token)
+            failed += bad
+            print(f"[{'FAIL' if bad else 'OK'}] {text!r} -> {got!r}")
+    print(f"\n失败 {failed} 条" if failed else "\n全部通过")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
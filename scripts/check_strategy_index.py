@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+check_strategy_index.py
+
+对录制的 b_follow 页面校验 StrategyIndex 与旧线性查找（find_strategy_linear）结果一致，
+并给出两者的查找耗时对比。
+
+数据来源：
+  - yunfei_ball/fetch_cache/archive/ 归档中的历史页面（html 用旧解析器重新解析，items 直接使用）
+  - yunfei_ball/fetch_cache/latest_items.json（如存在）
+配置：yunfei_ball/allocation.json，外加对每条配置做的扰动（改 ID 末位 / 去掉名称前缀 / 空 ID）
+
+Usage:
+  python scripts/check_strategy_index.py
+  python scripts/check_strategy_index.py --days 5 --max-pages 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from yunfei_ball.strategy_index import StrategyIndex, find_strategy_linear  # noqa: E402
+
+ALLOCATION_PATH = os.path.join(ROOT, "yunfei_ball", "allocation.json")
+LATEST_ITEMS_PATH = os.path.join(ROOT, "yunfei_ball", "fetch_cache", "latest_items.json")
+
+
+def load_configs():
+    with open(ALLOCATION_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    cfgs = list(base)
+    for c in base:
+        name = str(c.get("策略名称", ""))
+        sid = str(c.get("策略ID", ""))
+        if sid:
+            cfgs.append(dict(c, 策略ID=sid[:-1] + str((int(sid[-1]) + 1) % 10) if sid[-1].isdigit() else sid))
+        cfgs.append(dict(c, 策略ID=""))
+        if len(name) > 3:
+            cfgs.append(dict(c, 策略名称=name[2:]))
+            cfgs.append(dict(c, 策略名称="X" + name))
+    return cfgs
+
+
+def iter_recorded_pages(days, max_pages):
+    n = 0
+    try:
+        from yunfei_ball.fetch_archive import iter_pages
+        start = datetime.now() - timedelta(days=days)
+        legacy_parse = None
+        for page in iter_pages(start=start):
+            if page.get("html"):
+                if legacy_parse is None:
+                    from yunfei_ball.yunfei_connect_follow import parse_b_follow_page as legacy_parse
+                yield f"{page['ts']} (legacy parser)", legacy_parse(page["html"])
+            if page.get("items"):
+                yield f"{page['ts']} (items)", page["items"]
+            n += 1
+            if max_pages and n >= max_pages:
+                return
+    except Exception as e:
+        print(f"读取归档失败: {e}")
+    if os.path.exists(LATEST_ITEMS_PATH):
+        with open(LATEST_ITEMS_PATH, "r", encoding="utf-8") as f:
+            yield "latest_items.json", json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--max-pages", type=int, default=0)
+    args = ap.parse_args()
+
+    cfgs = load_configs()
+    pages = mismatches = lookups = 0
+    t_linear = t_index = 0.0
+    for label, strategies in iter_recorded_pages(args.days, args.max_pages):
+        # 旧实现只认 name 字段；items 用 title，这里只比较两者都能处理的记录
+        strategies = [s for s in strategies if isinstance(s, dict)]
+        pages += 1
+        t0 = time.perf_counter()
+        idx = StrategyIndex(strategies)
+        t_build = time.perf_counter() - t0
+        for cfg in cfgs:
+            t0 = time.perf_counter()
+            a = find_strategy_linear(cfg, strategies)
+            t1 = time.perf_counter()
+            b = idx.find(cfg)
+            t2 = time.perf_counter()
+            t_linear += t1 - t0
+            t_index += t2 - t1
+            lookups += 1
+            if a is not b:
+                mismatches += 1
+                print(f"[MISMATCH] {label} cfg={cfg.get('策略名称')}/{cfg.get('策略ID')} "
+                      f"linear={a and (a.get('name') or a.get('title'))} index={b and (b.get('name') or b.get('title'))}")
+        t_index += t_build
+
+    print(f"页面 {pages}，查找 {lookups} 次，不一致 {mismatches} 次")
+    if lookups:
+        print(f"线性查找 {t_linear * 1000:.2f} ms，索引（含构建）{t_index * 1000:.2f} ms")
+    if pages == 0:
+        print("没有可用的录制页面：设置 YUNFEI_SAVE_FETCH=1 运行一段时间后再试")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
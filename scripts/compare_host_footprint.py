@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+compare_host_footprint.py
+
+对比两种运行方式的资源占用：
+  A. 每账户一个进程：python main.py -a shu、python main.py -a mama ...（GUI 现行方式）
+  B. 多账户宿主：    python main.py --accounts shu,mama,...
+
+分别启动、等待预热后按固定间隔采样（进程树 RSS 之和、CPU 时间增量），
+跑完一种方式后结束进程再跑另一种，最后打印对比表。
+需要在可以真实运行 main.py 的机器上执行（QMT 已安装、账户配置齐全）；
+为避免误下单，建议在非交易时段运行。
+
+Usage:
+  python scripts/compare_host_footprint.py --accounts shu,mama
+  python scripts/compare_host_footprint.py --accounts shu,mama --warmup 60 --duration 120 --interval 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _tree(procs):
+    out = []
+    for p in procs:
+        try:
+            out.append(p)
+            out.extend(p.children(recursive=True))
+        except psutil.Error:
+            pass
+    return out
+
+
+def _sample(procs):
+    rss, cpu = 0, 0.0
+    for p in _tree(procs):
+        try:
+            rss += p.memory_info().rss
+            t = p.cpu_times()
+            cpu += t.user + t.system
+        except psutil.Error:
+            pass
+    return rss, cpu
+
+
+def _stop(popens):
+    for po in popens:
+        try:
+            for c in psutil.Process(po.pid).children(recursive=True):
+                c.terminate()
+        except psutil.Error:
+            pass
+        po.terminate()
+    for po in popens:
+        try:
+            po.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            po.kill()
+
+
+def run_mode(label, cmds, warmup, duration, interval):
+    print(f"[{label}] 启动 {len(cmds)} 个进程 ...", flush=True)
+    popens = [subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for cmd in cmds]
+    procs = [psutil.Process(po.pid) for po in popens]
+    try:
+        time.sleep(warmup)
+        _, cpu0 = _sample(procs)
+        t0 = time.monotonic()
+        rss_samples = []
+        while time.monotonic() - t0 < duration:
+            rss, _ = _sample(procs)
+            rss_samples.append(rss)
+            time.sleep(interval)
+        _, cpu1 = _sample(procs)
+        elapsed = time.monotonic() - t0
+        alive = sum(1 for po in popens if po.poll() is None)
+    finally:
+        _stop(popens)
+    return {
+        "label": label,
+        "processes": len(cmds),
+        "alive": alive,
+        "rss_avg_mb": sum(rss_samples) / max(len(rss_samples), 1) / 2 ** 20,
+        "rss_max_mb": max(rss_samples or [0]) / 2 ** 20,
+        "cpu_pct": (cpu1 - cpu0) / elapsed * 100.0 if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="每账户一进程 vs 多账户宿主 的内存 / CPU 对比")
+    ap.add_argument("--accounts", required=True, help="逗号分隔的账户别名，如 shu,mama")
+    ap.add_argument("--warmup", type=float, default=60.0, help="启动后等待秒数（导入、连接、生成计划）")
+    ap.add_argument("--duration", type=float, default=120.0, help="采样时长（秒）")
+    ap.add_argument("--interval", type=float, default=2.0, help="采样间隔（秒）")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.accounts.split(",") if n.strip()]
+    main_py = os.path.join(ROOT, "main.py")
+    results = [
+        run_mode("每账户一进程", [[sys.executable, main_py, "-a", n] for n in names],
+                 args.warmup, args.duration, args.interval),
+        run_mode("多账户宿主", [[sys.executable, main_py, "--accounts", ",".join(names)]],
+                 args.warmup, args.duration, args.interval),
+    ]
+
+    print()
+    print(f"{'方式':<12}{'进程数':>6}{'存活':>6}{'平均RSS(MB)':>14}{'峰值RSS(MB)':>14}{'CPU%':>8}")
+    for r in results:
+        print(f"{r['label']:<12}{r['processes']:>6}{r['alive']:>6}{r['rss_avg_mb']:>14.1f}{r['rss_max_mb']:>14.1f}"
+              f"{r['cpu_pct']:>8.2f}")
+    a, b = results
+    if a["rss_avg_mb"] > 0:
+        print(f"\n多账户宿主内存为每账户一进程的 {b['rss_avg_mb'] / a['rss_avg_mb'] * 100:.1f}%")
+    if a["cpu_pct"] > 0:
+        print(f"多账户宿主 CPU 为每账户一进程的 {b['cpu_pct'] / a['cpu_pct'] * 100:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,14 @@
-# tasks.py — 任务工厂（撤单/重下、打印持仓、511880 自动买卖、买/卖执行）
+# tasks.py — 任务工厂（撤单/重下、打印持仓、511880 自动买卖、买/卖执行、开盘前预热）
 import time
 import logging
 from datetime import datetime
 import json
 
 from xtquant.xttype import StockAccount
-from xtquant import xtdata
 from processor.order_cancel_tool import cancel_orders
 from processor.orders_reorder_tool import reorder_orders
 from processor.trade_plan_execution import execute_trade_plan
+from utils.live_quotes import get_live_quotes
 
 # 撤单与重下
 def cancel_and_reorder_task_factory(xt_trader, account_id, reverse_mapping):
@@ -56,7 +56,7 @@ def buy_all_funds_to_511880_factory(xt_trader, account_id):
             usable_cash = available_cash * (1.0 - reserve_ratio)
 
             from xtquant.xttype import _XTCONST_
-            tick = xtdata.get_full_tick(["511880.SH"])["511880.SH"]
+            tick = get_live_quotes().get_tick("511880.SH")
             price = tick.get("lastPrice") or (tick.get("askPrice") or [None])[0]
             if not price or price <= 0:
                 logging.error("无法获取511880.SH买入价格！")
@@ -101,7 +101,7 @@ def sell_all_511880_factory(xt_trader, account_id):
                 return
             can_sell = int(getattr(pos, "m_nCanUseVolume", 0))
             from xtquant.xttype import _XTCONST_
-            tick = xtdata.get_full_tick(["511880.SH"])["511880.SH"]
+            tick = get_live_quotes().get_tick("511880.SH")
             price = tick.get("lastPrice") or (tick.get("bidPrice") or [None])[0]
             board_lot = 100
             volume = (can_sell // board_lot) * board_lot
@@ -116,6 +116,54 @@ def sell_all_511880_factory(xt_trader, account_id):
             logging.error(f"卖出511880异常: {e}")
     return task
 
+# 开盘前预热：在 sell_time 之前把首次执行的冷启动开销（导入、计划解析、合约信息、行情、柜台查询）提前付掉
+def warmup_task_factory(xt_trader, account_id, trade_plan_file, draft_file_path):
+    def task():
+        logging.info(f"--- 预热任务 --- 当前时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        steps = []
+        t_all = time.perf_counter()
+
+        def step(name, fn):
+            t0 = time.perf_counter()
+            try:
+                result = fn()
+                steps.append(f"{name}={(time.perf_counter() - t0) * 1000:.0f}ms")
+                return result
+            except Exception as e:
+                steps.append(f"{name}=失败({e})")
+                logging.warning(f"预热步骤 {name} 失败: {e}")
+                return None
+
+        def _imports():
+            import processor.trade_plan_execution  # noqa: F401
+            import processor.order_cancel_tool  # noqa: F401
+            import processor.orders_reorder_tool  # noqa: F401
+            from xtquant.xttype import _XTCONST_  # noqa: F401
+
+        from helpers import get_can_directly_buy, load_trade_plan
+        from processor.trade_plan_execution import prefetch_for_plan
+        from utils.live_quotes import subscribe_for_account
+        from utils.symbol_table import get_symbol_table
+
+        step("imports", _imports)
+        trade_plan = step("plan", lambda: load_trade_plan(trade_plan_file))
+        step("draft", lambda: get_can_directly_buy(draft_file_path))
+        step("symbols", get_symbol_table)
+        counts = step("quotes", lambda: prefetch_for_plan(trade_plan or {})) or {}
+        step("trader", lambda: xt_trader.query_stock_asset(StockAccount(account_id)))
+        step("subscribe", lambda: subscribe_for_account(
+            positions=[getattr(p, "stock_code", None) for p in (xt_trader.query_stock_positions(StockAccount(account_id)) or [])]))
+
+        total_ms = (time.perf_counter() - t_all) * 1000
+        logging.info(
+            f"✅ 预热完成，耗时 {total_ms:.0f}ms（{', '.join(steps)}；"
+            f"代码 {counts.get('codes', 0)}，合约信息 {counts.get('details', 0)}，行情 {counts.get('ticks', 0)}；"
+            f"订阅 {get_live_quotes().stats()}）"
+        )
+        if not trade_plan:
+            logging.warning(f"预热时交易计划为空或不存在: {trade_plan_file}")
+    return task
+
 # 卖出执行任务（支持在卖出后根据 draft 同时买入）
 def sell_execution_task_factory(xt_trader, account_id, trade_plan_file, draft_file_path):
     def task():
@@ -0,0 +1,299 @@
+"""
+utils/account_changes.py
+账户快照差异与变更流（change feed）。
+
+每次写入持仓 / 资产快照时，与该账户上一次快照比较，只记录变化：
+  持仓：opened（新开仓）/ closed（清仓）/ volume_changed / can_use_changed
+  资产：asset_changed（cash / frozen_cash / market_value / total_asset 中变化的字段）
+变更按天、按账户追加到 account_data/changes/YYYYMMDD/changes_{account_id}.jsonl
+（每个账户进程只写自己的文件，无需跨进程锁），每行一个事件：
+  {"ts": ..., "account_id": ..., "type": "opened", "stock_code": ..., "old": {...}, "new": {...}}
+
+上一次快照：进程内缓存；进程刚启动时从账户状态库（utils.account_store）取最近一次快照作为基线，
+避免重启后把全部持仓当作 opened。
+
+读取：
+  replay(start, end, account_ids, types)  按时间顺序回放事件
+  apply_position_events(state, events)     把事件应用到 {code: row} 状态上（增量更新持仓视图）
+  ChangeFeedCursor                          记住每个文件的读取偏移，poll() 只返回新增事件
+"""
+import os
+import json
+import glob
+import heapq
+import logging
+import datetime
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CHANGES_DIR = os.path.join(REPO_ROOT, "account_data", "changes")
+
+POSITION_EVENT_TYPES = ("opened", "closed", "volume_changed", "can_use_changed")
+ASSET_FIELDS = ("cash", "frozen_cash", "market_value", "total_asset")
+ASSET_EPSILON = 0.005  # 资产金额已四舍五入到分，小于半分视为未变化
+
+_lock = threading.Lock()
+_last_positions: Dict[str, Dict[str, dict]] = {}
+_last_asset: Dict[str, dict] = {}
+
+
+def _day_of(ts: str) -> str:
+    try:
+        return datetime.datetime.fromisoformat(str(ts)).strftime("%Y%m%d")
+    except Exception:
+        return datetime.datetime.now().strftime("%Y%m%d")
+
+
+def _log_path(account_id: str, day: str) -> str:
+    return os.path.join(CHANGES_DIR, day, f"changes_{account_id}.jsonl")
+
+
+def _append(account_id: str, ts: str, events: List[dict]):
+    if not events:
+        return
+    path = _log_path(account_id, _day_of(ts))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for ev in events:
+            f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+
+
+# ---------- 差异计算 ----------
+def _slim(row: dict) -> dict:
+    return {k: row.get(k) for k in ("stock_name", "volume", "can_use_volume", "avg_price", "market_value")}
+
+
+def diff_positions(old: Dict[str, dict], new: Dict[str, dict]) -> List[dict]:
+    """old/new: {stock_code: row}；返回不带 ts/account_id 的事件列表（按代码排序，结果稳定）"""
+    events = []
+    for code in sorted(set(old) | set(new)):
+        o, n = old.get(code), new.get(code)
+        o_vol = (o or {}).get("volume") or 0
+        n_vol = (n or {}).get("volume") or 0
+        if not o_vol and n_vol:
+            events.append({"type": "opened", "stock_code": code, "old": None, "new": _slim(n)})
+        elif o_vol and not n_vol:
+            events.append({"type": "closed", "stock_code": code, "old": _slim(o), "new": _slim(n) if n else None})
+        elif o_vol and n_vol:
+            if o_vol != n_vol:
+                events.append({"type": "volume_changed", "stock_code": code, "old": _slim(o), "new": _slim(n)})
+            elif (o.get("can_use_volume") or 0) != (n.get("can_use_volume") or 0):
+                events.append({"type": "can_use_changed", "stock_code": code, "old": _slim(o), "new": _slim(n)})
+    return events
+
+
+def diff_asset(old: Optional[dict], new: dict) -> List[dict]:
+    if old is None:
+        return []
+    changed = {}
+    for k in ASSET_FIELDS:
+        a, b = old.get(k), new.get(k)
+        try:
+            if a is None or b is None:
+                if a != b:
+                    changed[k] = {"old": a, "new": b}
+            elif abs(float(a) - float(b)) >= ASSET_EPSILON:
+                changed[k] = {"old": a, "new": b, "delta": round(float(b) - float(a), 2)}
+        except (TypeError, ValueError):
+            if a != b:
+                changed[k] = {"old": a, "new": b}
+    if not changed:
+        return []
+    return [{"type": "asset_changed", "fields": changed}]
+
+
+def _by_code(rows: Iterable[dict]) -> Dict[str, dict]:
+    return {str(r.get("stock_code") or ""): dict(r) for r in (rows or []) if r.get("stock_code")}
+
+
+def _baseline_positions(account_id: str) -> Optional[Dict[str, dict]]:
+    try:
+        from utils.account_store import get_account_store, store_available
+        if not store_available():
+            return None
+        ts, rows = get_account_store().latest_positions(account_id)
+        return _by_code(rows) if ts else None
+    except Exception:
+        return None
+
+
+def _baseline_asset(account_id: str) -> Optional[dict]:
+    try:
+        from utils.account_store import get_account_store, store_available
+        if not store_available():
+            return None
+        return get_account_store().latest_asset(account_id)
+    except Exception:
+        return None
+
+
+# ---------- 写入入口（由 position_connector / asset_connector 调用） ----------
+def record_positions(account_id, positions: List[dict], ts: str) -> List[dict]:
+    """
+    与上一次持仓快照比较并追加变更；返回本次事件列表。
+    必须在把本次快照写入账户状态库之前调用（否则基线会是本次快照本身）。
+    """
+    account_id = str(account_id)
+    new = _by_code(positions)
+    with _lock:
+        old = _last_positions.get(account_id)
+        if old is None:
+            old = _baseline_positions(account_id)
+        _last_positions[account_id] = new
+    if old is None:
+        # 没有任何历史：第一次快照只作为基线，不产生事件
+        return []
+    events = diff_positions(old, new)
+    for ev in events:
+        ev["ts"] = ts
+        ev["account_id"] = account_id
+    try:
+        _append(account_id, ts, events)
+    except Exception as e:
+        logging.exception(f"写入持仓变更流失败: {e}")
+    return events
+
+
+def record_asset(account_id, asset: dict, ts: str) -> List[dict]:
+    """同 record_positions，针对资产快照"""
+    account_id = str(account_id)
+    with _lock:
+        old = _last_asset.get(account_id)
+        if old is None:
+            old = _baseline_asset(account_id)
+        _last_asset[account_id] = dict(asset)
+    events = diff_asset(old, asset)
+    for ev in events:
+        ev["ts"] = ts
+        ev["account_id"] = account_id
+    try:
+        _append(account_id, ts, events)
+    except Exception as e:
+        logging.exception(f"写入资产变更流失败: {e}")
+    return events
+
+
+# ---------- 读取 / 回放 ----------
+def _days_between(start: Optional[datetime.datetime], end: Optional[datetime.datetime]) -> List[str]:
+    days = sorted(os.path.basename(d) for d in glob.glob(os.path.join(CHANGES_DIR, "[0-9]" * 8)))
+    lo = start.strftime("%Y%m%d") if start else None
+    hi = end.strftime("%Y%m%d") if end else None
+    return [d for d in days if (lo is None or d >= lo) and (hi is None or d <= hi)]
+
+
+def _iter_file(path: str) -> Iterator[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue  # 进程被杀时可能留下半行
+    except FileNotFoundError:
+        return
+
+
+def _bound(value, end_of_day: bool):
+    """
+    回放区间端点 -> datetime。只给日期（date 或 'YYYY-MM-DD'）时，起点取当天 0 点，
+    终点取当天最后一刻，replay(day, day) 即为当天全部事件。
+    """
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        day = value
+    else:
+        text = str(value).strip()
+        if len(text) > 10:
+            return datetime.datetime.fromisoformat(text)
+        day = datetime.date.fromisoformat(text)
+    return datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+
+
+def replay(start=None, end=None, account_ids=None, types=None) -> Iterator[dict]:
+    """
+    按 ts 顺序回放变更事件。start/end 可为 datetime、date 或 ISO 字符串（含端点；只给日期时 end 含当天全天）；
+    account_ids / types 为可选过滤集合。
+    """
+    start = _bound(start, end_of_day=False)
+    end = _bound(end, end_of_day=True)
+    wanted_accts = {str(a) for a in account_ids} if account_ids else None
+    wanted_types = set(types) if types else None
+    lo = start.isoformat() if start else None
+    hi = end.isoformat() if end else None
+    for day in _days_between(start, end):
+        files = sorted(glob.glob(os.path.join(CHANGES_DIR, day, "changes_*.jsonl")))
+        if wanted_accts is not None:
+            files = [p for p in files if os.path.basename(p)[len("changes_"):-len(".jsonl")] in wanted_accts]
+        # 各账户文件内部已按时间有序，多路归并即可
+        for ev in heapq.merge(*(_iter_file(p) for p in files), key=lambda e: str(e.get("ts", ""))):
+            ts = str(ev.get("ts", ""))
+            if lo and ts < lo:
+                continue
+            if hi and ts > hi:
+                continue
+            if wanted_types and ev.get("type") not in wanted_types:
+                continue
+            yield ev
+
+
+def apply_position_events(state: Dict[str, dict], events: Iterable[dict]) -> Dict[str, dict]:
+    """把持仓事件应用到 {stock_code: row}（原地修改并返回）；资产事件忽略"""
+    for ev in events:
+        t = ev.get("type")
+        if t not in POSITION_EVENT_TYPES:
+            continue
+        code = ev.get("stock_code")
+        if t == "closed":
+            state.pop(code, None)
+        else:
+            row = dict(ev.get("new") or {})
+            row["stock_code"] = code
+            state[code] = row
+    return state
+
+
+class ChangeFeedCursor:
+    """
+    增量读取当天（或指定日期）的变更：记住每个文件已读到的字节偏移，
+    poll() 只解析新追加的行。用于 GUI / 对账定时刷新，而不必重新加载全部快照。
+    """
+
+    def __init__(self, day: Optional[str] = None, account_ids=None):
+        self.day = day
+        self.account_ids = {str(a) for a in account_ids} if account_ids else None
+        self._offsets: Dict[str, int] = {}
+
+    def poll(self) -> List[dict]:
+        day = self.day or datetime.datetime.now().strftime("%Y%m%d")
+        events = []
+        for path in sorted(glob.glob(os.path.join(CHANGES_DIR, day, "changes_*.jsonl"))):
+            acct = os.path.basename(path)[len("changes_"):-len(".jsonl")]
+            if self.account_ids is not None and acct not in self.account_ids:
+                continue
+            offset = self._offsets.get(path, 0)
+            try:
+                if os.path.getsize(path) <= offset:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except OSError:
+                continue
+            # 只消费完整的行，半行留到下次
+            end = chunk.rfind(b"\n") + 1
+            if end <= 0:
+                continue
+            self._offsets[path] = offset + end
+            for line in chunk[:end].decode("utf-8", errors="ignore").splitlines():
+                if line.strip():
+                    try:
+                        events.append(json.loads(line))
+                    except Exception:
+                        pass
+        events.sort(key=lambda e: str(e.get("ts", "")))
+        return events
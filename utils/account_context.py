@@ -0,0 +1,42 @@
+"""
+utils/account_context.py
+线程级账户上下文：多账户在同一进程内运行（main.py --accounts）时，
+用于把日志分流到各账户文件、把任务时间线记到对应账户。
+
+- 每个账户的调度器线程池在创建线程时 bind(name, account_id)（见 helpers.create_scheduler）
+- 高精度触发器线程继承创建它的线程的上下文（见 utils.precise_trigger）
+- 启动阶段在主线程用 with use(name): ... 包裹
+单账户进程中不设置也无影响：current() 返回 (None, None)。
+"""
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+_local = threading.local()
+
+
+def bind(name: Optional[str], account_id=None):
+    _local.name = name
+    _local.account_id = None if account_id is None else str(account_id)
+
+
+def current() -> Tuple[Optional[str], Optional[str]]:
+    return getattr(_local, "name", None), getattr(_local, "account_id", None)
+
+
+def current_name() -> Optional[str]:
+    return getattr(_local, "name", None)
+
+
+def current_account_id() -> Optional[str]:
+    return getattr(_local, "account_id", None)
+
+
+@contextmanager
+def use(name: Optional[str], account_id=None):
+    prev = current()
+    bind(name, account_id)
+    try:
+        yield
+    finally:
+        bind(*prev)
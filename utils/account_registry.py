@@ -0,0 +1,190 @@
+"""
+utils/account_registry.py
+账户配置注册表：core_parameters/account/*.json 只读一次，建立 别名 / 文件名 / account_id 索引。
+
+- 查找（resolve / get_config / config_path）不扫描目录：只 stat 一次目录（文件增删时目录 mtime 变化才重新列目录），
+  再 stat 命中的文件，(mtime_ns, size) 变化才重读该文件（如 qmt_daily_restart_checker 回写 last_run_date）。
+- 加载时做字段校验（REQUIRED_KEYS 及类型），不合格的文件不进入索引，原因见 problems()。
+- generation() 在任一配置重新加载后递增，调用方可据此让自己的派生缓存失效。
+"""
+import os
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ACCOUNT_DIR = os.path.join(REPO_ROOT, "core_parameters", "account")
+
+# 字段名 -> 允许的类型；main.py 启动直接使用这些字段
+REQUIRED_KEYS = {
+    "account_id": (str, int),
+    "session_id": (int, str),
+    "path_qmt": (str,),
+}
+
+_lock = threading.RLock()
+_entries: Dict[str, dict] = {}        # abspath -> {"path", "stem", "account_id", "config", "stat"}
+_by_key: Dict[str, str] = {}          # 小写 别名/文件名/account_id -> abspath
+_aliases: Dict[str, str] = {}         # 外部注册的别名（如 main.ACCOUNT_CONFIG_MAP）-> abspath
+_problems: Dict[str, str] = {}
+_dir_mtime = None
+_generation = 0
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def validate(config) -> Optional[str]:
+    """字段校验：合格返回 None，否则返回原因"""
+    if not isinstance(config, dict):
+        return "顶层不是 JSON 对象"
+    for key, types in REQUIRED_KEYS.items():
+        if config.get(key) in (None, ""):
+            return f"缺少字段 {key}"
+        if not isinstance(config[key], types):
+            return f"字段 {key} 类型应为 {'/'.join(t.__name__ for t in types)}"
+    try:
+        int(config["session_id"])
+    except (TypeError, ValueError):
+        return "字段 session_id 不是整数"
+    return None
+
+
+def _load_file(path):
+    """读取并校验单个文件，更新 _entries / _problems（调用方持锁，之后需 _rebuild_index）"""
+    global _generation
+    stat = _stat_key(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        data, reason = None, f"JSON 解析失败: {e}"
+    else:
+        reason = validate(data)
+    _generation += 1
+    if reason:
+        _entries.pop(path, None)
+        _problems[path] = reason
+        logging.warning(f"账户配置无效，已忽略: {path} ({reason})")
+        return
+    _problems.pop(path, None)
+    _entries[path] = {
+        "path": path,
+        "stem": os.path.splitext(os.path.basename(path))[0],
+        "account_id": str(data["account_id"]),
+        "config": data,
+        "stat": stat,
+    }
+
+
+def _rebuild_index():
+    _by_key.clear()
+    for path, e in _entries.items():
+        _by_key[e["stem"].lower()] = path
+    # account_id 优先于文件名（文件名恰好等于别的账户 id 时以内容为准）
+    for path, e in _entries.items():
+        _by_key[e["account_id"].lower()] = path
+    for alias, path in _aliases.items():
+        if path in _entries:
+            _by_key[alias] = path
+
+
+def _sync_dir():
+    """目录 mtime 变化（文件增删）时才重新列目录（调用方持锁）"""
+    global _dir_mtime
+    mtime = _stat_key(ACCOUNT_DIR)
+    if mtime == _dir_mtime:
+        return
+    _dir_mtime = mtime
+    try:
+        names = [fn for fn in os.listdir(ACCOUNT_DIR) if fn.lower().endswith(".json")]
+    except OSError:
+        names = []
+    paths = {os.path.join(ACCOUNT_DIR, fn) for fn in names}
+    for gone in [p for p in list(_entries) + list(_problems) if p not in paths]:
+        _entries.pop(gone, None)
+        _problems.pop(gone, None)
+    for path in paths:
+        e = _entries.get(path)
+        if e is None or e["stat"] != _stat_key(path):
+            _load_file(path)
+    _rebuild_index()
+
+
+def _fresh(path) -> Optional[dict]:
+    """文件 (mtime_ns, size) 变化则重读（调用方持锁）"""
+    e = _entries.get(path)
+    if e is not None and e["stat"] == _stat_key(path):
+        return e
+    if not os.path.exists(path):
+        _entries.pop(path, None)
+        _rebuild_index()
+        return None
+    _load_file(path)
+    _rebuild_index()
+    return _entries.get(path)
+
+
+def _abs(path) -> str:
+    return os.path.normpath(path if os.path.isabs(path) else os.path.join(REPO_ROOT, path))
+
+
+def register_aliases(mapping: Dict[str, str]):
+    """登记 别名 -> 配置文件路径（相对仓库根或绝对路径），如 main.ACCOUNT_CONFIG_MAP"""
+    with _lock:
+        for alias, path in (mapping or {}).items():
+            _aliases[str(alias).lower()] = _abs(path)
+        _sync_dir()
+        _rebuild_index()
+
+
+def resolve(name) -> Optional[dict]:
+    """别名 / 文件名 / account_id -> 条目 {"path", "stem", "account_id", "config"}；找不到返回 None"""
+    if name is None:
+        return None
+    key = str(name).strip().lower()
+    with _lock:
+        _sync_dir()
+        path = _by_key.get(key) or _aliases.get(key)
+        if path is None:
+            return None
+        return _fresh(path)
+
+
+def config_path(name) -> Optional[str]:
+    e = resolve(name)
+    return e["path"] if e else None
+
+
+def get_config(name) -> Optional[dict]:
+    """配置 dict 的浅拷贝（调用方修改不影响缓存）；找不到返回 None"""
+    e = resolve(name)
+    return dict(e["config"]) if e else None
+
+
+def all_accounts() -> List[dict]:
+    with _lock:
+        _sync_dir()
+        return [dict(e) for e in _entries.values()]
+
+
+def problems() -> Dict[str, str]:
+    """未通过校验的配置文件 -> 原因"""
+    with _lock:
+        _sync_dir()
+        return dict(_problems)
+
+
+def generation() -> int:
+    """同时 stat 已知文件（账户配置只有几个），使外部修改能及时反映到调用方缓存"""
+    with _lock:
+        _sync_dir()
+        for path in list(_entries):
+            _fresh(path)
+        return _generation
@@ -0,0 +1,263 @@
+"""
+utils/account_store.py
+账户状态存储（SQLite，WAL 模式）：保存每次资产 / 持仓快照的完整历史。
+
+表结构：
+  asset_snapshots(id, account_id, ts, cash, frozen_cash, market_value, total_asset, payload)
+  position_snapshots(id, account_id, ts, row_count)
+  position_rows(snapshot_id, stock_code, stock_name, volume, can_use_volume, avg_price, market_value)
+  均按 (account_id, ts) 建索引；ts 为本地时间 ISO 字符串（可直接按字典序比较）。
+
+写入：write_asset / write_positions 只入队，由后台线程批量落盘（一个事务提交一批），
+      不阻塞调用方；flush() 可等待队列写完（进程退出时自动 flush）。
+查询：latest_asset / asset_as_of / latest_positions / positions_as_of / asset_history。
+
+account_data/assets/*.json 与 account_data/positions/*.json 仍作为可选导出保留，
+由环境变量 ACCOUNT_JSON_EXPORT 控制（默认 1 开启，设为 0 关闭）。
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DB_PATH = os.path.join(REPO_ROOT, "account_data", "account_state.db")
+
+BATCH_MAX_ITEMS = 200
+BATCH_MAX_WAIT = 0.2  # 秒
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asset_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    cash REAL,
+    frozen_cash REAL,
+    market_value REAL,
+    total_asset REAL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_asset_acct_ts ON asset_snapshots(account_id, ts);
+
+CREATE TABLE IF NOT EXISTS position_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    row_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_pos_acct_ts ON position_snapshots(account_id, ts);
+
+CREATE TABLE IF NOT EXISTS position_rows (
+    snapshot_id INTEGER NOT NULL,
+    stock_code TEXT,
+    stock_name TEXT,
+    volume INTEGER,
+    can_use_volume INTEGER,
+    avg_price REAL,
+    market_value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pos_rows_snap ON position_rows(snapshot_id);
+"""
+
+_POSITION_FIELDS = ("stock_code", "stock_name", "volume", "can_use_volume", "avg_price", "market_value")
+
+
+def json_export_enabled() -> bool:
+    return str(os.getenv("ACCOUNT_JSON_EXPORT", "1")).lower() not in ("0", "false", "no", "n")
+
+
+def _now_iso() -> str:
+    return datetime.datetime.now().isoformat()
+
+
+def _ts_str(ts) -> str:
+    if ts is None:
+        return _now_iso()
+    if isinstance(ts, datetime.datetime):
+        return ts.isoformat()
+    return str(ts)
+
+
+class AccountStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._schema_ready = False
+
+    # ---------- 连接 ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    # ---------- 批量写入 ----------
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._writer_loop, name="account-store-writer", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + BATCH_MAX_WAIT
+            while len(batch) < BATCH_MAX_ITEMS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._apply_batch(batch)
+            except Exception as e:
+                logging.exception(f"account_store 批量写入失败（{len(batch)} 条）: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply_batch(self, batch):
+        conn = self._conn()
+        with conn:
+            for kind, account_id, ts, data in batch:
+                if kind == "asset":
+                    conn.execute(
+                        "INSERT INTO asset_snapshots(account_id, ts, cash, frozen_cash, market_value, total_asset, payload)"
+                        " VALUES (?,?,?,?,?,?,?)",
+                        (account_id, ts, data.get("cash"), data.get("frozen_cash"), data.get("market_value"),
+                         data.get("total_asset"), json.dumps(data, ensure_ascii=False)))
+                elif kind == "positions":
+                    cur = conn.execute("INSERT INTO position_snapshots(account_id, ts, row_count) VALUES (?,?,?)",
+                                       (account_id, ts, len(data)))
+                    sid = cur.lastrowid
+                    conn.executemany(
+                        "INSERT INTO position_rows(snapshot_id, stock_code, stock_name, volume, can_use_volume, avg_price, market_value)"
+                        " VALUES (?,?,?,?,?,?,?)",
+                        [(sid,) + tuple(p.get(k) for k in _POSITION_FIELDS) for p in data])
+
+    def write_asset(self, account_id: str, asset_dict: Dict[str, Any], ts=None):
+        self._ensure_writer()
+        self._queue.put(("asset", str(account_id), _ts_str(ts), dict(asset_dict)))
+
+    def write_positions(self, account_id: str, positions: List[Dict[str, Any]], ts=None):
+        self._ensure_writer()
+        self._queue.put(("positions", str(account_id), _ts_str(ts), [dict(p) for p in (positions or [])]))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列写完；timeout 秒内未完成返回 False"""
+        if self._writer is None:
+            return True
+        if timeout is None:
+            self._queue.join()
+            return True
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= end:
+                return False
+            time.sleep(0.02)
+        return True
+
+    # ---------- 查询 ----------
+    @staticmethod
+    def _asset_row(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        try:
+            d = json.loads(row["payload"]) if row["payload"] else {}
+        except Exception:
+            d = {}
+        d.setdefault("account_id", row["account_id"])
+        for k in ("cash", "frozen_cash", "market_value", "total_asset"):
+            d.setdefault(k, row[k])
+        d["last_update"] = row["ts"]
+        return d
+
+    def latest_asset(self, account_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM asset_snapshots WHERE account_id=? ORDER BY ts DESC, id DESC LIMIT 1",
+            (str(account_id),)).fetchone()
+        return self._asset_row(row)
+
+    def asset_as_of(self, account_id: str, ts) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM asset_snapshots WHERE account_id=? AND ts<=? ORDER BY ts DESC, id DESC LIMIT 1",
+            (str(account_id), _ts_str(ts))).fetchone()
+        return self._asset_row(row)
+
+    def asset_history(self, account_id: str, start=None, end=None) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM asset_snapshots WHERE account_id=?"
+        args: list = [str(account_id)]
+        if start is not None:
+            sql += " AND ts>=?"
+            args.append(_ts_str(start))
+        if end is not None:
+            sql += " AND ts<=?"
+            args.append(_ts_str(end))
+        sql += " ORDER BY ts, id"
+        return [self._asset_row(r) for r in self._conn().execute(sql, args)]
+
+    def _positions_for(self, snap) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        if snap is None:
+            return None, []
+        rows = self._conn().execute(
+            "SELECT stock_code, stock_name, volume, can_use_volume, avg_price, market_value"
+            " FROM position_rows WHERE snapshot_id=? ORDER BY rowid", (snap["id"],)).fetchall()
+        return snap["ts"], [dict(r) for r in rows]
+
+    def latest_positions(self, account_id: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """返回 (快照时间, 持仓列表)；没有记录时返回 (None, [])"""
+        snap = self._conn().execute(
+            "SELECT id, ts FROM position_snapshots WHERE account_id=? ORDER BY ts DESC, id DESC LIMIT 1",
+            (str(account_id),)).fetchone()
+        return self._positions_for(snap)
+
+    def positions_as_of(self, account_id: str, ts) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        snap = self._conn().execute(
+            "SELECT id, ts FROM position_snapshots WHERE account_id=? AND ts<=? ORDER BY ts DESC, id DESC LIMIT 1",
+            (str(account_id), _ts_str(ts))).fetchone()
+        return self._positions_for(snap)
+
+
+_store: Optional[AccountStore] = None
+_store_lock = threading.Lock()
+
+
+def get_account_store(db_path: Optional[str] = None) -> AccountStore:
+    """进程内单例（传入不同 db_path 时返回独立实例，不替换单例）"""
+    global _store
+    if db_path and (_store is None or os.path.abspath(db_path) != os.path.abspath(_store.db_path)):
+        return AccountStore(db_path)
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AccountStore()
+                atexit.register(lambda: _store.flush(timeout=5))
+    return _store
+
+
+def store_available() -> bool:
+    """数据库文件是否存在（读取方据此决定是否回退到 JSON 导出文件）"""
+    return os.path.exists(DEFAULT_DB_PATH)
@@ -0,0 +1,241 @@
+"""
+utils/job_timeline.py
+定时任务时间线：记录每个任务的 计划时刻 / 实际开始 / 结束 / 异常 / 柜台调用次数。
+
+- instrument(func, job_id, time_str)：包装任务函数；helpers.add_cron_job / add_trigger_job / add_yunfei_jobs
+  注册任务时统一包装，main.py 中的每个定时任务都会被记录。
+- CountingTrader(xt_trader)：xt_trader 的透明代理，按线程统计当前任务发起的柜台调用（query_* / order_* / cancel_*），
+  任务结束时写入记录；不在任务内的调用不计数。
+- 记录按天、按账户追加到 runtime/timeline/timeline_YYYYMMDD_{account}.jsonl（每个账户进程只写自己的文件）。
+
+查看某天的文本甘特图（相隔较远的任务分段显示，每段各自缩放，便于看清重叠）：
+  python -m utils.job_timeline [--day 20261019] [--account 8886...] [--width 80]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import functools
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from utils import account_context
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TIMELINE_DIR = os.path.join(REPO_ROOT, "runtime", "timeline")
+
+BROKER_PREFIXES = ("query_", "order_", "cancel_")
+SEGMENT_GAP = 120.0  # 秒：甘特图中相隔超过该值的任务分到不同段
+
+_account_id: Optional[str] = None
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def set_account(account_id):
+    """由 main 在启动时设置，决定时间线文件名；多账户宿主中以线程账户上下文为准"""
+    global _account_id
+    _account_id = None if account_id is None else str(account_id)
+
+
+# ---------- 柜台调用计数 ----------
+class CountingTrader:
+    """xt_trader 代理：柜台调用计入当前线程正在执行的任务"""
+
+    def __init__(self, trader):
+        object.__setattr__(self, "_trader", trader)
+
+    def __getattr__(self, name):
+        attr = getattr(self._trader, name)
+        if not callable(attr) or not name.startswith(BROKER_PREFIXES):
+            return attr
+
+        @functools.wraps(attr)
+        def counted(*args, **kwargs):
+            calls = getattr(_local, "calls", None)
+            if calls is not None:
+                calls[name] = calls.get(name, 0) + 1
+            return attr(*args, **kwargs)
+        return counted
+
+    def __setattr__(self, name, value):
+        setattr(self._trader, name, value)
+
+
+def unwrap_trader(trader):
+    return getattr(trader, "_trader", trader) if isinstance(trader, CountingTrader) else trader
+
+
+# ---------- 记录 ----------
+def _timeline_path(day: str, account_id: Optional[str]) -> str:
+    return os.path.join(TIMELINE_DIR, f"timeline_{day}_{account_id or 'na'}.jsonl")
+
+
+def _write(entry: dict):
+    try:
+        os.makedirs(TIMELINE_DIR, exist_ok=True)
+        path = _timeline_path(entry["start"][:10].replace("-", ""), entry.get("account_id"))
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logging.warning(f"写入任务时间线失败: {e}")
+
+
+def instrument(func: Callable, job_id: str, time_str: Optional[str] = None) -> Callable:
+    """包装任务：记录计划时刻（当天 time_str）、开始、结束、异常与柜台调用次数；异常照常抛出"""
+    hms = None
+    if time_str:
+        try:
+            hms = tuple(map(int, time_str.split(":")))
+        except Exception:
+            hms = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = datetime.now()
+        t0 = time.perf_counter()
+        outer = getattr(_local, "calls", None)
+        _local.calls = {}
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            calls = _local.calls
+            _local.calls = outer
+            if outer is not None:
+                for k, v in calls.items():
+                    outer[k] = outer.get(k, 0) + v
+            end = start + timedelta(seconds=time.perf_counter() - t0)
+            scheduled = None
+            if hms is not None:
+                scheduled = start.replace(hour=hms[0], minute=hms[1], second=hms[2], microsecond=0)
+                if scheduled - start > timedelta(hours=12):
+                    scheduled -= timedelta(days=1)
+            _write({
+                "job_id": job_id,
+                "account_id": account_context.current_account_id() or _account_id,
+                "scheduled": scheduled.isoformat(timespec="milliseconds") if scheduled else None,
+                "start": start.isoformat(timespec="milliseconds"),
+                "end": end.isoformat(timespec="milliseconds"),
+                "late_ms": round((start - scheduled).total_seconds() * 1000, 1) if scheduled else None,
+                "duration_ms": round((end - start).total_seconds() * 1000, 1),
+                "broker_calls": sum(calls.values()),
+                "calls": calls,
+                "error": error,
+            })
+    return wrapper
+
+
+# ---------- 读取 / 甘特图 ----------
+def load_timeline(day: str, account_id: Optional[str] = None) -> List[dict]:
+    records = []
+    if not os.path.isdir(TIMELINE_DIR):
+        return records
+    prefix = f"timeline_{day}_"
+    for fn in sorted(os.listdir(TIMELINE_DIR)):
+        if not (fn.startswith(prefix) and fn.endswith(".jsonl")):
+            continue
+        if account_id and fn[len(prefix):-len(".jsonl")] != str(account_id):
+            continue
+        with open(os.path.join(TIMELINE_DIR, fn), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except Exception:
+                    pass
+    records.sort(key=lambda r: r.get("start", ""))
+    return records
+
+
+def _segments(records: List[dict]) -> List[List[dict]]:
+    segs, cur, cur_end = [], [], None
+    for r in records:
+        s = datetime.fromisoformat(r["start"])
+        if cur and (s - cur_end).total_seconds() > SEGMENT_GAP:
+            segs.append(cur)
+            cur, cur_end = [], None
+        cur.append(r)
+        e = datetime.fromisoformat(r["end"])
+        cur_end = e if cur_end is None else max(cur_end, e)
+    if cur:
+        segs.append(cur)
+    return segs
+
+
+def render_gantt(records: List[dict], width: int = 80) -> str:
+    """每段一张图：'█' 运行区间，'X' 以异常结束，'|' 计划时刻；右侧为 延迟 / 耗时 / 柜台调用数"""
+    if not records:
+        return "（无记录）"
+    out = []
+    multi_acct = len({r.get("account_id") for r in records}) > 1
+    for seg in _segments(records):
+        t_lo = min(datetime.fromisoformat(r["start"]) for r in seg)
+        t_lo = min([t_lo] + [datetime.fromisoformat(r["scheduled"]) for r in seg if r.get("scheduled")])
+        t_hi = max(datetime.fromisoformat(r["end"]) for r in seg)
+        span = max((t_hi - t_lo).total_seconds(), 1.0)
+        scale = (width - 1) / span
+        out.append(f"── {t_lo.strftime('%H:%M:%S')} → {t_hi.strftime('%H:%M:%S')}（{span:.1f}s，每格 {span / (width - 1):.2f}s）")
+        label_w = max(len(_label(r, multi_acct)) for r in seg)
+        for r in seg:
+            s = datetime.fromisoformat(r["start"])
+            e = datetime.fromisoformat(r["end"])
+            a = int((s - t_lo).total_seconds() * scale)
+            b = max(a + 1, int(round((e - t_lo).total_seconds() * scale)))
+            row = [" "] * width
+            if r.get("scheduled"):
+                p = int((datetime.fromisoformat(r["scheduled"]) - t_lo).total_seconds() * scale)
+                if 0 <= p < width:
+                    row[p] = "|"
+            for i in range(a, min(b, width)):
+                row[i] = "█"
+            if r.get("error"):
+                row[min(b, width) - 1] = "X"
+            late = r.get("late_ms")
+            late_s = f"{late / 1000:+.2f}s" if late is not None else "-"
+            out.append(f"{_label(r, multi_acct):<{label_w}} {''.join(row)} {late_s:>8} "
+                       f"{r.get('duration_ms', 0) / 1000:>7.2f}s  柜台{r.get('broker_calls', 0)}")
+        overlaps = _overlaps(seg)
+        if overlaps:
+            out.append("   重叠: " + "; ".join(overlaps))
+        out.append("")
+    return "\n".join(out)
+
+
+def _label(r: dict, with_account: bool) -> str:
+    return f"{r.get('job_id')}@{r.get('account_id')}" if with_account else str(r.get("job_id"))
+
+
+def _overlaps(seg: List[dict]) -> List[str]:
+    res = []
+    for i, a in enumerate(seg):
+        for b in seg[i + 1:]:
+            lo = max(a["start"], b["start"])
+            hi = min(a["end"], b["end"])
+            if lo < hi:
+                sec = (datetime.fromisoformat(hi) - datetime.fromisoformat(lo)).total_seconds()
+                res.append(f"{a['job_id']} × {b['job_id']} {sec:.1f}s")
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="定时任务时间线（文本甘特图）")
+    ap.add_argument("--day", default=datetime.now().strftime("%Y%m%d"))
+    ap.add_argument("--account", default=None)
+    ap.add_argument("--width", type=int, default=80)
+    args = ap.parse_args()
+    records = load_timeline(args.day, args.account)
+    if not records:
+        print(f"没有时间线记录（{TIMELINE_DIR}，{args.day}）")
+        return 0
+    print(render_gantt(records, max(args.width, 10)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
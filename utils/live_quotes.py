@@ -0,0 +1,166 @@
+"""
+utils/live_quotes.py
+基于行情推送的最新 tick 表，替代每次取价都同步调用 xtdata.get_full_tick。
+
+- subscribe(codes)：对新增代码调用 xtdata.subscribe_whole_quote，推送回调把 tick 写入表中；
+  已订阅的代码不会重复订阅。订阅集合一般是 计划代码 ∪ 持仓代码 ∪ 511880.SH。
+- 表结构：{code: (recv_ts, tick)}。回调线程只做整条替换（dict 赋值在 GIL 下是原子的），
+  读路径不加锁，一次查询为一次 dict 取值。
+- 过期保护：tick 的接收时间超过 max_age 秒（默认 STALE_SECONDS）或从未收到推送时，
+  回退为一次 get_full_tick 拉取，并把结果写回表中。
+- stats() 返回 推送条数 / 命中 / 回退拉取 次数，便于确认订阅是否生效。
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from xtquant import xtdata
+
+from utils.code_normalizer import normalize_code
+
+STALE_SECONDS = float(os.environ.get("LIVE_QUOTES_STALE_SECONDS", "3.0") or 3.0)
+YINHUA_RILI = "511880.SH"
+
+
+class LiveQuotes:
+    def __init__(self, stale_seconds: float = STALE_SECONDS):
+        self.stale_seconds = stale_seconds
+        self._ticks: Dict[str, Tuple[float, dict]] = {}
+        self._subscribed = set()
+        self._seqs: List[int] = []
+        self._sub_lock = threading.Lock()  # 只保护订阅操作，不参与读
+        self._stats = {"pushed": 0, "hits": 0, "pulls": 0}
+
+    # ---------- 订阅 ----------
+    def _on_quote(self, datas):
+        now = time.time()
+        try:
+            for code, tick in (datas or {}).items():
+                if isinstance(tick, dict):
+                    self._ticks[code] = (now, tick)
+            self._stats["pushed"] += len(datas or {})
+        except Exception:
+            pass
+
+    def subscribe(self, codes: Iterable[str]) -> int:
+        """订阅尚未订阅的代码，返回新增数量；订阅失败不抛异常（读路径会回退拉取）"""
+        with self._sub_lock:
+            new = []
+            for c in codes or []:
+                if not c:
+                    continue
+                nc = normalize_code(str(c).strip())
+                if nc and nc not in self._subscribed:
+                    new.append(nc)
+            new = list(dict.fromkeys(new))
+            if not new:
+                return 0
+            try:
+                seq = xtdata.subscribe_whole_quote(new, callback=self._on_quote)
+                if isinstance(seq, int) and seq >= 0:
+                    self._seqs.append(seq)
+                self._subscribed.update(new)
+                logging.info(f"行情订阅新增 {len(new)} 个代码，共 {len(self._subscribed)} 个")
+            except Exception as e:
+                logging.warning(f"行情订阅失败（取价将回退为拉取）: {e}")
+                return 0
+            return len(new)
+
+    def unsubscribe_all(self):
+        with self._sub_lock:
+            for seq in self._seqs:
+                try:
+                    xtdata.unsubscribe_quote(seq)
+                except Exception:
+                    pass
+            self._seqs.clear()
+            self._subscribed.clear()
+
+    def subscribed(self) -> List[str]:
+        return sorted(self._subscribed)
+
+    # ---------- 读取 ----------
+    def _pull(self, codes: List[str]) -> Dict[str, dict]:
+        self._stats["pulls"] += 1
+        try:
+            ticks = xtdata.get_full_tick(codes) or {}
+        except Exception as e:
+            logging.warning(f"get_full_tick 回退拉取失败 {codes}: {e}")
+            return {}
+        now = time.time()
+        for code, tick in ticks.items():
+            if isinstance(tick, dict):
+                self._ticks[code] = (now, tick)
+        return ticks
+
+    def get_tick(self, code: str, max_age: Optional[float] = None) -> dict:
+        """最新 tick；过期或缺失时拉取一次；失败返回 {}"""
+        age_limit = self.stale_seconds if max_age is None else max_age
+        entry = self._ticks.get(code)
+        if entry is not None and time.time() - entry[0] <= age_limit:
+            self._stats["hits"] += 1
+            return entry[1]
+        return self._pull([code]).get(code) or {}
+
+    def get_ticks(self, codes: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """批量读取；所有过期 / 缺失的代码合并为一次拉取"""
+        age_limit = self.stale_seconds if max_age is None else max_age
+        now = time.time()
+        out, missing = {}, []
+        for code in codes:
+            entry = self._ticks.get(code)
+            if entry is not None and now - entry[0] <= age_limit:
+                out[code] = entry[1]
+            else:
+                missing.append(code)
+        self._stats["hits"] += len(out)
+        if missing:
+            pulled = self._pull(missing)
+            for code in missing:
+                if pulled.get(code):
+                    out[code] = pulled[code]
+        return out
+
+    def get_age(self, code: str) -> Optional[float]:
+        entry = self._ticks.get(code)
+        return None if entry is None else time.time() - entry[0]
+
+    def stats(self) -> dict:
+        return dict(self._stats, subscribed=len(self._subscribed), cached=len(self._ticks))
+
+
+_live: Optional[LiveQuotes] = None
+_live_lock = threading.Lock()
+
+
+def get_live_quotes() -> LiveQuotes:
+    global _live
+    if _live is None:
+        with _live_lock:
+            if _live is None:
+                _live = LiveQuotes()
+    return _live
+
+
+def get_tick(code: str, max_age: Optional[float] = None) -> dict:
+    return get_live_quotes().get_tick(code, max_age)
+
+
+def get_ticks(codes: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+    return get_live_quotes().get_ticks(codes, max_age)
+
+
+def subscribe_for_account(plan_codes: Iterable[str] = (), positions=None) -> int:
+    """订阅 计划代码 ∪ 持仓代码 ∪ 511880；positions 为 list[dict]（含 stock_code）或代码列表"""
+    codes = list(plan_codes or [])
+    for p in positions or []:
+        if isinstance(p, dict):
+            code = p.get("stock_code") or p.get("code")
+        else:
+            code = getattr(p, "stock_code", None) or (p if isinstance(p, str) else None)
+        if code:
+            codes.append(code)
+    codes.append(YINHUA_RILI)
+    return get_live_quotes().subscribe(codes)
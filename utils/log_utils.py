@@ -5,8 +5,27 @@ from logging.handlers import RotatingFileHandler
 from typing import Optional, Iterable
 
 DEFAULT_FMT = "%(asctime)s - %(levelname)s - %(message)s"
+ACCOUNT_FMT = "%(asctime)s - %(levelname)s - [%(account)s] %(message)s"
 DEFAULT_DATEFMT = "%Y-%m-%d %H:%M:%S"
 
+class AccountTagFilter(logging.Filter):
+    """给记录加上 record.account（当前线程账户上下文，无则为 host）"""
+    def filter(self, record):
+        from utils.account_context import current_name
+        if not hasattr(record, "account"):
+            record.account = current_name() or "host"
+        return True
+
+class AccountLogFilter(AccountTagFilter):
+    """只放行属于指定账户上下文的记录（多账户同进程时按账户分文件）"""
+    def __init__(self, account_name: str):
+        super().__init__()
+        self.account_name = account_name
+
+    def filter(self, record):
+        super().filter(record)
+        return record.account == self.account_name
+
 def ensure_utf8_stdio():
     """
     尝试将 stdout/stderr 切到 utf-8，避免控制台编码报错。
@@ -36,10 +55,12 @@ def setup_logging(
     datefmt: str = DEFAULT_DATEFMT,
     max_bytes: int = 10 * 1024 * 1024,
     backup_count: int = 7,
+    tag_account: bool = False,
 ) -> logging.Logger:
     """
     初始化根日志。若已初始化过会先清空 handler，再添加新 handler。
     支持按账户名分日志文件。
+    tag_account=True（多账户宿主）时每行带 [账户] 前缀。
     返回 root logger。
     """
     root = logging.getLogger()
@@ -49,6 +70,8 @@ def setup_logging(
     while root.handlers:
         root.handlers.pop()
 
+    if tag_account:
+        fmt = ACCOUNT_FMT
     formatter = logging.Formatter(fmt=fmt, datefmt=datefmt)
 
     if file:
@@ -61,18 +84,45 @@ def setup_logging(
         fh = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
         fh.setLevel(level)
         fh.setFormatter(formatter)
+        if tag_account:
+            fh.addFilter(AccountTagFilter())
         root.addHandler(fh)
 
     if console:
         ch = logging.StreamHandler(sys.stdout)
         ch.setLevel(level)
         ch.setFormatter(formatter)
+        if tag_account:
+            ch.addFilter(AccountTagFilter())
         root.addHandler(ch)
 
     # 降低第三方库噪音（可按需调整）
     logging.getLogger("apscheduler").setLevel(logging.WARNING)
     return root
 
+def add_account_log_file(
+    account_name: str,
+    log_dir: str = "./zz_log",
+    level: int = logging.INFO,
+    fmt: str = DEFAULT_FMT,
+    datefmt: str = DEFAULT_DATEFMT,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 7,
+) -> logging.Handler:
+    """
+    多账户宿主：为某账户追加一个只接收该账户上下文记录的文件 handler，
+    文件名与单账户进程一致（log_{account}_%Y%m%d.log），GUI / 日志查看不需区分运行模式。
+    """
+    from datetime import datetime
+    os.makedirs(log_dir, exist_ok=True)
+    file_path = os.path.join(log_dir, datetime.now().strftime(f"log_{account_name}_%Y%m%d.log"))
+    fh = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    fh.setLevel(level)
+    fh.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+    fh.addFilter(AccountLogFilter(account_name))
+    logging.getLogger().addHandler(fh)
+    return fh
+
 class LogCollector:
     """
     用于同时写日志并收集文本（便于 Gradio/GUI 一并展示）。
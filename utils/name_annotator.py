@@ -0,0 +1,162 @@
+"""
+utils/name_annotator.py
+基于 Aho–Corasick 自动机的证券名称标注器，供 yunfei_connect_follow.add_code_to_operation 使用。
+
+- 一次性把符号表（utils.symbol_table）中的全部名称（约 6.5k）编译成自动机；
+  对操作文本只做一次线性扫描即可找出所有名称出现位置。
+- 动作词（买入/卖出/调仓/换入/换出）之后取“从该位置开始、且在分隔处结束的最长名称”：
+  名称后必须是空白、数字、%、标点或文本结尾（可直接跟比例，如 '买入黄金ETF20%'）；
+  仅是更长名称前缀的匹配（'芯片' 之于 '芯片设计ETF'）不标注，以免交易错代码。
+- 名称后已带 (代码) 的视为已标注，保持原样。
+- 自动机随符号表缓存，来源文件变化导致符号表重建后，下次调用自动重建。
+
+名称优先级：调用方传入的映射 > 符号表（core_stock_code > code_index > name_vs_code）。
+"""
+import re
+import threading
+from collections import deque
+from typing import Dict, Optional, List
+
+from .symbol_table import get_symbol_table
+
+ACTION_RE = re.compile(r'(买入|卖出|调仓|换入|换出)\s*')
+# 与旧正则一致的“资产 token”，用于未识别名称时的回退
+TOKEN_RE = re.compile(r'[^\s;；，,.]+')
+# 名称之后允许出现的字符（之后为比例 / 分隔符 / 已有代码括号）
+NAME_END_CHARS = set(";；，,.%％(（")
+
+
+class AhoCorasick:
+    """最小实现：goto 表 + fail 链 + 输出链（每个状态只存以它结尾的最长模式长度）"""
+
+    __slots__ = ("_goto", "_fail", "_out", "_out_link")
+
+    def __init__(self, patterns):
+        goto = [{}]
+        out = [0]  # 以该状态结尾的模式长度（0 表示无）
+        for p in patterns:
+            if not p:
+                continue
+            s = 0
+            for ch in p:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(0)
+                s = nxt
+            out[s] = len(p)
+
+        fail = [0] * len(goto)
+        out_link = [-1] * len(goto)  # 沿 fail 链最近的“有输出”的状态
+        q = deque()
+        for ch, s in goto[0].items():
+            q.append(s)
+        while q:
+            r = q.popleft()
+            for ch, s in goto[r].items():
+                q.append(s)
+                f = fail[r]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fs = goto[f].get(ch, 0)
+                fail[s] = fs if fs != s else 0
+                out_link[s] = fail[s] if out[fail[s]] else out_link[fail[s]]
+        self._goto, self._fail, self._out, self._out_link = goto, fail, out, out_link
+
+    def matches_at_each_start(self, text) -> Dict[int, List[int]]:
+        """一次扫描，返回 {起始下标: 从该处开始的全部匹配长度（降序）}"""
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        found: Dict[int, List[int]] = {}
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            t = s if out[s] else out_link[s]
+            while t > 0:
+                n = out[t]
+                found.setdefault(i - n + 1, []).append(n)
+                t = out_link[t]
+        for lengths in found.values():
+            lengths.sort(reverse=True)
+        return found
+
+
+def _at_name_end(text: str, end: int) -> bool:
+    """名称在 end 处结束是否合法：文本结尾、空白、数字或分隔符"""
+    if end >= len(text):
+        return True
+    ch = text[end]
+    return ch.isspace() or ch.isdigit() or ch in NAME_END_CHARS
+
+
+class NameAnnotator:
+    def __init__(self, name_to_code: Dict[str, str]):
+        self.name_to_code = dict(name_to_code)
+        self._ac = AhoCorasick(self.name_to_code.keys())
+
+    def annotate(self, operation_text: str) -> str:
+        """把 '买入 黄金ETF 20%' 标注为 '买入 黄金ETF(518880.SH) 20%'"""
+        if not operation_text:
+            return operation_text
+        matches = self._ac.matches_at_each_start(operation_text)
+        parts: List[str] = []
+        pos = 0
+        for m in ACTION_RE.finditer(operation_text):
+            if m.start() < pos:
+                continue
+            action = m.group(1)
+            start = m.end()
+            n = next((k for k in matches.get(start, ()) if _at_name_end(operation_text, start + k)), 0)
+            if n:
+                name = operation_text[start:start + n]
+                end = start + n
+                already = end < len(operation_text) and operation_text[end] in "(（"
+                if already:
+                    # 已带代码：与旧逻辑一致地仅规整“动作 + 空格”，其余保持原样
+                    tok = TOKEN_RE.match(operation_text, start)
+                    end = tok.end()
+                    parts.append(operation_text[pos:m.start()])
+                    parts.append(f"{action} {operation_text[start:end]}")
+                else:
+                    parts.append(operation_text[pos:m.start()])
+                    parts.append(f"{action} {name}({self.name_to_code[name]})")
+                pos = end
+                continue
+            tok = TOKEN_RE.match(operation_text, start)
+            if not tok:
+                continue
+            parts.append(operation_text[pos:m.start()])
+            parts.append(f"{action} {tok.group(0)}")
+            pos = tok.end()
+        parts.append(operation_text[pos:])
+        return ''.join(parts)
+
+
+_lock = threading.Lock()
+_cache: Dict[tuple, NameAnnotator] = {}
+
+
+def get_annotator(extra: Optional[Dict[str, str]] = None) -> NameAnnotator:
+    """
+    返回编译好的标注器。extra（调用方的 name->code）优先级最高；
+    缓存键 = 符号表实例（来源文件变化即为新实例）+ extra 的身份/长度。
+    """
+    table = get_symbol_table()
+    key = (table, id(extra) if extra is not None else None, len(extra) if extra else 0)
+    ann = _cache.get(key)
+    if ann is not None:
+        return ann
+    with _lock:
+        ann = _cache.get(key)
+        if ann is None:
+            merged = dict(extra or {})
+            for name, code in table.name_to_code.items():
+                merged.setdefault(name, code)
+            ann = NameAnnotator(merged)
+            if len(_cache) >= 4:
+                _cache.clear()
+            _cache[key] = ann
+    return ann
@@ -0,0 +1,218 @@
+"""
+utils/persistence.py
+统一的 JSON 落盘层：替代各模块里各自实现的 _atomic_write_json / atomic_write_json。
+
+- 编解码：安装了 orjson 时优先使用（比标准库快数倍），否则回退到 json；
+  orjson 不支持的对象（如 Decimal）自动回退到标准库，default=str。
+- 持久化策略（每次调用指定）：
+    DURABILITY_NONE   直接覆盖目标文件（最快，不保证原子）
+    DURABILITY_ATOMIC 写临时文件再 os.replace（默认；读方不会看到半个文件）
+    DURABILITY_FSYNC  ATOMIC + fsync（交易计划等关键文件）
+- 后写队列：write_json_async 只入队，由后台线程落盘；同一路径在队列中只保留最新内容。
+  适用于导出文件、模板等非关键产物，进程退出时自动 flush。
+- 计时：每次写入按 label 统计调用方在作业内的耗时（后台写的实际耗时记为 label + ":bg"），
+  persistence_stats() / log_persistence_stats() 查看。
+
+默认不再缩进（indent=2 的序列化与写入量约为紧凑格式的两倍），需要人工阅读时传 pretty=True
+或设置环境变量 PERSIST_PRETTY=1。
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - 可选依赖
+    orjson = None
+
+DURABILITY_NONE = "none"
+DURABILITY_ATOMIC = "atomic"
+DURABILITY_FSYNC = "fsync"
+_DURABILITIES = (DURABILITY_NONE, DURABILITY_ATOMIC, DURABILITY_FSYNC)
+
+PRETTY_DEFAULT = str(os.getenv("PERSIST_PRETTY", "0")).lower() in ("1", "true", "yes", "y")
+CODEC_NAME = "orjson" if orjson is not None else "json"
+
+
+# ---------- 编解码 ----------
+def dumps_json(obj: Any, pretty: Optional[bool] = None) -> bytes:
+    """序列化为 UTF-8 bytes（中文不转义）"""
+    pretty = PRETTY_DEFAULT if pretty is None else pretty
+    if orjson is not None:
+        opts = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            opts |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=opts)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None, default=str).encode("utf-8")
+
+
+def loads_json(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def read_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads_json(f.read())
+
+
+# ---------- 计时统计 ----------
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _record(label: str, seconds: float, nbytes: int = 0):
+    with _stats_lock:
+        st = _stats.setdefault(label, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0})
+        ms = seconds * 1000.0
+        st["count"] += 1
+        st["total_ms"] += ms
+        st["bytes"] += nbytes
+        if ms > st["max_ms"]:
+            st["max_ms"] = ms
+
+
+@contextmanager
+def timed(label: str):
+    """统计任意代码块的耗时，计入 persistence_stats()"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(label, time.perf_counter() - t0)
+
+
+def persistence_stats(reset: bool = False) -> Dict[str, Dict[str, float]]:
+    with _stats_lock:
+        out = {k: dict(v, avg_ms=(v["total_ms"] / v["count"] if v["count"] else 0.0)) for k, v in _stats.items()}
+        if reset:
+            _stats.clear()
+    return out
+
+
+def log_persistence_stats(reset: bool = False):
+    for label, st in sorted(persistence_stats(reset=reset).items()):
+        logging.info(f"[persistence] {label}: n={st['count']} avg={st['avg_ms']:.2f}ms "
+                     f"max={st['max_ms']:.2f}ms bytes={int(st['bytes'])} codec={CODEC_NAME}")
+
+
+# ---------- 同步写 ----------
+def _write_bytes(path: str, payload: bytes, durability: str):
+    dirpath = os.path.dirname(path)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    if durability == DURABILITY_NONE:
+        with open(path, "wb") as f:
+            f.write(payload)
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=dirpath or ".", prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            if durability == DURABILITY_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+        raise
+
+
+def write_json(path: str, obj: Any, durability: str = DURABILITY_ATOMIC,
+               pretty: Optional[bool] = None, label: str = "write_json"):
+    """同步写 JSON；失败抛异常（与旧 _atomic_write_json 一致）"""
+    if durability not in _DURABILITIES:
+        raise ValueError(f"未知的 durability: {durability}")
+    t0 = time.perf_counter()
+    payload = dumps_json(obj, pretty=pretty)
+    _write_bytes(path, payload, durability)
+    _record(label, time.perf_counter() - t0, len(payload))
+
+
+# ---------- 后写队列 ----------
+class WriteBehindQueue:
+    """按路径合并的后台写队列：同一路径未落盘前再次提交，只写最新内容"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending: Dict[str, tuple] = {}  # path -> (obj, durability, pretty, label)
+        self._inflight = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, path: str, obj: Any, durability: str, pretty: Optional[bool], label: str):
+        with self._cond:
+            self._pending[path] = (obj, durability, pretty, label)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="persistence-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path, item = next(iter(self._pending.items()))
+                del self._pending[path]
+                self._inflight += 1
+            obj, durability, pretty, label = item
+            try:
+                write_json(path, obj, durability=durability, pretty=pretty, label=label + ":bg")
+            except Exception as e:
+                logging.exception(f"后台写入失败 {path}: {e}")
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._inflight
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列写完；超时返回 False"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._inflight:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+_queue = WriteBehindQueue()
+atexit.register(lambda: _queue.flush(timeout=5))
+
+
+def write_json_async(path: str, obj: Any, durability: str = DURABILITY_ATOMIC,
+                     pretty: Optional[bool] = None, label: str = "write_json"):
+    """
+    入队后立即返回（非关键产物）。obj 在落盘前可能被调用方修改，
+    调用方若会复用该对象需自行传入副本。
+    """
+    if durability not in _DURABILITIES:
+        raise ValueError(f"未知的 durability: {durability}")
+    t0 = time.perf_counter()
+    _queue.submit(path, obj, durability, pretty, label)
+    _record(label, time.perf_counter() - t0)
+
+
+def flush_pending(timeout: Optional[float] = None) -> bool:
+    return _queue.flush(timeout)
@@ -0,0 +1,231 @@
+"""
+utils/precise_trigger.py
+高精度定时触发器：用于 sell_time / buy_time 这类对时刻敏感的任务（如 09:24:58 / 09:30:04）。
+
+APScheduler 的 BackgroundScheduler 有自身的唤醒抖动，且与其他任务共用线程池；
+这里每个触发器独占一个线程：
+  1. 粗等待：Event.wait 分段睡到目标前 COARSE_MARGIN 秒（分段是为了跟上系统时钟调整）
+  2. 细等待：短 sleep 到目标前 SPIN_WINDOW 秒
+  3. 自旋：perf_counter 忙等最后几毫秒后立即在本线程执行任务
+Windows 上尽力提高线程优先级并把计时器分辨率设为 1ms（失败忽略）。
+
+每次触发把计划时刻 / 实际时刻 / 偏差 / 执行耗时追加到
+runtime/trigger_skew/skew_YYYYMMDD.jsonl；跨天的偏差分布用
+  python -m utils.precise_trigger --report [--days 20]
+查看。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from utils import account_context
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SKEW_DIR = os.path.join(REPO_ROOT, "runtime", "trigger_skew")
+
+COARSE_MARGIN = 0.5    # 秒：粗等待结束于目标前 0.5s
+COARSE_CHUNK = 30.0    # 秒：粗等待单段上限
+SPIN_WINDOW = 0.02     # 秒：最后 20ms 自旋
+
+
+def _parse_hms(time_str: str):
+    h, m, s = map(int, time_str.split(":"))
+    return h, m, s
+
+
+def next_fire_time(time_str: str, now: Optional[datetime] = None) -> datetime:
+    """与 CronTrigger(hour, minute, second) 相同：每天该时刻；已过则为明天"""
+    now = now or datetime.now()
+    h, m, s = _parse_hms(time_str)
+    target = now.replace(hour=h, minute=m, second=s, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return target
+
+
+def _boost_current_thread():
+    """Windows：提高当前线程优先级并请求 1ms 计时器分辨率；其他平台不处理"""
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        THREAD_PRIORITY_HIGHEST = 2
+        ctypes.windll.kernel32.SetThreadPriority(ctypes.windll.kernel32.GetCurrentThread(), THREAD_PRIORITY_HIGHEST)
+        ctypes.windll.winmm.timeBeginPeriod(1)
+    except Exception:
+        pass
+
+
+def _record_skew(entry: dict):
+    try:
+        os.makedirs(SKEW_DIR, exist_ok=True)
+        path = os.path.join(SKEW_DIR, f"skew_{entry['scheduled'][:10].replace('-', '')}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logging.warning(f"写入触发偏差记录失败: {e}")
+
+
+class PreciseTrigger:
+    def __init__(self, name: str, func: Callable, time_str: str, account_id=None, args=None,
+                 spin_window: float = SPIN_WINDOW, coarse_margin: float = COARSE_MARGIN):
+        self.name = name
+        self.func = func
+        self.time_str = time_str
+        self.account_id = None if account_id is None else str(account_id)
+        self.args = tuple(args or [])
+        self.spin_window = spin_window
+        self.coarse_margin = max(coarse_margin, spin_window)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_skew_ms: Optional[float] = None
+        self._context = account_context.current()  # 触发线程继承创建者的账户上下文
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        suffix = f"-{self.account_id}" if self.account_id else ""
+        self._thread = threading.Thread(target=self._run, name=f"precise-{self.name}{suffix}", daemon=True)
+        self._thread.start()
+        logging.info(f"已添加高精度定时任务: {self.name} @ {self.time_str}（自旋 {self.spin_window * 1000:.0f}ms）")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _wait_until(self, target_ts: float) -> bool:
+        """等到 target_ts（time.time() 时间轴）；被 stop 返回 False"""
+        while True:
+            remaining = target_ts - time.time()
+            if remaining <= self.coarse_margin:
+                break
+            if self._stop.wait(min(COARSE_CHUNK, remaining - self.coarse_margin)):
+                return False
+        # 换到 perf_counter 时间轴，避免自旋期间 time.time() 的粗粒度
+        target_perf = time.perf_counter() + (target_ts - time.time())
+        while True:
+            remaining = target_perf - time.perf_counter()
+            if remaining <= self.spin_window:
+                break
+            time.sleep(min(remaining - self.spin_window, 0.005))
+        while time.perf_counter() < target_perf:
+            pass
+        return not self._stop.is_set()
+
+    def _run(self):
+        account_context.bind(*self._context)
+        _boost_current_thread()
+        while not self._stop.is_set():
+            target = next_fire_time(self.time_str)
+            if not self._wait_until(target.timestamp()):
+                return
+            actual_ts = time.time()
+            skew_ms = (actual_ts - target.timestamp()) * 1000.0
+            self.last_skew_ms = skew_ms
+            t0 = time.perf_counter()
+            error = None
+            try:
+                self.func(*self.args)
+            except Exception as e:
+                error = repr(e)
+                logging.exception(f"高精度定时任务 {self.name} 执行失败: {e}")
+            run_ms = (time.perf_counter() - t0) * 1000.0
+            _record_skew({
+                "name": self.name,
+                "account_id": self.account_id,
+                "scheduled": target.isoformat(timespec="milliseconds"),
+                "actual": datetime.fromtimestamp(actual_ts).isoformat(timespec="microseconds"),
+                "skew_ms": round(skew_ms, 3),
+                "run_ms": round(run_ms, 1),
+                "error": error,
+            })
+            logging.info(f"高精度定时任务 {self.name} 触发偏差 {skew_ms:+.3f}ms，执行耗时 {run_ms:.1f}ms")
+            # 防止同一秒内重复触发
+            if self._stop.wait(1.0):
+                return
+
+
+_triggers: Dict[str, PreciseTrigger] = {}
+
+
+def add_precise_job(func: Callable, time_str: str, job_id: str, account_id=None, args=None) -> PreciseTrigger:
+    """注册并启动；同一账户的同名任务先停止旧的（与 add_cron_job 的 replace_existing 一致）"""
+    key = f"{job_id}@{account_id}" if account_id is not None else job_id
+    old = _triggers.pop(key, None)
+    if old is not None:
+        old.stop()
+    trig = PreciseTrigger(job_id, func, time_str, account_id=account_id, args=args).start()
+    _triggers[key] = trig
+    return trig
+
+
+def stop_all():
+    for t in list(_triggers.values()):
+        t.stop()
+    _triggers.clear()
+
+
+# ---------- 报告 ----------
+def load_skew_records(days: int = 20) -> List[dict]:
+    records = []
+    if not os.path.isdir(SKEW_DIR):
+        return records
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
+    for fn in sorted(os.listdir(SKEW_DIR)):
+        if not (fn.startswith("skew_") and fn.endswith(".jsonl")) or fn[5:13] < cutoff:
+            continue
+        with open(os.path.join(SKEW_DIR, fn), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except Exception:
+                    pass
+    return records
+
+
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return float("nan")
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+def skew_report(records: List[dict]) -> str:
+    groups: Dict[tuple, List[float]] = {}
+    for r in records:
+        groups.setdefault((r.get("name"), r.get("account_id")), []).append(float(r.get("skew_ms", 0.0)))
+    lines = [f"{'任务':<24}{'账户':<14}{'次数':>6}{'均值ms':>10}{'p50':>9}{'p95':>9}{'最小':>9}{'最大':>9}"]
+    for (name, acct), vals in sorted(groups.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1]))):
+        vals.sort()
+        lines.append(f"{str(name):<24}{str(acct or '-'):<14}{len(vals):>6}{sum(vals) / len(vals):>10.3f}"
+                     f"{_pct(vals, 0.5):>9.3f}{_pct(vals, 0.95):>9.3f}{vals[0]:>9.3f}{vals[-1]:>9.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="高精度触发器偏差报告")
+    ap.add_argument("--report", action="store_true")
+    ap.add_argument("--days", type=int, default=20)
+    args = ap.parse_args()
+    records = load_skew_records(args.days)
+    if not records:
+        print(f"没有触发记录（{SKEW_DIR}）")
+        return 0
+    print(skew_report(records))
+    print()
+    by_day: Dict[str, List[dict]] = {}
+    for r in records:
+        by_day.setdefault(r["scheduled"][:10], []).append(r)
+    for day in sorted(by_day):
+        items = ", ".join(f"{r['name']}@{r.get('account_id') or '-'} {r['skew_ms']:+.3f}ms" for r in by_day[day])
+        print(f"{day}: {items}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
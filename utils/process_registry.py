@@ -0,0 +1,294 @@
+"""
+utils/process_registry.py
+基于锁文件 / pid 文件的进程登记，替代逐个遍历系统进程（psutil.process_iter + cmdline/environ）。
+
+runtime/pids/ 下：
+  account_{name}.lock / .pid   账户实例锁（操作系统级咨询锁，进程退出即释放）与其 pid 记录
+  {ui_id}.pid                   GUI 启动的 main.py 进程（main.py 原有格式，新增 create_time 行）
+  qmt_{hash}.pid                QMT 客户端进程（按可执行文件路径区分安装目录）
+  qmt_desktop.lock              QMT 桌面操作锁（重启 / 自动登录 / 最小化窗口），跨进程串行
+
+每条 pid 记录都带 create_time，查找时用 psutil.Process(pid).create_time() 校验，防止 pid 复用误判；
+记录缺失或失效时才回退到全量扫描（scan_* 函数），扫描命中后写回记录，下次即为 O(1)。
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import psutil
+from filelock import FileLock, Timeout
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PIDS_DIR = os.path.join(REPO_ROOT, "runtime", "pids")
+
+_held_locks = {}
+_guard = threading.Lock()
+_desktop_lock = None
+
+# 等待桌面锁的上限：超时后记录错误并继续启动（不让账户无限期卡住）
+DESKTOP_LOCK_TIMEOUT = 600
+
+
+def _safe_name(name) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(name))
+
+
+def _alive(pid, create_time=None) -> Optional[psutil.Process]:
+    """pid 存活且（给定时）创建时间一致则返回 Process，否则 None"""
+    try:
+        p = psutil.Process(int(pid))
+        if not p.is_running():
+            return None
+        if create_time is not None and abs(p.create_time() - float(create_time)) > 1.0:
+            return None
+        return p
+    except (psutil.Error, ValueError, TypeError):
+        return None
+
+
+def _create_time(pid) -> Optional[float]:
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.Error:
+        return None
+
+
+def _write_record(path, record: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_record(path) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------- 账户单实例 ----------
+def acquire_account_lock(account_name) -> bool:
+    """
+    获取账户实例锁；已被其他存活进程持有返回 False。
+    锁在本进程内一直持有（进程退出由操作系统释放），同时写入 account_{name}.pid。
+    """
+    name = _safe_name(account_name).lower()
+    with _guard:
+        if name in _held_locks:
+            return True
+        os.makedirs(PIDS_DIR, exist_ok=True)
+        lock = FileLock(os.path.join(PIDS_DIR, f"account_{name}.lock"), timeout=0)
+        try:
+            lock.acquire()
+        except Timeout:
+            return False
+        _held_locks[name] = lock
+    pid = os.getpid()
+    _write_record(os.path.join(PIDS_DIR, f"account_{name}.pid"), {
+        "pid": pid, "create_time": _create_time(pid), "account": str(account_name),
+        "cmd": " ".join(sys.argv), "started_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    return True
+
+
+def release_account_lock(account_name):
+    name = _safe_name(account_name).lower()
+    with _guard:
+        lock = _held_locks.pop(name, None)
+    if lock is not None:
+        _remove(os.path.join(PIDS_DIR, f"account_{name}.pid"))
+        try:
+            lock.release()
+        except Exception:
+            pass
+
+
+def account_process(account_name) -> Optional[psutil.Process]:
+    """持有该账户锁的进程（按 pid 记录 O(1) 查找）；没有返回 None"""
+    rec = _read_record(os.path.join(PIDS_DIR, f"account_{_safe_name(account_name).lower()}.pid"))
+    return _alive(rec.get("pid"), rec.get("create_time")) if rec else None
+
+
+# ---------- GUI 启动的进程（{ui_id}.pid） ----------
+def ui_pid_path(ui_id) -> str:
+    return os.path.join(PIDS_DIR, f"{_safe_name(ui_id)}.pid")
+
+
+def write_ui_pid_file(ui_id) -> Optional[str]:
+    """沿用 main.py 原有的 key: value 文本格式，新增 create_time 行用于校验"""
+    try:
+        if not ui_id:
+            return None
+        os.makedirs(PIDS_DIR, exist_ok=True)
+        path = ui_pid_path(ui_id)
+        pid = os.getpid()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"pid: {pid}\n")
+            f.write(f"create_time: {_create_time(pid)}\n")
+            f.write(f"cmd: {' '.join(sys.argv)}\n")
+            f.write(f"started_at: {datetime.now().isoformat()}\n")
+        return path
+    except Exception:
+        return None
+
+
+def _read_kv(path) -> dict:
+    out = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                k, sep, v = line.partition(":")
+                if sep:
+                    out[k.strip()] = v.strip()
+    except Exception:
+        pass
+    return out
+
+
+def lookup_ui_process(ui_id) -> Optional[psutil.Process]:
+    """ui_id -> 存活的 main.py 进程；pid 文件缺失或失效返回 None"""
+    if not ui_id:
+        return None
+    kv = _read_kv(ui_pid_path(ui_id))
+    if not kv.get("pid"):
+        return None
+    ct = kv.get("create_time")
+    try:
+        ct = float(ct) if ct not in (None, "", "None") else None
+    except ValueError:
+        ct = None
+    return _alive(kv["pid"], ct)
+
+
+def scan_ui_processes(ui_id) -> List[psutil.Process]:
+    """回退：全量扫描 cmdline 含 ui_id 的进程"""
+    found = []
+    for p in psutil.process_iter(["pid", "cmdline"]):
+        try:
+            if ui_id in " ".join(p.info.get("cmdline") or []):
+                found.append(p)
+        except Exception:
+            continue
+    return found
+
+
+# ---------- QMT 客户端 ----------
+def _qmt_record_path(program_path) -> str:
+    h = hashlib.sha1(os.path.normcase(os.path.normpath(str(program_path))).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(PIDS_DIR, f"qmt_{h}.pid")
+
+
+def record_qmt_process(program_path, pid):
+    try:
+        p = psutil.Process(pid)
+        _write_record(_qmt_record_path(program_path), {
+            "pid": pid, "create_time": p.create_time(), "name": p.name(), "exe": str(program_path),
+        })
+    except Exception as e:
+        logging.debug(f"记录 QMT 进程失败: {e}")
+
+
+def forget_qmt_process(program_path):
+    _remove(_qmt_record_path(program_path))
+
+
+def _name_matches(p: psutil.Process, names: Iterable[str], program_path=None) -> bool:
+    lower = {n.lower() for n in names}
+    try:
+        if p.name().lower() in lower:
+            return True
+        exe = p.exe() or ""
+        if program_path and os.path.normcase(exe) == os.path.normcase(str(program_path)):
+            return True
+        return os.path.basename(exe).lower() in lower
+    except psutil.Error:
+        return False
+
+
+def scan_processes_by_names(names: Iterable[str], program_path=None) -> List[psutil.Process]:
+    """回退：全量扫描；program_path 给定时要求 exe 路径也一致"""
+    lower = [n.lower() for n in names]
+    found = []
+    for p in psutil.process_iter(["pid", "name", "exe", "cmdline"]):
+        try:
+            nm = (p.info.get("name") or "").lower()
+            exe = p.info.get("exe") or ""
+            cmd0 = (p.info.get("cmdline") or [""])[0] if p.info.get("cmdline") else ""
+            if program_path is not None:
+                if exe and os.path.normcase(exe) == os.path.normcase(str(program_path)) and nm in lower:
+                    found.append(p)
+                continue
+            if nm in lower or os.path.basename(exe).lower() in lower or (cmd0 and os.path.basename(cmd0).lower() in lower):
+                found.append(p)
+        except Exception:
+            continue
+    return found
+
+
+def find_qmt_processes(names: Iterable[str], program_path=None, fallback: bool = True) -> List[psutil.Process]:
+    """
+    QMT 客户端进程：program_path 给定时只看该安装目录的记录，否则看所有 qmt_*.pid 记录；
+    记录全部失效且 fallback=True 时扫描一次，并把结果写回记录。
+    """
+    names = list(names)
+    paths = [_qmt_record_path(program_path)] if program_path else (
+        [os.path.join(PIDS_DIR, fn) for fn in os.listdir(PIDS_DIR) if fn.startswith("qmt_") and fn.endswith(".pid")]
+        if os.path.isdir(PIDS_DIR) else [])
+    found = []
+    for path in paths:
+        rec = _read_record(path)
+        p = _alive(rec.get("pid"), rec.get("create_time")) if rec else None
+        if p is not None and _name_matches(p, names, program_path):
+            found.append(p)
+    if found or not fallback:
+        return found
+    found = scan_processes_by_names(names, program_path)
+    for p in found:
+        try:
+            record_qmt_process(program_path or p.exe(), p.pid)
+        except psutil.Error:
+            pass
+    return found
+
+
+# ---------- QMT 桌面操作 ----------
+@contextmanager
+def qmt_desktop_session(timeout=DESKTOP_LOCK_TIMEOUT):
+    """
+    重启 QMT、自动登录（按窗口标题聚焦、剪贴板粘贴密码、回车）与最小化窗口都作用于共享桌面，
+    不同安装目录的账户同时执行会把密码粘进别的账户的登录窗口。
+    此锁跨进程（GUI 并行启动的各 main.py、多账户宿主）串行这些步骤；同一线程内可重入。
+    """
+    global _desktop_lock
+    with _guard:
+        if _desktop_lock is None:
+            os.makedirs(PIDS_DIR, exist_ok=True)
+            _desktop_lock = FileLock(os.path.join(PIDS_DIR, "qmt_desktop.lock"))
+        lock = _desktop_lock
+    acquired = False
+    try:
+        lock.acquire(timeout=timeout)
+        acquired = True
+    except Timeout:
+        logging.error(f"等待 QMT 桌面操作锁超过 {timeout}s，继续执行（可能与其他账户的登录窗口冲突）")
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
@@ -0,0 +1,64 @@
+"""
+utils/readiness.py
+账户进程的启动就绪探针。
+
+main.py 在启动各阶段向 stdout 输出一行标记（GUI 本来就逐行读取子进程 stdout）：
+  @@READY {"stage": "qmt_connected", "account": "8886006288", "elapsed": 3.21, ...}
+阶段依次为 STAGES；最后一个阶段（scheduler_started）表示该账户已就绪。
+GUI 用 parse_marker() 识别标记，据此并行启动账户：共用同一 QMT 安装目录（conflict_key 相同）
+的账户等前一个就绪后再启动，其余账户不再固定间隔排队。
+重启 / 自动登录 / 最小化窗口作用于共享桌面，由 main.py 在 qmt_connected 之前持有的跨进程锁
+（process_registry.qmt_desktop_session）串行，只有之后的阶段真正并行。
+"""
+import os
+import sys
+import json
+import time
+import threading
+from typing import Optional
+
+MARKER = "@@READY "
+
+STAGE_CONFIG_LOADED = "config_loaded"
+STAGE_QMT_CONNECTED = "qmt_connected"
+STAGE_SNAPSHOT_TAKEN = "snapshot_taken"
+STAGE_SCHEDULER_STARTED = "scheduler_started"
+STAGE_FAILED = "failed"
+STAGES = (STAGE_CONFIG_LOADED, STAGE_QMT_CONNECTED, STAGE_SNAPSHOT_TAKEN, STAGE_SCHEDULER_STARTED)
+READY_STAGE = STAGE_SCHEDULER_STARTED
+
+_T0 = time.monotonic()
+_emit_lock = threading.Lock()
+
+
+def report(stage: str, account=None, **info):
+    """输出一行就绪标记（失败不抛异常）；elapsed 为进程内自模块导入起的秒数"""
+    payload = {"stage": stage, "account": None if account is None else str(account),
+               "elapsed": round(time.monotonic() - _T0, 3)}
+    payload.update(info)
+    try:
+        line = MARKER + json.dumps(payload, ensure_ascii=False, default=str)
+        with _emit_lock:
+            stream = sys.stdout
+            stream.write(line + "\n")
+            stream.flush()
+    except Exception:
+        pass
+
+
+def parse_marker(line: str) -> Optional[dict]:
+    """GUI 侧：是就绪标记则返回 payload，否则 None"""
+    if not line or not line.startswith(MARKER):
+        return None
+    try:
+        return json.loads(line[len(MARKER):])
+    except Exception:
+        return None
+
+
+def conflict_key(config: Optional[dict]) -> Optional[str]:
+    """同一 QMT 安装目录的账户不能并行启动（重启 / 登录 / 窗口处理会互相干扰）"""
+    path = (config or {}).get("path_qmt")
+    if not path:
+        return None
+    return os.path.normcase(os.path.normpath(str(path).strip()))
@@ -1,9 +1,8 @@
 # coding:utf-8
 import datetime
 import json
-from xtquant import xtdata
-
 from utils.code_normalizer import normalize_code
+from utils.live_quotes import get_live_quotes
 
 def auto_add_suffix(code):
     """
@@ -44,7 +43,7 @@ def get_latest_prices(stock_codes):
     codes_with_suffix = [auto_add_suffix(code) for code in stock_codes]
     # 输出调试信息
     print("查询的带后缀代码列表：", codes_with_suffix)
-    full_ticks = xtdata.get_full_tick(codes_with_suffix)
+    full_ticks = get_live_quotes().get_ticks(codes_with_suffix)
     print("full_ticks原始内容：", full_ticks)
     for original_code, code in zip(stock_codes, codes_with_suffix):
         tick = full_ticks.get(code)
@@ -6,8 +6,7 @@
 """
 import os
 from typing import Tuple, Dict, Callable, Optional
-from utils.config_loader import load_json_file
-from utils.stock_code_mapper import generate_reverse_mapping, load_stock_codes
+from utils.symbol_table import get_symbol_table
 from utils.code_normalizer import normalize_code
 
 # 定义文件路径常量（与仓库约定）
@@ -35,73 +34,9 @@ def load_stock_code_maps() -> Tuple[Dict[str, str], Callable[[str], Optional[str
       - stock_code_dict: mapping name -> code (normalized)
       - get_stock_code(name): function to lookup code by name
       - reverse_mapping: mapping base_code (no suffix) -> name (for quick lookup)
-    """
-    # 1) load core stock code file
-    try:
-        stock_code_data = load_json_file(STOCK_CODE_FILE_PATH) or {}
-    except Exception:
-        stock_code_data = {}
-
-    # normalize shape: if file maps code->name, invert to name->code
-    stock_code_dict = {}
-    sample_key = next(iter(stock_code_data.keys()), None) if isinstance(stock_code_data, dict) else None
-    try:
-        if sample_key and isinstance(sample_key, str) and sample_key.strip().isdigit() and len(sample_key.strip()) == 6:
-            # assume code->name mapping: invert
-            for code, name in stock_code_data.items():
-                if not name:
-                    continue
-                stock_code_dict[str(name).strip()] = normalize_code(str(code).strip())
-        else:
-            # assume name->code mapping already
-            for name, code in stock_code_data.items():
-                if not name or code is None:
-                    continue
-                stock_code_dict[str(name).strip()] = normalize_code(str(code).strip())
-    except Exception:
-        # fallback: try load via stock_code_mapper (file-based)
-        try:
-            stock_code_dict = load_stock_codes(STOCK_CODE_FILE_PATH)
-        except Exception:
-            stock_code_dict = {}
-
-    # 2) load full_name->code mapping if present (name_vs_code)
-    try:
-        full_map = load_json_file(FULL_CODE_FILE_PATH) or {}
-        # normalize values
-        for k, v in full_map.items():
-            if not v:
-                continue
-            # if v is code string, normalize and set if name not in core
-            if isinstance(v, str):
-                nm = str(k).strip()
-                if nm not in stock_code_dict:
-                    stock_code_dict[nm] = normalize_code(str(v).strip())
-    except Exception:
-        pass
 
-    # reverse mapping: basecode -> name (prefer core mapping)
-    reverse_mapping = generate_reverse_mapping(stock_code_dict)
-    # ensure reverse mapping keys are base (no suffix)
-    reverse_mapping_norm = {}
-    for base, name in reverse_mapping.items():
-        try:
-            base_str = str(base).split('.')[0]
-            reverse_mapping_norm[base_str] = name
-        except Exception:
-            reverse_mapping_norm[str(base)] = name
-
-    # get_stock_code function
-    def get_stock_code(name: str) -> Optional[str]:
-        if not name:
-            return None
-        name = str(name).strip()
-        if name in stock_code_dict:
-            return stock_code_dict[name]
-        # try reverse lookup by name normalization (some files store code as key)
-        # fallback: try direct numeric name treated as code
-        if name.isdigit() and len(name) == 6:
-            return normalize_code(name)
-        return None
-
-    return stock_code_dict, get_stock_code, reverse_mapping_norm
\ No newline at end of file
+    三者均来自进程内共享的 utils.symbol_table（core_stock_code > code_index > name_vs_code），
+    name_vs_code.json 按实际的 code->name 形状解析。
+    """
+    table = get_symbol_table()
+    return dict(table.name_to_code), table.code_of, dict(table.base_to_name)
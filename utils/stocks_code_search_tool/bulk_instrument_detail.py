@@ -3,6 +3,10 @@ import json
 import time
 from xtquant import xtdata
 
+from utils.stocks_code_search_tool.instrument_db import build_pack, iter_legacy_dir, DEFAULT_PACK_PATH
+
+# 基础信息逐个写 all_stocks_info/<code>.json（源数据）；拉取结束后由该目录重建 stocks_data/instruments.pack（InstrumentDB 读取）
+
 def save_instrument_detail(stock_code, data, save_dir):
     # 路径必须与下方main里save_dir完全一致
     os.makedirs(save_dir, exist_ok=True)
@@ -63,6 +67,10 @@ def main():
                 print(f"Error {code}: {e}")
             time.sleep(0.005)
 
+    # 目录中包含以往拉取的全部代码：本次拉取失败的代码保留旧数据
+    n = build_pack(iter_legacy_dir(save_dir), DEFAULT_PACK_PATH)
+    print(f"Packed {n} instruments -> {DEFAULT_PACK_PATH}")
+
     # 最后再保存一次 name_vs_code.json
     with open(name_vs_code_path, "w", encoding="utf-8") as f:
         json.dump(name_vs_code, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,293 @@
+"""
+utils/stocks_code_search_tool/instrument_db.py
+证券基础信息打包库：把原先 stocks_data/all_stocks_info/ 下每个代码一个 JSON 的 6k+ 小文件
+打包成单个二进制文件 stocks_data/instruments.pack，读取时 mmap，按代码二分查找、按需解析。
+
+文件格式（小端）：
+  头部   HEADER_FMT = magic(8s) version(I) count(I) index_offset(Q)
+  数据区 每条记录一段紧凑 UTF-8 JSON（与 xtdata.get_instrument_detail 返回的字典相同）
+  索引区 count 条定长记录，按代码升序：
+         code(12s, ASCII 右补 \\0) offset(Q) length(I) name(48s, UTF-8 右补 \\0)
+
+- get(code)：O(log n) 二分定位，只解析这一条；解析结果缓存
+- codes() / names()：只读索引区，不解析任何 JSON，全市场扫描很快
+- iter_details()：顺序读数据区逐条解析
+
+all_stocks_info/ 仍是源数据（纳入版本库）；instruments.pack 是由它生成的构建产物，不纳入版本库（.gitignore），
+文件不存在时 get_instrument_db() 返回 None。
+构建：python -m utils.stocks_code_search_tool.instrument_db --from-dir [目录，默认 all_stocks_info]
+      或由 bulk_instrument_detail.py 从 xtdata 拉取、写完各 <code>.json 后调用 build_pack。
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+import time
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from utils.code_normalizer import normalize_code
+except Exception:  # 作为独立脚本运行时
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from utils.code_normalizer import normalize_code
+
+STOCKS_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stocks_data")
+DEFAULT_PACK_PATH = os.path.join(STOCKS_DATA_DIR, "instruments.pack")
+LEGACY_DIR = os.path.join(STOCKS_DATA_DIR, "all_stocks_info")
+
+MAGIC = b"INSTPK01"
+VERSION = 1
+HEADER_FMT = "<8sIIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+ENTRY_FMT = "<12sQI48s"
+ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
+CODE_LEN = 12
+NAME_LEN = 48
+
+
+def _encode_fixed(text: str, size: int) -> bytes:
+    """UTF-8 编码并按字符边界截断到 size 字节"""
+    raw = (text or "").encode("utf-8")
+    if len(raw) > size:
+        raw = raw[:size]
+        while raw:
+            try:
+                raw.decode("utf-8")
+                break
+            except UnicodeDecodeError:
+                raw = raw[:-1]
+    return raw
+
+
+def _decode_fixed(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+
+# ---------- 构建 ----------
+def build_pack(records: Iterable[Tuple[str, dict]], out_path: str = DEFAULT_PACK_PATH) -> int:
+    """records: (code, detail_dict)；同一代码后出现者覆盖。原子写入 out_path，返回条数"""
+    by_code: Dict[str, dict] = {}
+    for code, detail in records:
+        key = normalize_code(code)
+        if len(key.encode("ascii")) > CODE_LEN:
+            raise ValueError(f"代码过长: {key}")
+        by_code[key] = detail
+
+    codes = sorted(by_code)
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".tmp_", suffix=".pack")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * HEADER_SIZE)
+            entries = []
+            offset = HEADER_SIZE
+            for code in codes:
+                detail = by_code[code]
+                blob = json.dumps(detail, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                f.write(blob)
+                entries.append((code, offset, len(blob), str(detail.get("InstrumentName") or "")))
+                offset += len(blob)
+            index_offset = offset
+            for code, off, length, name in entries:
+                f.write(struct.pack(ENTRY_FMT, code.encode("ascii"), off, length, _encode_fixed(name, NAME_LEN)))
+            f.seek(0)
+            f.write(struct.pack(HEADER_FMT, MAGIC, VERSION, len(entries), index_offset))
+        # Windows 下被 mmap / 打开着的文件不能被替换：先关闭本进程缓存的实例，持锁替换，避免期间被重新打开
+        with _db_lock:
+            _close_cached(out_path)
+            _replace_with_retry(tmp_path, out_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(codes)
+
+
+def _replace_with_retry(src: str, dst: str, attempts: int = 10, delay: float = 0.2):
+    """os.replace；目标被其他进程短暂占用（杀毒 / 索引服务）时重试，仍失败则提示关闭占用进程"""
+    for i in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if i == attempts - 1:
+                raise PermissionError(f"无法替换 {dst}：文件被其他进程占用（请先关闭正在读取 instruments.pack 的程序）")
+            time.sleep(delay)
+
+
+def iter_legacy_dir(src_dir: str = LEGACY_DIR) -> Iterator[Tuple[str, dict]]:
+    """读取 <code>.json 目录（打包的数据源）"""
+    for fn in sorted(os.listdir(src_dir)):
+        if not fn.endswith(".json"):
+            continue
+        with open(os.path.join(src_dir, fn), "r", encoding="utf-8") as f:
+            detail = json.load(f)
+        yield fn[:-len(".json")], detail
+
+
+# ---------- 读取 ----------
+class InstrumentDB:
+    def __init__(self, path: str = DEFAULT_PACK_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, version, count, index_offset = struct.unpack_from(HEADER_FMT, self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} 不是有效的 instruments.pack（magic={magic!r} version={version}）")
+        self._count = count
+        self._index_offset = index_offset
+        self._parsed: Dict[str, dict] = {}
+
+    def close(self):
+        """释放 mmap 与文件句柄（可重复调用）；关闭后只能命中已解析的缓存"""
+        try:
+            if not self._mm.closed:
+                self._mm.close()
+        finally:
+            if not self._file.closed:
+                self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def _entry(self, i: int):
+        return struct.unpack_from(ENTRY_FMT, self._mm, self._index_offset + i * ENTRY_SIZE)
+
+    def _code_at(self, i: int) -> bytes:
+        start = self._index_offset + i * ENTRY_SIZE
+        return self._mm[start:start + CODE_LEN].rstrip(b"\0")
+
+    def _find(self, code: str) -> int:
+        key = normalize_code(code).encode("ascii", errors="ignore")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._code_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._code_at(lo) == key:
+            return lo
+        return -1
+
+    def __contains__(self, code) -> bool:
+        return self._find(code) >= 0
+
+    def get_raw(self, code: str) -> Optional[bytes]:
+        i = self._find(code)
+        if i < 0:
+            return None
+        _, offset, length, _ = self._entry(i)
+        return self._mm[offset:offset + length]
+
+    def get(self, code: str, default=None) -> Optional[dict]:
+        """返回与 xtdata.get_instrument_detail 相同结构的字典（只读：调用方不要修改）"""
+        key = normalize_code(code)
+        hit = self._parsed.get(key)
+        if hit is not None:
+            return hit
+        raw = self.get_raw(key)
+        if raw is None:
+            return default
+        detail = json.loads(raw)
+        self._parsed[key] = detail
+        return detail
+
+    def name(self, code: str) -> Optional[str]:
+        i = self._find(code)
+        return _decode_fixed(self._entry(i)[3]) if i >= 0 else None
+
+    def codes(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._code_at(i).decode("ascii")
+
+    def names(self) -> Dict[str, str]:
+        """code -> InstrumentName，只读索引区"""
+        out = {}
+        for i in range(self._count):
+            code, _, _, name = self._entry(i)
+            out[code.rstrip(b"\0").decode("ascii")] = _decode_fixed(name)
+        return out
+
+    def iter_details(self) -> Iterator[Tuple[str, dict]]:
+        for i in range(self._count):
+            code, offset, length, _ = self._entry(i)
+            yield code.rstrip(b"\0").decode("ascii"), json.loads(self._mm[offset:offset + length])
+
+
+_db_lock = threading.Lock()
+_dbs: Dict[str, Tuple[Tuple[int, int], InstrumentDB]] = {}
+
+
+def _close_cached(path: str):
+    """移除并关闭缓存的实例（调用方持 _db_lock）"""
+    cached = _dbs.pop(os.path.abspath(path), None)
+    if cached is not None:
+        try:
+            cached[1].close()
+        except Exception:
+            pass
+
+
+def _invalidate(path: str):
+    with _db_lock:
+        _close_cached(path)
+
+
+def get_instrument_db(path: str = DEFAULT_PACK_PATH) -> Optional[InstrumentDB]:
+    """进程内共享的只读实例；文件 (mtime, size) 变化后自动重新打开。文件不存在返回 None"""
+    key = os.path.abspath(path)
+    try:
+        st = os.stat(key)
+    except OSError:
+        return None
+    sig = (st.st_mtime_ns, st.st_size)
+    cached = _dbs.get(key)
+    if cached and cached[0] == sig:
+        return cached[1]
+    with _db_lock:
+        cached = _dbs.get(key)
+        if cached and cached[0] == sig:
+            return cached[1]
+        # 文件已被外部替换：关闭旧实例的 mmap / 句柄再打开新文件
+        _close_cached(key)
+        db = InstrumentDB(key)
+        _dbs[key] = (sig, db)
+        return db
+
+
+def get_instrument_detail(code: str) -> Optional[dict]:
+    """本地查询（无 xtdata 时的替代）；未命中返回 None"""
+    db = get_instrument_db()
+    return db.get(code) if db is not None else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="构建 / 查询 instruments.pack")
+    ap.add_argument("--from-dir", nargs="?", const=LEGACY_DIR, help="从 <code>.json 目录构建（默认 all_stocks_info）")
+    ap.add_argument("--out", default=DEFAULT_PACK_PATH)
+    ap.add_argument("--get", help="按代码查询一条")
+    args = ap.parse_args()
+    if args.from_dir:
+        n = build_pack(iter_legacy_dir(args.from_dir), args.out)
+        print(f"已打包 {n} 条 -> {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+    if args.get:
+        db = InstrumentDB(args.out)
+        print(json.dumps(db.get(args.get), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+utils/symbol_table.py
+进程内唯一的证券名称 <-> 代码符号表。
+
+来源与优先级（先出现者优先，两个方向一致）：
+  1. core_parameters/stocks/core_stock_code.json   人工维护的核心映射（name->code，兼容 code->name）
+  2. yunfei_ball/code_index.json                   code -> [别名...]
+  3. utils/stocks_code_search_tool/stocks_data/name_vs_code.json   全市场 code -> 名称（兼容 name->code）
+
+- name_to_code：名称 -> 带后缀代码；O(1)
+- code_to_name：带后缀代码 -> 名称；base_to_name：6 位代码 -> 名称（用于不带后缀的查询）
+- 编译结果以 pickle 缓存到 runtime/cache/symbol_table.pkl，缓存键为三个来源文件的 (mtime, size)；
+  来源变化后下次 get_symbol_table() 自动重建（文件状态最多每 CHECK_INTERVAL 秒检查一次）。
+"""
+import os
+import re
+import json
+import time
+import pickle
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from .code_normalizer import normalize_code
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CORE_STOCK_CODE_PATH = os.path.join(REPO_ROOT, "core_parameters", "stocks", "core_stock_code.json")
+CODE_INDEX_PATH = os.path.join(REPO_ROOT, "yunfei_ball", "code_index.json")
+NAME_VS_CODE_PATH = os.path.join(REPO_ROOT, "utils", "stocks_code_search_tool", "stocks_data", "name_vs_code.json")
+SOURCE_PATHS = (CORE_STOCK_CODE_PATH, CODE_INDEX_PATH, NAME_VS_CODE_PATH)
+
+CACHE_PATH = os.path.join(REPO_ROOT, "runtime", "cache", "symbol_table.pkl")
+CACHE_FORMAT = 1
+CHECK_INTERVAL = 2.0  # 秒
+
+_CODE_RE = re.compile(r'\d{6}(\.(SH|SZ))?', re.IGNORECASE)
+
+
+def _is_code(s) -> bool:
+    return bool(_CODE_RE.fullmatch(str(s).strip()))
+
+
+def _load_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f) or {}
+    except Exception:
+        return {}
+
+
+class SymbolTable:
+    __slots__ = ("name_to_code", "code_to_name", "base_to_name", "sources_key")
+
+    def __init__(self, sources_key=None):
+        self.name_to_code: Dict[str, str] = {}
+        self.code_to_name: Dict[str, str] = {}
+        self.base_to_name: Dict[str, str] = {}
+        self.sources_key = sources_key
+
+    def _add(self, name, code):
+        name = str(name or "").strip()
+        code = normalize_code(str(code or "").strip())
+        if not name or not code:
+            return
+        if name not in self.name_to_code:
+            self.name_to_code[name] = code
+        if code not in self.code_to_name:
+            self.code_to_name[code] = name
+        base = code.split('.')[0]
+        if base not in self.base_to_name:
+            self.base_to_name[base] = name
+
+    @classmethod
+    def build(cls, paths=SOURCE_PATHS, sources_key=None) -> "SymbolTable":
+        core_path, code_index_path, name_vs_code_path = paths
+        t = cls(sources_key)
+        for k, v in _load_json(core_path).items():
+            if _is_code(k):
+                t._add(v, k)
+            else:
+                t._add(k, v)
+        for code_key, names in _load_json(code_index_path).items():
+            for name in (names or []):
+                t._add(name, code_key)
+        for k, v in _load_json(name_vs_code_path).items():
+            if _is_code(k):
+                t._add(v, k)
+            else:
+                t._add(k, v)
+        return t
+
+    def code_of(self, name) -> Optional[str]:
+        """名称 -> 带后缀代码；6 位纯数字视为代码本身"""
+        if not name:
+            return None
+        s = str(name).strip()
+        code = self.name_to_code.get(s)
+        if code is None and _is_code(s):
+            code = normalize_code(s)
+        return code
+
+    def name_of(self, code) -> Optional[str]:
+        """代码（带或不带后缀）-> 名称"""
+        if not code:
+            return None
+        s = str(code).strip().upper()
+        name = self.code_to_name.get(s)
+        if name is None:
+            name = self.base_to_name.get(s.split('.')[0])
+        return name
+
+    def __getstate__(self):
+        return (self.name_to_code, self.code_to_name, self.base_to_name, self.sources_key)
+
+    def __setstate__(self, state):
+        self.name_to_code, self.code_to_name, self.base_to_name, self.sources_key = state
+
+
+def _sources_key(paths=SOURCE_PATHS) -> Tuple:
+    key = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            key.append((os.path.basename(p), st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append((os.path.basename(p), None, None))
+    return (CACHE_FORMAT,) + tuple(key)
+
+
+def _load_cached(key, cache_path) -> Optional[SymbolTable]:
+    try:
+        with open(cache_path, 'rb') as f:
+            table = pickle.load(f)
+        if isinstance(table, SymbolTable) and table.sources_key == key:
+            return table
+    except Exception:
+        pass
+    return None
+
+
+def _save_cached(table: SymbolTable, cache_path):
+    try:
+        d = os.path.dirname(cache_path)
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp_", suffix=".pkl")
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except Exception:
+        pass
+
+
+_lock = threading.Lock()
+_table: Optional[SymbolTable] = None
+_last_check = 0.0
+
+
+def get_symbol_table(force_check: bool = False) -> SymbolTable:
+    """返回当前符号表；来源文件变化时重建（优先读 pickle 缓存，缓存失效才解析 JSON）"""
+    global _table, _last_check
+    now = time.monotonic()
+    if _table is not None and not force_check and now - _last_check < CHECK_INTERVAL:
+        return _table
+    with _lock:
+        _last_check = now
+        key = _sources_key()
+        if _table is not None and _table.sources_key == key:
+            return _table
+        table = _load_cached(key, CACHE_PATH)
+        if table is None:
+            table = SymbolTable.build(SOURCE_PATHS, sources_key=key)
+            _save_cached(table, CACHE_PATH)
+        _table = table
+        return _table
+
+
+def code_of(name) -> Optional[str]:
+    return get_symbol_table().code_of(name)
+
+
+def name_of(code) -> Optional[str]:
+    return get_symbol_table().name_of(code)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# yunfei_ball/batch_status_store.py
+# 批次执行状态存储：替代每次整文件读写的 pending_batches.json
+#
+# - SQLite（WAL），主键 (trade_date, account_id, batch_no)，单行读写 O(1)
+# - compare_and_set 在 BEGIN IMMEDIATE 事务内完成，多个账户进程共享同一文件也安全
+# - 超过 KEEP_DAYS 的旧日期自动压缩进 batch_status_history（每天一行 JSON），主表只保留近期数据
+# - 首次打开时自动迁移旧 pending_batches.json（旧数据不区分账户，记为 account_id='*'）
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(__file__)
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "batch_status.db")
+LEGACY_JSON_PATH = os.path.join(BASE_DIR, "pending_batches.json")
+
+KEEP_DAYS = int(os.getenv("YUNFEI_BATCH_STATUS_KEEP_DAYS", "7"))
+ANY_ACCOUNT = "*"
+STATUS_DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_status (
+    trade_date TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    batch_no TEXT NOT NULL,
+    status TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (trade_date, account_id, batch_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS batch_status_history (
+    trade_date TEXT PRIMARY KEY,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class BatchStatusStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH, legacy_json_path=LEGACY_JSON_PATH):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._compacted_day = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # isolation_level=None：自行控制事务（BEGIN IMMEDIATE）
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            if not self._initialized:
+                with self._init_lock:
+                    if not self._initialized:
+                        conn.executescript(_SCHEMA)
+                        self._migrate_legacy(conn)
+                        self._initialized = True
+        today = _today()
+        if self._compacted_day != today:
+            self._compacted_day = today
+            try:
+                self.compact(conn=conn)
+            except Exception as e:
+                print(f"[batch_status_store] 压缩旧批次状态失败: {e}", flush=True)
+        return conn
+
+    # ---------- 迁移 / 压缩 ----------
+    def _migrate_legacy(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key='legacy_migrated'").fetchone()
+        if row or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except Exception:
+            data = {}
+        now = datetime.now().isoformat(timespec="seconds")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for day, batches in (data.items() if isinstance(data, dict) else []):
+                for batch_no, v in (batches or {}).items():
+                    if v:
+                        conn.execute("INSERT OR IGNORE INTO batch_status VALUES (?,?,?,?,?)",
+                                     (day, ANY_ACCOUNT, str(batch_no), STATUS_DONE, now))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_migrated', ?)", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[batch_status_store] 已迁移 {self.legacy_json_path} 中 {len(data)} 天的批次状态", flush=True)
+
+    def compact(self, keep_days=None, conn=None):
+        """把 keep_days 天以前的行按日期汇总进 history 表并从主表删除；返回压缩的天数"""
+        keep = KEEP_DAYS if keep_days is None else keep_days
+        cutoff = (datetime.now() - timedelta(days=keep)).strftime("%Y-%m-%d")
+        conn = conn or self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT trade_date, account_id, batch_no, status, updated_at FROM batch_status WHERE trade_date < ?",
+                (cutoff,)).fetchall()
+            per_day = {}
+            for day, acct, batch_no, status, updated_at in rows:
+                per_day.setdefault(day, {}).setdefault(acct, {})[batch_no] = {"status": status, "updated_at": updated_at}
+            for day, payload in per_day.items():
+                old = conn.execute("SELECT payload FROM batch_status_history WHERE trade_date=?", (day,)).fetchone()
+                if old:
+                    try:
+                        merged = json.loads(old[0])
+                        for acct, batches in payload.items():
+                            merged.setdefault(acct, {}).update(batches)
+                        payload = merged
+                    except Exception:
+                        pass
+                conn.execute("INSERT OR REPLACE INTO batch_status_history VALUES (?, ?)",
+                             (day, json.dumps(payload, ensure_ascii=False)))
+            conn.execute("DELETE FROM batch_status WHERE trade_date < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(per_day)
+
+    # ---------- 读写 ----------
+    def get(self, trade_date, account_id, batch_no):
+        """返回状态字符串；账户自身没有记录时回退到旧数据（account_id='*'）"""
+        rows = self._conn().execute(
+            "SELECT account_id, status FROM batch_status WHERE trade_date=? AND batch_no=? AND account_id IN (?, ?)",
+            (trade_date, str(batch_no), str(account_id), ANY_ACCOUNT)).fetchall()
+        found = dict(rows)
+        return found.get(str(account_id), found.get(ANY_ACCOUNT))
+
+    def is_done(self, trade_date, account_id, batch_no):
+        return self.get(trade_date, account_id, batch_no) == STATUS_DONE
+
+    def get_day(self, trade_date, account_id):
+        rows = self._conn().execute(
+            "SELECT account_id, batch_no, status FROM batch_status WHERE trade_date=? AND account_id IN (?, ?)",
+            (trade_date, str(account_id), ANY_ACCOUNT)).fetchall()
+        out = {}
+        # 账户自身记录覆盖旧的全局记录
+        for acct, batch_no, status in sorted(rows, key=lambda r: r[0] != ANY_ACCOUNT):
+            out[batch_no] = status
+        return out
+
+    def compare_and_set(self, trade_date, account_id, batch_no, expected, new_status):
+        """
+        原子比较并设置：只有当前状态（仅看该账户自身的行）等于 expected 时才写入 new_status。
+        expected=None 表示“当前没有记录”。成功返回 True。
+        """
+        conn = self._conn()
+        key = (trade_date, str(account_id), str(batch_no))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM batch_status WHERE trade_date=? AND account_id=? AND batch_no=?",
+                               key).fetchone()
+            current = row[0] if row else None
+            if current != expected:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO batch_status VALUES (?,?,?,?,?)",
+                         key + (new_status, datetime.now().isoformat(timespec="seconds")))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def mark_done(self, trade_date, account_id, batch_no):
+        """标记完成；已完成则返回 False（说明其他进程先完成了）"""
+        current = None
+        for _ in range(3):
+            row = self._conn().execute(
+                "SELECT status FROM batch_status WHERE trade_date=? AND account_id=? AND batch_no=?",
+                (trade_date, str(account_id), str(batch_no))).fetchone()
+            current = row[0] if row else None
+            if current == STATUS_DONE:
+                return False
+            if self.compare_and_set(trade_date, account_id, batch_no, current, STATUS_DONE):
+                return True
+        return False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_batch_status_store(db_path=DEFAULT_DB_PATH, legacy_json_path=None):
+    """按数据库路径缓存的实例；legacy_json_path 默认为同目录下的 pending_batches.json"""
+    key = os.path.abspath(db_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                legacy = legacy_json_path or os.path.join(os.path.dirname(key), os.path.basename(LEGACY_JSON_PATH))
+                store = BatchStatusStore(key, legacy_json_path=legacy)
+                _stores[key] = store
+    return store
+
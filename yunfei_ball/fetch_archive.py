@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# yunfei_ball/fetch_archive.py
+# fetch_cache 滚动归档：替代 html_{ts}.html / items_{ts}.json 的“每次抓取一个文件”
+#
+# 布局（yunfei_ball/fetch_cache/archive/）：
+#   segment_YYYYMMDD.jsonl.gz  当日页面段文件；每条记录是一个独立的 gzip member（可直接 gzip.open 顺序读）
+#   index_YYYYMMDD.jsonl       当日索引：每次抓取一行 {ts, hash, offset, length, logged_in, dup}
+# - 相同页面（按 html 的 sha1）同一天只存一次，重复抓取只写索引行（dup=true，offset 指向首次记录）
+# - 保留策略：YUNFEI_ARCHIVE_RETENTION_DAYS（默认 30 天），过期的段/索引文件自动删除
+# - 读取：iter_pages(start, end) 按时间流式产出历史页面，供回放/学习使用
+#
+# 命令行：
+#   python -m yunfei_ball.fetch_archive --stats
+#   python -m yunfei_ball.fetch_archive --migrate     # 把旧的 html_*/items_* 文件并入归档并删除
+
+import os
+import re
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from filelock import FileLock
+
+BASE_DIR = os.path.dirname(__file__)
+FETCH_CACHE_DIR = os.path.join(BASE_DIR, "fetch_cache")
+ARCHIVE_DIR = os.path.join(FETCH_CACHE_DIR, "archive")
+LOCK_PATH = os.path.join(ARCHIVE_DIR, ".archive.lock")
+
+RETENTION_DAYS = int(os.getenv("YUNFEI_ARCHIVE_RETENTION_DAYS", "30"))
+GZIP_LEVEL = 6
+
+RE_SEGMENT = re.compile(r'^segment_(\d{8})\.jsonl\.gz$')
+RE_LEGACY = re.compile(r'^(html|items)_(\d{8})_(\d{6})')
+
+_state_lock = threading.Lock()
+# 进程内缓存：{day: {hash: (offset, length)}}，避免每次写入都重读索引
+_hash_cache = {}
+_last_retention_day = None
+
+
+def _segment_path(day):
+    return os.path.join(ARCHIVE_DIR, f"segment_{day}.jsonl.gz")
+
+
+def _index_path(day):
+    return os.path.join(ARCHIVE_DIR, f"index_{day}.jsonl")
+
+
+def _to_local(ts_iso):
+    """ISO 时间（可带时区）-> 本地 naive datetime"""
+    try:
+        dt = datetime.fromisoformat(ts_iso)
+    except Exception:
+        return datetime.now()
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def page_hash(html):
+    return hashlib.sha1((html or "").encode("utf-8", errors="replace")).hexdigest()
+
+
+def _read_index(day):
+    entries = []
+    try:
+        with open(_index_path(day), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except Exception:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _known_hashes(day):
+    cached = _hash_cache.get(day)
+    if cached is None:
+        cached = {}
+        for e in _read_index(day):
+            if not e.get("dup") and e.get("hash"):
+                cached.setdefault(e["hash"], (e["offset"], e["length"]))
+        _hash_cache.clear()  # 只保留当天
+        _hash_cache[day] = cached
+    return cached
+
+
+def apply_retention(retention_days=None, today=None):
+    """删除超过保留天数的段文件与索引文件，返回删除的天数列表"""
+    days = RETENTION_DAYS if retention_days is None else retention_days
+    if days <= 0 or not os.path.isdir(ARCHIVE_DIR):
+        return []
+    cutoff = ((today or datetime.now()) - timedelta(days=days)).strftime("%Y%m%d")
+    removed = []
+    for fn in os.listdir(ARCHIVE_DIR):
+        m = RE_SEGMENT.match(fn)
+        if not m or m.group(1) >= cutoff:
+            continue
+        day = m.group(1)
+        for p in (_segment_path(day), _index_path(day)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        removed.append(day)
+    return sorted(removed)
+
+
+def append_page(html, items, ts_iso, logged_in=True):
+    """
+    追加一次抓取结果到当日归档。
+    返回索引行 dict（dup=True 表示页面内容与当日已有记录相同，只记录了时间点）。
+    """
+    global _last_retention_day
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    dt = _to_local(ts_iso)
+    day = dt.strftime("%Y%m%d")
+    h = page_hash(html)
+
+    with _state_lock, FileLock(LOCK_PATH, timeout=10):
+        known = _known_hashes(day)
+        # 其他进程可能已写入同一页面：缓存未命中时以索引文件为准再查一次
+        if h not in known:
+            _hash_cache.pop(day, None)
+            known = _known_hashes(day)
+
+        entry = {"ts": dt.isoformat(timespec="seconds"), "hash": h, "logged_in": bool(logged_in)}
+        if h in known:
+            entry["offset"], entry["length"] = known[h]
+            entry["dup"] = True
+        else:
+            record = {"ts": entry["ts"], "hash": h, "logged_in": bool(logged_in),
+                      "html": html, "items": items}
+            payload = gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"),
+                                    compresslevel=GZIP_LEVEL)
+            seg = _segment_path(day)
+            with open(seg, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(payload)
+            entry["offset"], entry["length"] = offset, len(payload)
+            entry["dup"] = False
+            known[h] = (offset, len(payload))
+
+        with open(_index_path(day), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        if _last_retention_day != day:
+            _last_retention_day = day
+            try:
+                apply_retention()
+            except Exception as e:
+                print(f"[fetch_archive] 清理过期归档失败: {e}", flush=True)
+    return entry
+
+
+def list_days():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(m.group(1) for m in (RE_SEGMENT.match(fn) for fn in os.listdir(ARCHIVE_DIR)) if m)
+
+
+def _read_member(day, offset, length):
+    with open(_segment_path(day), "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    return json.loads(gzip.decompress(raw).decode("utf-8"))
+
+
+def iter_pages(start=None, end=None, include_duplicates=False, logged_in_only=True):
+    """
+    按时间顺序流式产出历史页面：{'ts','hash','logged_in','html','items','dup'}。
+    start/end 为 datetime 或 ISO 字符串（本地时间，闭区间）；include_duplicates=True 时
+    重复抓取也逐条产出（内容取自首次记录），可用于按原始时间线回放。
+    """
+    if isinstance(start, str):
+        start = _to_local(start)
+    if isinstance(end, str):
+        end = _to_local(end)
+    for day in list_days():
+        if start and day < start.strftime("%Y%m%d"):
+            continue
+        if end and day > end.strftime("%Y%m%d"):
+            break
+        member_cache = {}
+        for e in _read_index(day):
+            if e.get("dup") and not include_duplicates:
+                continue
+            if logged_in_only and not e.get("logged_in", True):
+                continue
+            ts = _to_local(e.get("ts", ""))
+            if (start and ts < start) or (end and ts > end):
+                continue
+            key = (e.get("offset"), e.get("length"))
+            rec = member_cache.get(key)
+            if rec is None:
+                try:
+                    rec = _read_member(day, *key)
+                except Exception:
+                    continue
+                member_cache = {key: rec}  # 只缓存最近一条，控制内存
+            yield {"ts": e.get("ts"), "hash": e.get("hash"), "logged_in": e.get("logged_in", True),
+                   "html": rec.get("html"), "items": rec.get("items"), "dup": bool(e.get("dup"))}
+
+
+def migrate_legacy(delete=True):
+    """把 fetch_cache 下旧的 html_{ts}.html / items_{ts}.json 并入归档；返回迁移的抓取次数"""
+    if not os.path.isdir(FETCH_CACHE_DIR):
+        return 0
+    groups = {}
+    for fn in os.listdir(FETCH_CACHE_DIR):
+        m = RE_LEGACY.match(fn)
+        if m:
+            groups.setdefault(m.group(2) + m.group(3), {})[m.group(1)] = os.path.join(FETCH_CACHE_DIR, fn)
+    migrated = 0
+    for key in sorted(groups):
+        files = groups[key]
+        html, items = "", None
+        try:
+            if "html" in files:
+                with open(files["html"], "r", encoding="utf-8") as f:
+                    html = f.read()
+            if "items" in files:
+                with open(files["items"], "r", encoding="utf-8") as f:
+                    items = json.load(f)
+        except Exception as e:
+            print(f"[fetch_archive] 跳过无法读取的旧文件 {key}: {e}", flush=True)
+            continue
+        # 旧文件名来自 fetcher 的 UTC ISO 时间
+        ts = datetime.strptime(key, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc).isoformat()
+        logged_in = items is not None or ("退出" in html or "个人资料" in html or "Hi," in html)
+        append_page(html, items, ts, logged_in=logged_in)
+        migrated += 1
+        if delete:
+            for p in files.values():
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+    return migrated
+
+
+def archive_stats():
+    stats = []
+    for day in list_days():
+        idx = _read_index(day)
+        try:
+            size = os.path.getsize(_segment_path(day))
+        except OSError:
+            size = 0
+        stats.append({"day": day, "fetches": len(idx),
+                      "unique_pages": sum(1 for e in idx if not e.get("dup")), "bytes": size})
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="fetch_cache 归档工具")
+    ap.add_argument("--migrate", action="store_true", help="迁移旧的 html_*/items_* 文件到归档")
+    ap.add_argument("--keep-legacy", action="store_true", help="迁移后保留旧文件")
+    ap.add_argument("--stats", action="store_true", help="打印每日归档统计")
+    args = ap.parse_args()
+    if args.migrate:
+        n = migrate_legacy(delete=not args.keep_legacy)
+        print(f"已迁移 {n} 次抓取记录")
+    if args.stats or not args.migrate:
+        for s in archive_stats():
+            print(f"{s['day']}  抓取 {s['fetches']:5d} 次  唯一页面 {s['unique_pages']:4d}  {s['bytes'] / 1024:.1f} KB")
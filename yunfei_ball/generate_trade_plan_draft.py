@@ -2,7 +2,11 @@ import json
 import re
 import os
 import time
-import uuid
+import hashlib
+
+from utils.persistence import write_json, DURABILITY_ATOMIC
+from yunfei_ball.plan_store import get_plan_store, KIND_DRAFT, STATUS_PENDING
+from yunfei_ball.lock_manager import get_lock_manager
 
 def parse_trade_operations(operation_str, ratio, sample_amount):
     sell_stocks_info = []
@@ -34,22 +38,20 @@ def parse_trade_operations(operation_str, ratio, sample_amount):
 
 
 def atomic_write_json(path: str, obj):
-    tmp = path + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)
+    # 草稿在同一进程内马上被读取合并：原子替换即可，不做 fsync（省去每个草稿一次磁盘同步）
+    write_json(path, obj, durability=DURABILITY_ATOMIC, label="tradeplan_draft")
 
 
 def generate_trade_plan_draft_func(batch_no, operation_str, ratio, sample_amount, output_dir="setting", strategy_id=None, account_id=None):
     """
-    生成单个策略的交易计划草稿文件（per-strategy）。
-    如果传入 strategy_id，会把 strategy_id 写入文件名；如果传入 account_id，会把 account_id 写入文件名，避免不同账户混淆。
-    返回生成的文件路径。
+    生成单个策略的交易计划草稿（per-strategy），保存到 output_dir 下的内容寻址存储（yunfei_ball/plan_store.py）。
+    相同内容（忽略 created_at）只保存一份；清单按 (账户, 批次, 日期, 策略) 记录当前草稿。
+    返回草稿对象文件路径。
     """
     sell_stocks_info, buy_stocks_info = parse_trade_operations(operation_str, ratio, sample_amount)
+    plan_date = time.strftime('%Y-%m-%d')
     plan = {
+        "plan_date": plan_date,
         "sell_stocks_info": sell_stocks_info,
         "buy_stocks_info": buy_stocks_info,
         "meta": {
@@ -59,23 +61,22 @@ def generate_trade_plan_draft_func(batch_no, operation_str, ratio, sample_amount
             "created_at": time.strftime('%Y-%m-%dT%H:%M:%S')
         }
     }
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
+    # 未传 strategy_id 时用操作内容区分（与旧的“每次一个新文件”一样不会互相覆盖清单行）
+    manifest_sid = strategy_id if strategy_id else "op:" + hashlib.sha1(operation_str.encode("utf-8")).hexdigest()[:12]
+    store = get_plan_store(output_dir)
+    h, file_path, created = store.put(
+        plan, KIND_DRAFT, account_id=account_id, batch_no=batch_no, plan_date=plan_date, strategy_id=manifest_sid)
+    # 清单行仍为 pending 时登记到进程内表（清单读取失败时 merge_tradeplans 的回退）；
+    # 内容未变、已被合并的草稿保留 merged 状态，不再登记
+    entry = store.entry(KIND_DRAFT, account_id=account_id, batch_no=batch_no, plan_date=plan_date,
+                        strategy_id=manifest_sid)
+    if entry is not None and entry["status"] == STATUS_PENDING:
+        get_lock_manager(output_dir).register_draft(batch_no, account_id, entry)
 
-    # 生成唯一文件名：包含批次、策略id（若有）、账户（若有）、时间戳和短 uuid
-    ts = time.strftime('%Y%m%dT%H%M%S')
-    uid = uuid.uuid4().hex[:8]
-    acct_part = f"_acct{account_id}" if account_id else ""
-    if strategy_id:
-        filename = f"yunfei_trade_plan_draft_batch{batch_no}_strategy{strategy_id}{acct_part}_{ts}_{uid}.json"
+    if created:
+        print(f"已生成交易计划草稿: {file_path}", flush=True)
     else:
-        filename = f"yunfei_trade_plan_draft_batch{batch_no}{acct_part}_{ts}_{uid}.json"
-    file_path = os.path.join(output_dir, filename)
-
-    # 原子写文件，避免并发写入导致半文件
-    atomic_write_json(file_path, plan)
-
-    print(f"已生成交易计划草稿: {file_path}", flush=True)
+        print(f"交易计划草稿内容未变化，复用: {file_path}", flush=True)
 
     # 返回文件路径，让调用方收集/合并
     return file_path
@@ -83,11 +84,13 @@ def generate_trade_plan_draft_func(batch_no, operation_str, ratio, sample_amount
 
 def batch_generate_trade_plan_drafts_func(batch_operations, ratio, sample_amount, output_dir="setting"):
     """
-    批量生成四个批次的计划 (示例函数)
+    批量生成四个批次的计划 (示例函数)；草稿经 generate_trade_plan_draft_func 写入 plan_store，返回各草稿路径
     """
+    paths = []
     for batch_no in range(1, 5):
         operation_str = batch_operations.get(batch_no, "")
-        generate_trade_plan_draft_func(batch_no, operation_str, ratio, sample_amount, output_dir)
+        paths.append(generate_trade_plan_draft_func(batch_no, operation_str, ratio, sample_amount, output_dir))
+    return paths
 
 
 # 示例调用
@@ -100,4 +103,4 @@ if __name__ == "__main__":
     }
     ratio = 1.03
     sample_amount = 751900.0
-    batch_generate_trade_plan_drafts_func(batch_ops, ratio, sample_amount)
\ No newline at end of file
+    batch_generate_trade_plan_drafts_func(batch_ops, ratio, sample_amount)
@@ -0,0 +1,127 @@
+# yunfei_ball/lock_manager.py
+# 草稿流水线的单锁管理器 + 进程内待合并草稿登记表
+#
+# 旧做法：merge_tradeplans 对每个草稿读取各加一次 filelock，写 merged 再加一次，
+#        归档每个草稿又各加一次 —— 每次合并 2N+1 次加锁，并在各处留下 .lock 文件。
+# 现在：
+#   - 每个 (batch, account) 只有一把锁：<root>/locks/batch{batch}_acct{account}.lock，
+#     进程内用 threading.Lock 串行，跨进程用 FileLock；锁文件数量固定，不随草稿增长
+#   - 草稿由 plan_store 内容寻址、写入后不可变，读取无需加锁
+#   - 待合并草稿以 plan_store 清单为准（含其他进程生成的草稿）；register_draft 只把本进程生成、
+#     清单中仍为 pending 的草稿登记到内存，作为清单读取失败时的回退
+#   - 每次持锁时长计入统计，hold_stats() / format_hold_stats() 查看
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from filelock import FileLock
+
+LOCK_TIMEOUT = 10
+
+
+def _key(batch, account_id):
+    return (str(batch), "" if account_id is None else str(account_id))
+
+
+class DraftLockManager:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.lock_dir = os.path.join(self.root, "locks")
+        self._guard = threading.Lock()
+        self._thread_locks = {}
+        self._file_locks = {}
+        self._pending = {}   # key -> {strategy_id: entry}
+        self._stats = {}     # key -> {"count", "total_ms", "max_ms", "wait_ms"}
+
+    def _locks_for(self, key):
+        with self._guard:
+            tl = self._thread_locks.get(key)
+            if tl is None:
+                os.makedirs(self.lock_dir, exist_ok=True)
+                batch, acct = key
+                name = f"batch{batch}_acct{acct or 'all'}.lock"
+                tl = self._thread_locks[key] = threading.Lock()
+                self._file_locks[key] = FileLock(os.path.join(self.lock_dir, name), timeout=LOCK_TIMEOUT)
+            return tl, self._file_locks[key]
+
+    @contextmanager
+    def lock(self, batch, account_id=None):
+        """(batch, account) 唯一的一把锁；退出时记录持锁时长"""
+        key = _key(batch, account_id)
+        tl, fl = self._locks_for(key)
+        t_wait = time.perf_counter()
+        with tl:
+            fl.acquire()
+            t_acq = time.perf_counter()
+            try:
+                yield
+            finally:
+                fl.release()
+                t_end = time.perf_counter()
+                self._record(key, (t_end - t_acq) * 1000.0, (t_acq - t_wait) * 1000.0)
+
+    def _record(self, key, hold_ms, wait_ms):
+        with self._guard:
+            st = self._stats.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "wait_ms": 0.0})
+            st["count"] += 1
+            st["total_ms"] += hold_ms
+            st["wait_ms"] += wait_ms
+            st["max_ms"] = max(st["max_ms"], hold_ms)
+            st["last_ms"] = hold_ms
+
+    # ---------- 待合并草稿登记 ----------
+    def register_draft(self, batch, account_id, entry):
+        """entry 为 plan_store.entries() 形状的 dict；同一策略后登记者覆盖，内容哈希未变则不动"""
+        key = _key(batch, account_id)
+        sid = entry.get("strategy_id", "")
+        with self._guard:
+            slot = self._pending.setdefault(key, {})
+            old = slot.get(sid)
+            if old is None or old.get("hash") != entry.get("hash"):
+                slot[sid] = entry
+
+    def take_pending(self, batch, account_id=None):
+        """
+        取出并清空登记的草稿；account_id 为 None 时取该批次所有账户的登记（与清单查询的“不过滤”一致）。
+        """
+        batch = str(batch)
+        with self._guard:
+            if account_id is None:
+                keys = [k for k in self._pending if k[0] == batch]
+            else:
+                keys = [_key(batch, account_id)]
+            taken = [e for k in keys for e in self._pending.pop(k, {}).values()]
+        return sorted(taken, key=lambda e: (e.get("strategy_id", ""), e.get("account_id", "")))
+
+    def restore_pending(self, batch, entries):
+        """合并失败时把草稿放回登记表（按各自的 account_id）"""
+        for e in entries:
+            self.register_draft(batch, e.get("account_id") or None, e)
+
+    # ---------- 统计 ----------
+    def hold_stats(self):
+        with self._guard:
+            return {f"batch{k[0]}/acct{k[1] or 'all'}": dict(v) for k, v in self._stats.items()}
+
+    def format_hold_stats(self):
+        parts = []
+        for name, st in sorted(self.hold_stats().items()):
+            avg = st["total_ms"] / st["count"] if st["count"] else 0.0
+            parts.append(f"{name}: n={st['count']} avg={avg:.2f}ms max={st['max_ms']:.2f}ms "
+                         f"wait={st['wait_ms']:.2f}ms")
+        return "; ".join(parts)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_lock_manager(root):
+    key = os.path.abspath(root)
+    mgr = _managers.get(key)
+    if mgr is None:
+        with _managers_lock:
+            mgr = _managers.setdefault(key, DraftLockManager(key))
+    return mgr
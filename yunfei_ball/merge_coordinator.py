@@ -1,80 +1,73 @@
 import os
-import json
-import hashlib
 import time
-from .tradeplan_io import (
-    list_strategy_files, read_json, atomic_write_json, mark_processed, file_lock_for
-)
+from .plan_store import get_plan_store, KIND_DRAFT, KIND_MERGED, STATUS_PENDING, STATUS_MERGED
+from .lock_manager import get_lock_manager
 
-def merge_tradeplans(account_id: str, batch: int, setting_dir: str):
+def merge_tradeplans(account_id: str, batch: int, setting_dir: str, plan_date: str = None):
     """
-    读取 setting_dir 中匹配 batch 的 per-strategy draft 文件并合并为一个 merged draft 文件。
+    合并匹配 batch、当日、尚未合并的 per-strategy 草稿为一个 merged 草稿。
     按 account_id 过滤（如果 account_id 为 None 则回退到按 batch 合并）。
-    即使没有任何 per-strategy 草稿文件，也会生成一个空的 merged 草稿（meta.empty=True）。
-    返回 merged_draft_path 或 None（写入失败时）。
-    """
-    pattern_batch = f"batch{batch}"
-    files = []
-    try:
-        for fn in os.listdir(setting_dir):
-            if fn.endswith('.json') and fn.startswith('yunfei_trade_plan_draft_batch') and pattern_batch in fn and 'merged' not in fn:
-                if account_id:
-                    # 只有包含 acct{account_id} 的文件才归属于此账户
-                    if f"acct{account_id}" not in fn:
-                        continue
-                files.append(os.path.join(setting_dir, fn))
-    except Exception:
-        files = []
-
-    files.sort()
+    即使没有任何 per-strategy 草稿，也会生成一个空的 merged 草稿（meta.empty=True）。
 
-    merged = {
-        "sell_stocks_info": [],
-        "buy_stocks_info": [],
-        "meta": {
-            "merged_from": [],
-            "batch_no": batch,
-            "account_id": account_id,
-            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
-            "empty": False
-        }
-    }
+    整个合并只持有 (batch, account) 的一把锁（yunfei_ball/lock_manager.py）：
+    待合并草稿以 plan_store 清单为准（包括其他进程生成的草稿），清单读取失败时才用本进程内存登记表；不扫描目录。
+    草稿对象内容寻址、不可变，读取不再逐个加锁。
+    返回 merged 草稿路径或 None（写入失败时）。
+    """
+    store = get_plan_store(setting_dir)
+    locks = get_lock_manager(setting_dir)
+    plan_date = plan_date or time.strftime('%Y-%m-%d')
 
-    # 读每个文件（加锁读取）
-    for f in files:
+    with locks.lock(batch, account_id):
+        registered = locks.take_pending(batch, account_id)
         try:
-            with file_lock_for(f):
-                obj = read_json(f)
-            merged['sell_stocks_info'].extend(obj.get('sell_stocks_info', []))
-            merged['buy_stocks_info'].extend(obj.get('buy_stocks_info', []))
-            merged['meta']['merged_from'].append(os.path.basename(f))
+            entries = store.entries(KIND_DRAFT, account_id=account_id, batch_no=batch, plan_date=plan_date,
+                                    status=STATUS_PENDING)
         except Exception as e:
-            print(f"警告：读取 draft 文件 {f} 失败：{e}", flush=True)
+            print(f"警告：读取草稿清单失败，改用本进程登记的 {len(registered)} 个草稿：{e}", flush=True)
+            entries = registered
+        entries = [e for e in entries if e.get('plan_date') == plan_date]
 
-    if not merged['meta']['merged_from']:
-        merged['meta']['empty'] = True
+        merged = {
+            "plan_date": plan_date,
+            "sell_stocks_info": [],
+            "buy_stocks_info": [],
+            "meta": {
+                "merged_from": [],
+                "batch_no": batch,
+                "account_id": account_id,
+                "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "empty": False
+            }
+        }
+
+        merged_entries = []
+        for e in entries:
+            try:
+                obj = store.get(e['hash'])
+                merged['sell_stocks_info'].extend(obj.get('sell_stocks_info', []))
+                merged['buy_stocks_info'].extend(obj.get('buy_stocks_info', []))
+                merged['meta']['merged_from'].append(os.path.basename(e['path']))
+                merged_entries.append(e)
+            except Exception as ex:
+                print(f"警告：读取 draft 文件 {e.get('path')} 失败：{ex}", flush=True)
 
-    merged_hash = hashlib.sha1(json.dumps(merged, sort_keys=True).encode()).hexdigest()[:8]
-    ts = time.strftime('%Y%m%dT%H%M%S')
-    acct_part = f"_acct{account_id}" if account_id else ""
-    empty_part = "_empty" if merged['meta'].get('empty') else ""
-    merged_filename = f"yunfei_trade_plan_draft_batch{batch}_merged{acct_part}{empty_part}_{ts}_{merged_hash}.json"
-    merged_path = os.path.join(setting_dir, merged_filename)
+        if not merged['meta']['merged_from']:
+            merged['meta']['empty'] = True
 
-    try:
-        with file_lock_for(merged_path):
-            atomic_write_json(merged_path, merged)
-    except Exception as e:
-        print(f"错误：写入 merged 草稿失败: {e}", flush=True)
-        return None
+        try:
+            _, merged_path, _ = store.put(merged, KIND_MERGED, account_id=account_id, batch_no=batch,
+                                          plan_date=plan_date)
+        except Exception as ex:
+            print(f"错误：写入 merged 草稿失败: {ex}", flush=True)
+            locks.restore_pending(batch, entries)
+            return None
 
-    # 归档已处理的 per-strategy 草稿（在移动前加锁，避免并发 mark）
-    for f in files:
+        # 在清单中标记已合并的 per-strategy 草稿（替代原先移动到 processed/ 目录）
         try:
-            with file_lock_for(f):
-                mark_processed(f)
+            store.mark(KIND_DRAFT, merged_entries, STATUS_MERGED)
         except Exception:
             pass
 
-    print(f"已生成合并后的草稿: {merged_path}", flush=True)
-    return merged_path
\ No newline at end of file
+    print(f"已生成合并后的草稿: {merged_path}（锁统计 {locks.format_hold_stats()}）", flush=True)
+    return merged_path
@@ -0,0 +1,228 @@
+# yunfei_ball/plan_store.py
+# 交易计划的内容寻址存储（草稿 / 合并草稿 / 最终计划）
+#
+# 旧做法：每次轮询、每个策略都生成一个带时间戳+uuid 的新 JSON，内容完全相同的草稿不断堆积，
+#        list_strategy_files / merge_tradeplans 每次都要 listdir 一个越来越大的目录。
+# 现在：
+#   <root>/objects/<hash[:2]>/<hash>.json   计划内容，按哈希命名；相同内容只存一份（天然去重）
+#   <root>/manifest.db                      SQLite 清单：(kind, account_id, batch_no, plan_date, strategy_id) -> hash
+# 哈希基于规范化 JSON（sort_keys），计算时排除 meta 中的易变字段（created_at 等），
+# 因此同一策略在同一天反复生成的相同草稿只对应一个对象文件。
+# 查询只走清单索引，不扫描目录；gc() 清理过期清单行和不再被引用的对象。
+
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from utils.persistence import write_json, read_json, DURABILITY_ATOMIC
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(BASE_DIR, "setting")
+
+KIND_DRAFT = "draft"
+KIND_MERGED = "merged"
+KIND_FINAL = "final"
+
+STATUS_PENDING = "pending"
+STATUS_MERGED = "merged"
+
+# 不参与内容哈希的 meta 字段
+VOLATILE_META_KEYS = ("created_at", "merged_from", "saved_at")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    kind TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    batch_no TEXT NOT NULL,
+    plan_date TEXT NOT NULL,
+    strategy_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT,
+    PRIMARY KEY (kind, account_id, batch_no, plan_date, strategy_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_manifest_hash ON manifest(hash);
+"""
+
+
+def content_hash(plan):
+    """规范化后的 sha1（排除易变 meta 字段）"""
+    if isinstance(plan, dict) and isinstance(plan.get("meta"), dict):
+        plan = dict(plan)
+        plan["meta"] = {k: v for k, v in plan["meta"].items() if k not in VOLATILE_META_KEYS}
+    blob = json.dumps(plan, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def _s(v):
+    return "" if v is None else str(v)
+
+
+class PlanStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.db_path = os.path.join(self.root, "manifest.db")
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ---------- 对象 ----------
+    def path_for(self, h):
+        return os.path.join(self.objects_dir, h[:2], f"{h}.json")
+
+    def _write_object(self, h, plan):
+        path = self.path_for(h)
+        if os.path.exists(path):
+            return path, False
+        # 另一个进程可能同时写入同一对象：内容相同，原子替换后结果一致
+        write_json(path, plan, durability=DURABILITY_ATOMIC, label="plan_store")
+        return path, True
+
+    def get(self, h):
+        return read_json(self.path_for(h))
+
+    # ---------- 写入 ----------
+    def put(self, plan, kind, account_id=None, batch_no=None, plan_date=None, strategy_id=None):
+        """
+        保存计划并更新清单，返回 (hash, 对象路径, 是否新对象)。
+        同一清单键再次写入相同内容时保留原状态（例如已合并的草稿不会重新变为 pending）。
+        """
+        plan_date = plan_date or datetime.now().strftime("%Y-%m-%d")
+        h = content_hash(plan)
+        path, created = self._write_object(h, plan)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO manifest(kind, account_id, batch_no, plan_date, strategy_id, hash, status, updated_at)"
+                " VALUES (?,?,?,?,?,?,?,?)"
+                " ON CONFLICT(kind, account_id, batch_no, plan_date, strategy_id) DO UPDATE SET"
+                "   status = CASE WHEN manifest.hash = excluded.hash THEN manifest.status ELSE excluded.status END,"
+                "   hash = excluded.hash, updated_at = excluded.updated_at",
+                (kind, _s(account_id), _s(batch_no), plan_date, _s(strategy_id), h, STATUS_PENDING,
+                 datetime.now().isoformat(timespec="seconds")))
+        return h, path, created
+
+    # ---------- 查询 ----------
+    def lookup(self, kind, account_id=None, batch_no=None, plan_date=None, strategy_id=None):
+        """返回该键当前对应的对象路径；没有返回 None"""
+        plan_date = plan_date or datetime.now().strftime("%Y-%m-%d")
+        row = self._conn().execute(
+            "SELECT hash FROM manifest WHERE kind=? AND account_id=? AND batch_no=? AND plan_date=? AND strategy_id=?",
+            (kind, _s(account_id), _s(batch_no), plan_date, _s(strategy_id))).fetchone()
+        return self.path_for(row[0]) if row else None
+
+    def entry(self, kind, account_id=None, batch_no=None, plan_date=None, strategy_id=None):
+        """返回该键当前的清单行（dict，形状同 entries()）；没有返回 None"""
+        plan_date = plan_date or datetime.now().strftime("%Y-%m-%d")
+        row = self._conn().execute(
+            "SELECT account_id, batch_no, plan_date, strategy_id, hash, status FROM manifest"
+            " WHERE kind=? AND account_id=? AND batch_no=? AND plan_date=? AND strategy_id=?",
+            (kind, _s(account_id), _s(batch_no), plan_date, _s(strategy_id))).fetchone()
+        if row is None:
+            return None
+        acct, batch, day, sid, h, st = row
+        return {"account_id": acct, "batch_no": batch, "plan_date": day, "strategy_id": sid,
+                "hash": h, "status": st, "path": self.path_for(h)}
+
+    def entries(self, kind, account_id=None, batch_no=None, plan_date=None, status=None):
+        """
+        按条件列出清单行（dict：strategy_id / hash / path / status / account_id / batch_no / plan_date）。
+        account_id / batch_no 为 None 时不过滤；结果按 strategy_id 排序。
+        """
+        sql = "SELECT account_id, batch_no, plan_date, strategy_id, hash, status FROM manifest WHERE kind=?"
+        args = [kind]
+        for col, val in (("account_id", account_id), ("batch_no", batch_no), ("plan_date", plan_date),
+                         ("status", status)):
+            if val is not None:
+                sql += f" AND {col}=?"
+                args.append(_s(val))
+        sql += " ORDER BY strategy_id, account_id"
+        out = []
+        for acct, batch, day, sid, h, st in self._conn().execute(sql, args):
+            out.append({"account_id": acct, "batch_no": batch, "plan_date": day, "strategy_id": sid,
+                        "hash": h, "status": st, "path": self.path_for(h)})
+        return out
+
+    def mark(self, kind, entries, status):
+        conn = self._conn()
+        now = datetime.now().isoformat(timespec="seconds")
+        with conn:
+            conn.executemany(
+                "UPDATE manifest SET status=?, updated_at=? WHERE kind=? AND account_id=? AND batch_no=?"
+                " AND plan_date=? AND strategy_id=? AND hash=?",
+                [(status, now, kind, e["account_id"], e["batch_no"], e["plan_date"], e["strategy_id"], e["hash"])
+                 for e in entries])
+
+    # ---------- 维护 ----------
+    def gc(self, keep_days=30):
+        """删除 keep_days 天前的清单行，并删除不再被任何清单行引用的对象；返回 (删除行数, 删除对象数)"""
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        conn = self._conn()
+        with conn:
+            rows = conn.execute("DELETE FROM manifest WHERE plan_date < ?", (cutoff,)).rowcount
+        live = {r[0] for r in conn.execute("SELECT DISTINCT hash FROM manifest")}
+        removed = 0
+        if os.path.isdir(self.objects_dir):
+            for sub in os.listdir(self.objects_dir):
+                d = os.path.join(self.objects_dir, sub)
+                if not os.path.isdir(d):
+                    continue
+                for fn in os.listdir(d):
+                    if fn.endswith(".json") and fn[:-5] not in live:
+                        try:
+                            os.remove(os.path.join(d, fn))
+                            removed += 1
+                        except OSError:
+                            pass
+        return rows, removed
+
+    def stats(self):
+        conn = self._conn()
+        by_kind = dict(conn.execute("SELECT kind, COUNT(*) FROM manifest GROUP BY kind").fetchall())
+        distinct = conn.execute("SELECT COUNT(DISTINCT hash) FROM manifest").fetchone()[0]
+        return {"root": self.root, "manifest_rows": by_kind, "distinct_objects": distinct}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_plan_store(root=DEFAULT_ROOT):
+    key = os.path.abspath(root)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, PlanStore(key))
+    return store
+
+
+def main():
+    ap = argparse.ArgumentParser(description="交易计划内容寻址存储：统计 / 清理")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    ap.add_argument("--gc", type=int, metavar="KEEP_DAYS", help="清理 KEEP_DAYS 天前的清单与无引用对象")
+    args = ap.parse_args()
+    store = get_plan_store(args.root)
+    if args.gc is not None:
+        rows, objs = store.gc(args.gc)
+        print(f"删除清单行 {rows}，删除对象 {objs}")
+    print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# yunfei_ball/poll_cadence.py
+# 自适应轮询节奏：根据历史抓取记录学习各策略的“更新时间”，
+# 在预计更新窗口内快速轮询（默认 2 秒）；窗口外、且前方还有学习到的窗口时退避（默认 25 秒起，逐步放宽，
+# 不睡过窗口起点），没有可期待的窗口时保持 25 秒（即原先 20 秒 + 5 秒的固定节奏），
+# 并记录每个批次的请求次数 / 检测延迟，方便对比“多花的请求”与“缩短的延迟”。
+#
+# 学习来源：
+#   - yunfei_ball/fetch_cache/archive/ 归档与 latest_items.json（yunfei_fetcher 保存的抓取结果）
+#   - yunfei_ball/poll_history.json（本模块记录检测到的更新，批次结束时一次写入）
+# 指标输出：runtime/poll_metrics/poll_metrics_YYYYMMDD.jsonl（每个批次结束写一行）
+
+import os
+import re
+import json
+import threading
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(__file__)
+FETCH_CACHE_DIR = os.path.join(BASE_DIR, "fetch_cache")
+POLL_HISTORY_FILE = os.path.join(BASE_DIR, "poll_history.json")
+METRICS_DIR = os.path.join(os.path.dirname(BASE_DIR), "runtime", "poll_metrics")
+
+FAST_INTERVAL = float(os.getenv("YUNFEI_POLL_FAST", "2"))
+SLOW_INTERVAL = float(os.getenv("YUNFEI_POLL_SLOW", "25"))
+MAX_INTERVAL = float(os.getenv("YUNFEI_POLL_MAX", "60"))
+ERROR_INTERVAL = float(os.getenv("YUNFEI_POLL_ERROR", "30"))
+BACKOFF_FACTOR = 1.5
+
+# 预计更新时刻（分钟精度）前后的窗口，单位秒
+WINDOW_LEAD_SECONDS = 60
+WINDOW_LAG_SECONDS = 180
+# 每个策略最多保留多少个历史更新时刻
+MAX_HISTORY_PER_STRATEGY = 30
+
+RE_TIME = re.compile(r'^(\d{4}-\d{2}-\d{2}) (\d{2}):(\d{2})')
+
+_learned_lock = threading.Lock()
+_learned_cache = {"key": None, "times": {}}
+_history_lock = threading.Lock()
+
+
+def _norm_name(name):
+    return (name or "").strip()
+
+
+def _parse_update_time(t):
+    """'YYYY-MM-DD HH:MM' -> (date_str, 当日秒数)；无法解析返回 None"""
+    if not isinstance(t, str):
+        return None
+    m = RE_TIME.match(t.strip())
+    if not m:
+        return None
+    return m.group(1), int(m.group(2)) * 3600 + int(m.group(3)) * 60
+
+
+def _iter_artifact_items():
+    """
+    遍历保存的解析结果，产出 (name, time_str)：
+      - fetch_cache/archive/ 滚动归档（只读唯一页面）
+      - fetch_cache 下的 latest_items.json 以及尚未迁移的旧 items_*.json
+    兼容新解析器（title/time）与旧解析器（name/time）两种字段。
+    """
+    def _from_items(items):
+        if not isinstance(items, list):
+            return
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            name = it.get("title") or it.get("name")
+            t = it.get("time")
+            if name and t:
+                yield _norm_name(name), t
+
+    try:
+        from yunfei_ball.fetch_archive import iter_pages
+        for page in iter_pages():
+            yield from _from_items(page.get("items"))
+    except Exception:
+        pass
+
+    if not os.path.isdir(FETCH_CACHE_DIR):
+        return
+    try:
+        names = os.listdir(FETCH_CACHE_DIR)
+    except Exception:
+        return
+    for fn in names:
+        if not (fn.startswith("items_") or fn == "latest_items.json") or not fn.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(FETCH_CACHE_DIR, fn), "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except Exception:
+            continue
+        yield from _from_items(items)
+
+
+def _load_history():
+    try:
+        with open(POLL_HISTORY_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _source_key():
+    """用 fetch_cache / 归档目录与 poll_history.json 的 mtime 作为学习结果的缓存键"""
+    key = []
+    for p in (FETCH_CACHE_DIR, os.path.join(FETCH_CACHE_DIR, "archive"), POLL_HISTORY_FILE):
+        try:
+            st = os.stat(p)
+            key.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
+
+def load_learned_update_times(force=False):
+    """
+    返回 {strategy_name: [当日秒数, ...]}（去重、升序）。
+    同一策略同一时间戳只计一次；结果按来源文件 mtime 缓存。
+    """
+    key = _source_key()
+    with _learned_lock:
+        if not force and _learned_cache["key"] == key:
+            return _learned_cache["times"]
+
+    seen = {}
+    for name, t in _iter_artifact_items():
+        seen.setdefault(name, set()).add(t)
+    for name, ts in _load_history().items():
+        if isinstance(ts, list):
+            seen.setdefault(_norm_name(name), set()).update(x for x in ts if isinstance(x, str))
+
+    times = {}
+    for name, ts in seen.items():
+        parsed = sorted((p for p in (_parse_update_time(t) for t in ts) if p), reverse=True)
+        secs = sorted({sec for _, sec in parsed[:MAX_HISTORY_PER_STRATEGY]})
+        if secs:
+            times[name] = secs
+
+    with _learned_lock:
+        _learned_cache["key"] = key
+        _learned_cache["times"] = times
+    return times
+
+
+def record_observed_update(name, update_time):
+    """把检测到的一次策略更新（页面上的 'YYYY-MM-DD HH:MM'）追加到 poll_history.json"""
+    record_observed_updates([(name, update_time)])
+
+
+def record_observed_updates(observations):
+    """批量追加 [(name, update_time), ...]，只读写一次 poll_history.json"""
+    obs = [(_norm_name(n), t) for n, t in observations or []]
+    obs = [(n, t) for n, t in obs if n and _parse_update_time(t)]
+    if not obs:
+        return
+    with _history_lock:
+        data = _load_history()
+        changed = False
+        for name, update_time in obs:
+            lst = data.get(name) or []
+            if update_time in lst:
+                continue
+            lst.append(update_time)
+            data[name] = sorted(lst)[-MAX_HISTORY_PER_STRATEGY:]
+            changed = True
+        if not changed:
+            return
+        tmp = POLL_HISTORY_FILE + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, POLL_HISTORY_FILE)
+        except Exception as e:
+            print(f"[poll_cadence] 保存更新历史失败: {e}", flush=True)
+
+
+def _seconds_of_day(dt):
+    return dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1e6
+
+
+class PollCadence:
+    """
+    单个批次任务的轮询节奏控制器。
+
+    用法（见 yunfei_connect_follow.fetch_and_check_batch_with_trade_plan）：
+        cadence = PollCadence(batch_no)
+        cadence.record_request()                    # 每次抓取页面
+        cadence.watch(name)                         # 仍在等待更新的策略
+        cadence.record_detection(name, s['time'])  # 检测到当日更新
+        time.sleep(cadence.next_interval())         # 正常轮询间隔
+        time.sleep(cadence.error_interval())        # 异常后的间隔
+        cadence.finish()                            # 批次结束，写更新历史与指标
+    """
+
+    def __init__(self, batch_no, learned_times=None, now_func=None):
+        self.batch_no = batch_no
+        self._now = now_func or datetime.now
+        self.learned = learned_times if learned_times is not None else load_learned_update_times()
+        self.started_at = self._now()
+        self.requests = 0
+        self.fast_requests = 0
+        self.errors = 0
+        self.detections = []
+        self._pending = set()
+        self._slow_streak = 0
+        self._in_window = False
+        self._observed = []     # 待写入 poll_history.json 的 (name, update_time)，批次结束时一次写入
+
+    # ---------- 记录 ----------
+    def record_request(self):
+        self.requests += 1
+        if self._in_window:
+            self.fast_requests += 1
+
+    def watch(self, name):
+        name = _norm_name(name)
+        if name:
+            self._pending.add(name)
+
+    def record_detection(self, name, update_time):
+        """检测到策略已更新；延迟 = 检测时刻 - 页面标注的更新时刻（分钟精度）"""
+        name = _norm_name(name)
+        self._pending.discard(name)
+        now = self._now()
+        delay = None
+        parsed = _parse_update_time(update_time)
+        if parsed and parsed[0] == now.strftime("%Y-%m-%d"):
+            delay = round(_seconds_of_day(now) - parsed[1], 3)
+        self.detections.append({
+            "name": name,
+            "update_time": update_time,
+            "detected_at": now.isoformat(timespec="milliseconds"),
+            "delay_seconds": delay,
+            "requests_so_far": self.requests,
+        })
+        # 检测路径上不写文件（紧接着要生成草稿、下单），finish() / flush_observations() 时再落盘
+        self._observed.append((name, update_time))
+
+    def flush_observations(self):
+        obs, self._observed = self._observed, []
+        record_observed_updates(obs)
+
+    # ---------- 节奏 ----------
+    def _windows(self):
+        names = self._pending
+        for name, secs in self.learned.items():
+            if names and not any(name.endswith(p) or p.endswith(name) for p in names):
+                continue
+            for sec in secs:
+                yield sec - WINDOW_LEAD_SECONDS, sec + 60 + WINDOW_LAG_SECONDS
+
+    def next_interval(self):
+        """返回下一次抓取前应等待的秒数"""
+        now_sec = _seconds_of_day(self._now())
+        next_start = None
+        for start, end in self._windows():
+            if start <= now_sec <= end:
+                self._in_window = True
+                self._slow_streak = 0
+                return FAST_INTERVAL
+            if start > now_sec and (next_start is None or start < next_start):
+                next_start = start
+
+        self._in_window = False
+        if next_start is None:
+            # 没有可期待的学习窗口（冷启动 / 无历史的策略 / 今日窗口已过）：保持原固定节奏，不退避
+            self._slow_streak = 0
+            return SLOW_INTERVAL
+        interval = min(SLOW_INTERVAL * (BACKOFF_FACTOR ** self._slow_streak), MAX_INTERVAL)
+        self._slow_streak += 1
+        # 不要睡过下一个窗口的起点
+        return min(interval, max(next_start - now_sec, FAST_INTERVAL))
+
+    def error_interval(self):
+        self.errors += 1
+        self._slow_streak = 0
+        return FAST_INTERVAL if self._in_window else ERROR_INTERVAL
+
+    # ---------- 指标 ----------
+    def summary(self):
+        delays = [d["delay_seconds"] for d in self.detections if d["delay_seconds"] is not None]
+        return {
+            "batch_no": self.batch_no,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": self._now().isoformat(timespec="seconds"),
+            "requests": self.requests,
+            "fast_requests": self.fast_requests,
+            "errors": self.errors,
+            "detections": self.detections,
+            "avg_delay_seconds": round(sum(delays) / len(delays), 3) if delays else None,
+            "max_delay_seconds": max(delays) if delays else None,
+        }
+
+    def finish(self):
+        self.flush_observations()
+        s = self.summary()
+        print(f"[poll_cadence] 批次{self.batch_no} 请求数={s['requests']} (快速={s['fast_requests']}) "
+              f"平均检测延迟={s['avg_delay_seconds']}s 最大={s['max_delay_seconds']}s", flush=True)
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            path = os.path.join(METRICS_DIR, f"poll_metrics_{self.started_at.strftime('%Y%m%d')}.jsonl")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(s, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[poll_cadence] 写入轮询指标失败: {e}", flush=True)
+        return s
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# yunfei_ball/replay_harness.py
+# 离线回放工具：不依赖云飞网站与券商，端到端驱动 fetch_and_check_batch_with_trade_plan，
+# 测量“策略页面更新 -> 委托提交”的延迟，并按阶段拆分：
+#   detection    页面更新 -> 发起看到更新的那次抓取（轮询等待）
+#   parse        抓取开始 -> 页面解析完成（含 HTTP）
+#   draft        解析完成 -> 草稿生成
+#   final_plan   草稿 -> 最终交易计划生成
+#   order_submit 最终计划 -> 第一笔委托提交（SimTrader）
+#
+# 组成：
+#   - ReplayServer：本地 HTTP 服务，提供 /F2/login.aspx（表单 + 登录）与 /F2/b_follow.aspx，
+#     b_follow 页面按时间线切换（来源：fetch_cache/archive 归档或一组 html 文件），页面中的录制日期替换为今天
+#   - SimTrader / SimXtData：模拟资金、持仓、委托与行情
+#   - 通过 yunfei_connect_follow.STAGE_HOOK 记录各阶段时间点
+#
+# 用法（需在装有 xtquant 的环境运行；不会连接 QMT）：
+#   python -m yunfei_ball.replay_harness --day 20251103 --batch 2 --speed 10
+#   python -m yunfei_ball.replay_harness --html a.html b.html --interval 30 --batch 1
+
+import os
+import re
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOGIN_FORM_HTML = """<html><body><form method="post" action="login.aspx">
+<input type="hidden" name="__VIEWSTATE" value="replay" />
+<input type="hidden" name="__EVENTVALIDATION" value="replay" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" value="replay" />
+<input name="txt_name_2020_byf" /><input name="txt_pwd_2020_byf" type="password" />
+</form></body></html>"""
+LOGGED_IN_HTML = "<html><body>Hi, replay <a href='#'>退出</a></body></html>"
+
+RE_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# 超时后发出停止信号，再等工作线程退出的时间（它可能正在请求回放页面或等待委托回调）
+STOP_GRACE_SECONDS = 30.0
+
+
+# ---------------- 时间线 ----------------
+class ReplayTimeline:
+    """按 (相对秒数, html) 顺序切换页面；speed > 1 表示加速回放"""
+
+    def __init__(self, pages, speed=1.0, retarget_dates=True):
+        if not pages:
+            raise ValueError("回放时间线为空")
+        self.pages = sorted(pages, key=lambda x: x[0])
+        base = self.pages[0][0]
+        self.pages = [(off - base, html) for off, html in self.pages]
+        self.speed = max(float(speed), 1e-6)
+        self.retarget_dates = retarget_dates
+        self.started_at = None
+        self.switch_times = []  # perf_counter 时刻：每个页面“发布”的时间
+        self._today = datetime.now().strftime('%Y-%m-%d')
+
+    @classmethod
+    def from_archive(cls, day=None, speed=1.0):
+        from yunfei_ball.fetch_archive import iter_pages, list_days
+        days = list_days()
+        if not days:
+            raise ValueError("fetch_cache/archive 中没有归档页面")
+        day = day or days[-1]
+        start = datetime.strptime(day, '%Y%m%d')
+        end = start.replace(hour=23, minute=59, second=59)
+        pages = []
+        for p in iter_pages(start=start, end=end):
+            ts = datetime.fromisoformat(p['ts'])
+            pages.append((ts.timestamp(), p['html'] or ''))
+        return cls(pages, speed=speed)
+
+    @classmethod
+    def from_files(cls, paths, interval=30.0, speed=1.0):
+        pages = []
+        for i, p in enumerate(paths):
+            with open(p, 'r', encoding='utf-8') as f:
+                pages.append((i * float(interval), f.read()))
+        return cls(pages, speed=speed)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.switch_times = [self.started_at + off / self.speed for off, _ in self.pages]
+
+    def _retarget(self, html):
+        if not self.retarget_dates:
+            return html
+        # 录制日期 -> 今天：只替换页面中最大的日期（即“最新操作日”），旧日期保持不变
+        dates = set(RE_DATE.findall(html))
+        if not dates:
+            return html
+        latest = max(dates)
+        return html.replace(latest, self._today)
+
+    def current_index(self):
+        if self.started_at is None:
+            return 0
+        now = time.perf_counter()
+        idx = 0
+        for i, t in enumerate(self.switch_times):
+            if t <= now:
+                idx = i
+        return idx
+
+    def current_html(self):
+        idx = self.current_index()
+        if idx == 0 and len(self.pages) > 1:
+            # 第一页视为“更新前”的基线：保留原日期，避免一开始就被识别为当日更新
+            return self.pages[0][1]
+        return self._retarget(self.pages[idx][1])
+
+    def finished(self):
+        return self.started_at is not None and time.perf_counter() >= self.switch_times[-1]
+
+
+# ---------------- HTTP 服务 ----------------
+class _ReplayHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):  # 静默
+        pass
+
+    def _send(self, html, code=200):
+        body = html.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        srv = self.server
+        if path.endswith('/F2/login.aspx'):
+            self._send(LOGIN_FORM_HTML)
+        elif path.endswith('/F2/b_follow.aspx'):
+            srv.request_times.append(time.perf_counter())
+            self._send(srv.timeline.current_html())
+        else:
+            self._send('not found', 404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self._send(LOGGED_IN_HTML)
+
+
+class ReplayServer:
+    def __init__(self, timeline, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self.httpd.timeline = timeline
+        self.httpd.request_times = []
+        self.timeline = timeline
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_times(self):
+        return self.httpd.request_times
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        self.timeline.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---------------- 模拟券商 / 行情 ----------------
+class SimXtData:
+    """替代 xtdata.get_full_tick / get_instrument_detail（含 live_quotes 的订阅接口）；价格默认 1.0，可按代码指定"""
+
+    def __init__(self, prices=None, default_price=1.0):
+        self.prices = dict(prices or {})
+        self.default_price = default_price
+        self.calls = 0
+
+    def get_full_tick(self, codes):
+        self.calls += 1
+        out = {}
+        for c in codes:
+            p = float(self.prices.get(c, self.prices.get(str(c).split('.')[0], self.default_price)))
+            out[c] = {"lastPrice": p, "bidPrice": p, "askPrice": p, "lastClose": p}
+        return out
+
+    def get_instrument_detail(self, code):
+        self.calls += 1
+        return {"InstrumentID": str(code).split('.')[0], "BoardLot": 100}
+
+    def subscribe_whole_quote(self, codes, callback=None):
+        # 不推送：live_quotes 读表缺失时回退到 get_full_tick
+        return -1
+
+    def unsubscribe_quote(self, seq):
+        pass
+
+
+class SimTrader:
+    """最小模拟交易接口：资金/持仓查询、异步/同步下单、撤单；记录每笔委托的提交时刻"""
+
+    def __init__(self, cash=1_000_000.0, positions=None):
+        self.cash = float(cash)
+        self.positions = dict(positions or {})  # code -> volume
+        self.orders = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def query_stock_asset(self, account):
+        mv = float(sum(self.positions.values()))
+        return SimpleNamespace(account_id=getattr(account, 'account_id', ''), cash=self.cash, m_dCash=self.cash,
+                               frozen_cash=0.0, m_dFrozen=0.0, market_value=mv, m_dMarketValue=mv,
+                               total_asset=self.cash + mv, m_dAsset=self.cash + mv)
+
+    def query_stock_positions(self, account):
+        return [SimpleNamespace(stock_code=c, volume=v, can_use_volume=v, m_nCanUseVolume=v,
+                                avg_price=1.0, market_value=float(v)) for c, v in self.positions.items()]
+
+    def query_stock_orders(self, account, cancelable_only=False):
+        return []
+
+    def _order(self, account, code, order_type, volume, price_type, price, remark='', *args):
+        with self._lock:
+            self._seq += 1
+            self.orders.append({"seq": self._seq, "t": time.perf_counter(), "code": code, "order_type": order_type,
+                                "volume": volume, "price": price, "remark": remark})
+            return self._seq
+
+    def order_stock_async(self, account, code, order_type, volume, price_type, price, remark='', *args):
+        return self._order(account, code, order_type, volume, price_type, price, remark)
+
+    def order_stock(self, account, code, order_type, volume, price_type, price, remark='', *args):
+        return self._order(account, code, order_type, volume, price_type, price, remark)
+
+    def cancel_order_stock(self, account, order_id):
+        return 0
+
+
+# ---------------- 驱动 ----------------
+class StageRecorder:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, t, info):
+        with self._lock:
+            self.events.append((stage, t, dict(info or {})))
+
+
+def _latency_report(recorder, server, trader):
+    switches = server.timeline.switch_times
+    events = recorder.events
+    fetch_starts = [t for st, t, _ in events if st == 'fetch_start']
+    parsed = [t for st, t, _ in events if st == 'parsed']
+    rows = []
+    for stage, t_det, info in events:
+        if stage != 'detected':
+            continue
+        name = info.get('name')
+        # 看到更新的那次抓取：t_det 之前最近的 fetch_start / parsed
+        t_fetch = max((t for t in fetch_starts if t <= t_det), default=None)
+        t_parse = max((t for t in parsed if t <= t_det), default=None)
+        # 页面“发布”时刻：该次抓取之前最近的一次页面切换（第一页为基线，不算更新）
+        t_pub = max((t for t in switches[1:] if t <= (t_fetch or t_det)), default=None)
+
+        def first(st):
+            return min((t for s, t, i in events if s == st and i.get('name') == name and t >= t_det), default=None)
+
+        t_draft, t_final = first('draft'), first('final_plan')
+        t_order = min((o['t'] for o in trader.orders if t_final and o['t'] >= t_final), default=None)
+        if t_order is None:
+            # 计划中没有可下的单：以 SELL 阶段返回时刻作为“提交完成”
+            t_order = first('sell_submitted')
+
+        def d(a, b):
+            return round((b - a) * 1000, 1) if a is not None and b is not None else None
+
+        rows.append({
+            "strategy": name,
+            "detection_ms": d(t_pub, t_fetch),
+            "parse_ms": d(t_fetch, t_parse),
+            "draft_ms": d(t_parse, t_draft),
+            "final_plan_ms": d(t_draft, t_final),
+            "order_submit_ms": d(t_final, t_order),
+            "total_ms": d(t_pub, t_order),
+        })
+    return {"requests": len(server.request_times), "orders": len(trader.orders), "strategies": rows}
+
+
+def _cfgs_present_in_timeline(timeline, cfgs):
+    """只保留在时间线最后一页能匹配到的配置，避免批次因“策略未找到”永远不结束"""
+    from yunfei_ball.yunfei_connect_follow import parse_b_follow_page
+    from yunfei_ball.strategy_index import StrategyIndex
+    idx = StrategyIndex(parse_b_follow_page(timeline.pages[-1][1]))
+    kept = [c for c in cfgs if idx.find(c)]
+    dropped = len(cfgs) - len(kept)
+    if dropped:
+        print(f"[replay] {dropped} 个策略配置在回放页面中不存在，已忽略", flush=True)
+    return kept
+
+
+def _clear_detail_cache(tpe):
+    tpe._detail_cache.clear()
+    tpe._detail_cache_day = None
+
+
+def run_replay(timeline, batch_no, batch_cfgs=None, cash=1_000_000.0, timeout=600.0, prices=None, work_dir=None):
+    """
+    启动回放服务与模拟券商，运行一次批次任务，返回延迟报告 dict。
+    会临时替换 yunfei_connect_follow 的 URL / 输出目录 / 批次状态文件，结束后恢复；
+    超时先通知批次任务停止并等待其退出，仍不退出则抛 RuntimeError，且不恢复替换。
+    batch_cfgs 为 None 时取 allocation.json 中该批次、且在回放页面中存在的策略。
+    """
+    from yunfei_ball import yunfei_connect_follow as ycf
+    from yunfei_ball import generate_trade_plan_draft as gtd
+    from yunfei_ball import poll_cadence
+    from processor import trade_plan_execution as tpe
+    from processor.trade_plan_generation import print_trade_plan
+    from utils import live_quotes
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="yunfei_replay_")
+    if batch_cfgs is None:
+        with open(ycf.INPUT_JSON, 'r', encoding='utf-8') as f:
+            batch_cfgs = [c for c in json.load(f) if int(c.get('交易批次', 0) or 0) == int(batch_no)]
+        batch_cfgs = _cfgs_present_in_timeline(timeline, batch_cfgs)
+
+    server = ReplayServer(timeline)
+    trader = SimTrader(cash=cash)
+    sim_xtdata = SimXtData(prices=prices)
+    recorder = StageRecorder()
+
+    def _draft_func(batch_no_, operation_str, ratio, sample_amount, output_dir="setting", **kw):
+        return gtd.generate_trade_plan_draft_func(batch_no_, operation_str, ratio, sample_amount,
+                                                  output_dir=os.path.join(work_dir, "setting"), **kw)
+
+    saved = {k: getattr(ycf, k) for k in ("BASE_URL", "LOGIN_URL", "TRADE_PLAN_DIR", "BATCH_STATUS_FILE", "BATCH_STATUS_DB",
+                                          "STAGE_HOOK", "generate_trade_plan_draft_func")}
+    saved_xtdata = tpe.xtdata
+    saved_quotes = (live_quotes.xtdata, live_quotes._live)
+    saved_cadence = (poll_cadence.POLL_HISTORY_FILE, poll_cadence.METRICS_DIR)
+    stop = threading.Event()
+    worker = None
+    server.start()
+    try:
+        # 回放产生的检测记录 / 指标写到工作目录，不污染真实学习数据
+        poll_cadence.POLL_HISTORY_FILE = os.path.join(work_dir, "poll_history.json")
+        poll_cadence.METRICS_DIR = os.path.join(work_dir, "poll_metrics")
+        ycf.BASE_URL = server.base_url
+        ycf.LOGIN_URL = server.base_url + "/F2/login.aspx"
+        ycf.TRADE_PLAN_DIR = os.path.join(work_dir, "trade_plan")
+        ycf.BATCH_STATUS_FILE = os.path.join(work_dir, "pending_batches.json")
+        ycf.BATCH_STATUS_DB = os.path.join(work_dir, "batch_status.db")
+        ycf.STAGE_HOOK = recorder
+        ycf.generate_trade_plan_draft_func = _draft_func
+        tpe.xtdata = sim_xtdata
+        # 取价走 live_quotes 的 tick 表：换成模拟行情支撑的独立实例，真实进程的 tick 表不受影响
+        live_quotes.xtdata = sim_xtdata
+        live_quotes._live = live_quotes.LiveQuotes()
+        # 合约信息当日缓存：回放前后都清空，模拟数据不残留到实盘进程
+        _clear_detail_cache(tpe)
+        os.makedirs(ycf.TRADE_PLAN_DIR, exist_ok=True)
+
+        account = SimpleNamespace(account_id="REPLAY")
+        config = {"account_id": "REPLAY"}
+        asset_tuple = (cash, cash, 0.0, 0.0, "100.0%", "0.0%", "0.0%")
+        worker = threading.Thread(
+            target=ycf.fetch_and_check_batch_with_trade_plan,
+            args=(batch_no, datetime.now().strftime('%H:%M:%S'), batch_cfgs, config, asset_tuple, [],
+                  print_trade_plan, trader, account),
+            kwargs={"stop_event": stop},
+            daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            print(f"[replay] 批次任务在 {timeout}s 内未结束（时间线内策略可能未全部更新），通知停止并先输出已有结果", flush=True)
+            stop.set()
+            worker.join(STOP_GRACE_SECONDS)
+    finally:
+        if worker is not None and worker.is_alive():
+            # 工作线程仍在使用被替换的 URL / 目录 / 模拟券商：不能恢复，否则它会写真实状态文件、向真实券商下单
+            raise RuntimeError(f"[replay] 批次任务在停止信号后 {STOP_GRACE_SECONDS}s 内仍未退出，"
+                               f"保留回放替换（yunfei_connect_follow / trade_plan_execution / live_quotes 仍指向沙箱），请结束进程")
+        for k, v in saved.items():
+            setattr(ycf, k, v)
+        tpe.xtdata = saved_xtdata
+        live_quotes.xtdata, live_quotes._live = saved_quotes
+        _clear_detail_cache(tpe)
+        poll_cadence.POLL_HISTORY_FILE, poll_cadence.METRICS_DIR = saved_cadence
+        server.stop()
+
+    report = _latency_report(recorder, server, trader)
+    report["work_dir"] = work_dir
+    return report
+
+
+def _print_report(report):
+    print(f"\n回放请求数: {report['requests']}，委托数: {report['orders']}，输出目录: {report['work_dir']}")
+    cols = ["detection_ms", "parse_ms", "draft_ms", "final_plan_ms", "order_submit_ms", "total_ms"]
+    print(f"{'策略':<30}" + "".join(f"{c:>16}" for c in cols))
+    for r in report["strategies"]:
+        print(f"{str(r['strategy'])[:30]:<30}" + "".join(f"{str(r[c]):>16}" for c in cols))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="云飞跟投流程离线回放与延迟拆分")
+    ap.add_argument("--day", help="回放归档中的某一天 YYYYMMDD（默认最近一天）")
+    ap.add_argument("--html", nargs="*", help="改为按顺序回放这些 html 文件")
+    ap.add_argument("--interval", type=float, default=30.0, help="--html 模式下页面切换间隔（秒）")
+    ap.add_argument("--speed", type=float, default=1.0, help="回放加速倍数")
+    ap.add_argument("--batch", type=int, required=True, help="allocation.json 中的交易批次")
+    ap.add_argument("--cash", type=float, default=1_000_000.0)
+    ap.add_argument("--timeout", type=float, default=600.0)
+    ap.add_argument("--poll-fast", type=float, help="覆盖 poll_cadence 的快速轮询间隔（秒）")
+    ap.add_argument("--poll-slow", type=float, help="覆盖 poll_cadence 的慢速轮询间隔（秒）")
+    ap.add_argument("--json", help="把报告另存为 json")
+    args = ap.parse_args()
+
+    from yunfei_ball import poll_cadence
+    if args.poll_fast:
+        poll_cadence.FAST_INTERVAL = args.poll_fast
+    if args.poll_slow:
+        poll_cadence.SLOW_INTERVAL = poll_cadence.MAX_INTERVAL = args.poll_slow
+
+    if args.html:
+        tl = ReplayTimeline.from_files(args.html, interval=args.interval, speed=args.speed)
+    else:
+        tl = ReplayTimeline.from_archive(args.day, speed=args.speed)
+    rep = run_replay(tl, args.batch, cash=args.cash, timeout=args.timeout)
+    _print_report(rep)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
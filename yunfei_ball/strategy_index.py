@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# yunfei_ball/strategy_index.py
+# 策略查找索引：每次解析页面后构建一次，替代 find_strategy_by_id_and_bracket 中
+# 对所有策略的 endswith 线性扫描与逐条正则回退。
+#
+# 匹配语义与旧逻辑完全一致（见 find_strategy_linear）：
+#   1) 第一个“名称（strip 后）以配置名称结尾”的策略
+#   2) 否则：ID 前缀（配置 ID 去掉最后一位）+ 括号内容（非空且相等）匹配的第一个策略
+# 索引结构：
+#   - 后缀表：名称的每个后缀 -> 第一个拥有该后缀的策略（O(1)）
+#   - 括号表：括号内容 -> [(网页ID, 策略), ...]（页面顺序；同一括号通常只有一两个策略）
+
+import re
+
+RE_WEB_ID = re.compile(r"L?(\d+):")
+RE_BRACKET = re.compile(r"(?:\(|（)(.*?)(?:\)|）)")
+
+
+def _bracket_content(s):
+    # 兼容中文和英文括号（与 yunfei_connect_follow.get_bracket_content 一致）
+    m = RE_BRACKET.search(s)
+    return m.group(1).strip() if m else ""
+
+
+def _strategy_name(s):
+    # 旧解析器字段为 name，新解析器/normalize 后为 title
+    return s.get('name') or s.get('title') or ''
+
+
+class StrategyIndex:
+    """对一次解析得到的策略列表建立查找索引；构建后只读，可在线程间共享。"""
+
+    __slots__ = ("strategies", "_by_suffix", "_by_bracket")
+
+    def __init__(self, strategies):
+        self.strategies = list(strategies or [])
+        by_suffix = {}
+        by_bracket = {}
+        for s in self.strategies:
+            name = _strategy_name(s)
+            full = name.strip()
+            # 所有后缀（含空串）；只保留第一个出现的策略，保持“第一个匹配”语义
+            for i in range(len(full) + 1):
+                by_suffix.setdefault(full[i:], s)
+
+            id_match = RE_WEB_ID.search(name)
+            if not id_match:
+                continue
+            bracket = _bracket_content(name)
+            if bracket:
+                by_bracket.setdefault(bracket, []).append((id_match.group(1), s))
+        self._by_suffix = by_suffix
+        self._by_bracket = by_bracket
+
+    def __len__(self):
+        return len(self.strategies)
+
+    def __iter__(self):
+        return iter(self.strategies)
+
+    def find(self, cfg):
+        json_name = cfg['策略名称'].strip()
+        s = self._by_suffix.get(json_name)
+        if s is not None:
+            return s
+
+        json_id = str(cfg.get('策略ID', '')).strip()
+        if not json_id:
+            return None
+        json_id_prefix = json_id[:-1] if len(json_id) > 1 else json_id
+        json_bracket = _bracket_content(json_name)
+        if not json_bracket:
+            return None
+        for web_id, s in self._by_bracket.get(json_bracket, ()):
+            if web_id.startswith(json_id_prefix):
+                return s
+        return None
+
+
+def find_strategy_linear(cfg, strategies):
+    """旧版线性实现（保留用于等价性校验，见 scripts/check_strategy_index.py）"""
+    json_name = cfg['策略名称'].strip()
+    json_id = str(cfg.get('策略ID', '')).strip()
+
+    for s in strategies:
+        if _strategy_name(s).strip().endswith(json_name):
+            return s
+
+    if not json_id:
+        return None
+    json_id_prefix = json_id[:-1] if len(json_id) > 1 else json_id
+    json_bracket = _bracket_content(json_name)
+
+    for s in strategies:
+        name = _strategy_name(s)
+        id_match = RE_WEB_ID.search(name)
+        if not id_match:
+            continue
+        web_id = id_match.group(1)
+        if web_id.startswith(json_id_prefix):
+            web_bracket = _bracket_content(name)
+            if json_bracket and web_bracket and json_bracket == web_bracket:
+                return s
+    return None
+
+
+# 最近一次构建的索引（按列表对象身份复用），兼容仍传入 list 的调用方
+_last_index = (None, None)
+
+
+def get_strategy_index(strategies):
+    """传入 StrategyIndex 直接返回；传入 list 时复用同一列表对象最近一次构建的索引。"""
+    global _last_index
+    if isinstance(strategies, StrategyIndex):
+        return strategies
+    src, idx = _last_index
+    if src is strategies and idx is not None and len(idx) == len(strategies):
+        return idx
+    idx = StrategyIndex(strategies)
+    _last_index = (strategies, idx)
+    return idx
@@ -4,6 +4,9 @@ import time
 from contextlib import contextmanager
 from filelock import FileLock
 
+from utils.persistence import write_json, read_json as _read_json, DURABILITY_FSYNC
+from .plan_store import get_plan_store, KIND_DRAFT, STATUS_PENDING
+
 # 配置：保证这些目录存在（相对于 yunfei_ball 文件夹）
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 TRADEPLAN_DIR = os.path.join(BASE_DIR, 'trade_plan')         # per-strategy files root (yunfei_ball/trade_plan)
@@ -13,16 +16,11 @@ os.makedirs(TRADEPLAN_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
 def atomic_write_json(path: str, obj):
-    tmp = path + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)
+    # 合并后的计划是关键文件：原子替换 + fsync
+    write_json(path, obj, durability=DURABILITY_FSYNC, label="tradeplan_merge")
 
 def read_json(path: str):
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return _read_json(path)
 
 @contextmanager
 def file_lock_for(path, timeout=10):
@@ -42,28 +40,16 @@ def file_lock_for(path, timeout=10):
 
 def list_strategy_files(batch: str = None, account_id: str = None, setting_dir=None):
     """
-    列出 trade_plan 目录下所有未处理的策略文件（可按 batch/account 过滤）
+    列出未合并的 per-strategy 草稿文件（可按 batch/account 过滤）。
+    查询 setting_dir 下计划存储的清单（yunfei_ball/plan_store.py），不扫描目录。
     注意：setting_dir 为绝对或相对路径（若 None，使用 TRADEPLAN_DIR）
     """
-    dir_to_search = setting_dir if setting_dir else TRADEPLAN_DIR
-    files = []
+    store = get_plan_store(setting_dir if setting_dir else TRADEPLAN_DIR)
     try:
-        for fn in os.listdir(dir_to_search):
-            if not fn.endswith('.json'):
-                continue
-            # 排除 final/merged 文件（文件名中包含 'final' 或 'merged'）
-            if 'final' in fn or 'merged' in fn:
-                continue
-            if fn.startswith('yunfei_trade_plan_draft_batch'):
-                if batch and f"batch{batch}" not in fn:
-                    continue
-                if account_id and account_id not in fn:
-                    continue
-                files.append(os.path.join(dir_to_search, fn))
+        entries = store.entries(KIND_DRAFT, account_id=account_id, batch_no=batch, status=STATUS_PENDING)
     except Exception:
-        pass
-    files.sort()
-    return files
+        return []
+    return sorted({e['path'] for e in entries})
 
 def mark_processed(path: str):
     basename = os.path.basename(path)
@@ -13,8 +13,13 @@ from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 from collections import defaultdict
 from requests.exceptions import SSLError
-from utils.name_code_loader import build_name_to_code_map
+from utils.symbol_table import get_symbol_table
+from utils.name_annotator import get_annotator
 from yunfei_ball.generate_trade_plan_draft import generate_trade_plan_draft_func
+from yunfei_ball.poll_cadence import PollCadence
+from yunfei_ball.strategy_index import StrategyIndex, get_strategy_index
+from yunfei_ball.plan_store import get_plan_store, KIND_FINAL
+from yunfei_ball.batch_status_store import get_batch_status_store, ANY_ACCOUNT
 from utils.asset_helpers import positions_to_dict, account_asset_to_tuple
 
 USERNAME = 'ceicei'
@@ -22,7 +27,9 @@ PASSWORD = 'ceicei628'
 LOGIN_URL = 'https://www.ycyflh.com/F2/login.aspx'
 BASE_URL = 'https://www.ycyflh.com'
 INPUT_JSON = os.path.join(os.path.dirname(__file__), "allocation.json")
+# 旧版批次状态文件，仅用于首次迁移到 BATCH_STATUS_DB
 BATCH_STATUS_FILE = os.path.join(os.path.dirname(__file__), "pending_batches.json")
+BATCH_STATUS_DB = os.path.join(os.path.dirname(__file__), "batch_status.db")
 CODE_INDEX_PATH = os.path.join(os.path.dirname(__file__), "code_index.json")
 TRADE_PLAN_DIR = os.path.join(os.path.dirname(__file__), "trade_plan")
 
@@ -31,18 +38,35 @@ HEADERS = {
 }
 
 SAMPLE_ACCOUNT_AMOUNT = 730000
-name_to_code = build_name_to_code_map(CODE_INDEX_PATH)
+
+# 策略页共享：同一进程内多个批次 / 多个账户（main.py --accounts）的轮询共用一次抓取。
+# 抓取在锁内进行（single-flight），FEED_SHARE_TTL 秒内的其他轮询直接复用解析结果；设为 0 关闭共享。
+FEED_SHARE_TTL = float(os.getenv("YUNFEI_FEED_SHARE_TTL", "0.5"))
+_feed_lock = threading.Lock()
+_feed_cache = {"ts": 0.0, "strategies": None}
+
+# 可选阶段回调：replay_harness 等工具设置后，可记录“检测/解析/草稿/最终计划/下单”各阶段时间点
+STAGE_HOOK = None
+
+
+def _mark_stage(stage, **info):
+    hook = STAGE_HOOK
+    if hook is None:
+        return
+    try:
+        hook(stage, time.perf_counter(), info)
+    except Exception:
+        pass
+# 进程内共享符号表的 name->code（保留模块级名称以兼容外部导入；循环内每次取最新）
+name_to_code = get_symbol_table().name_to_code
 
 def add_code_to_operation(operation_text, name_to_code):
-    def repl(m):
-        action = m.group(1)
-        asset = m.group(2)
-        code = name_to_code.get(asset)
-        if code:
-            return f"{action} {asset}({code})"
-        else:
-            return f"{action} {asset}"
-    return re.sub(r'(买入|卖出|调仓|换入|换出)\s*([^\s;\uff1b\uff0c,.]+)', repl, operation_text)
+    """
+    为操作文本中的名称补充代码：'买入 黄金ETF 20%' -> '买入 黄金ETF(518880.SH) 20%'。
+    使用 utils.name_annotator 的预编译 Aho–Corasick 自动机（基于 utils.symbol_table，
+    name_to_code 中的条目优先），一次线性扫描完成；来源文件变化后自动重建。
+    """
+    return get_annotator(name_to_code).annotate(operation_text)
 
 
 def handle_trade_operation(op_block_html, name_to_code, batch_no, ratio, sample_amount):
@@ -128,9 +152,21 @@ def _is_draft_for_trade_date(draft_path: str, trade_date: str) -> bool:
 # ------------------- 新增结束 -------------------
 
 
+def _stopped(stop_event):
+    return stop_event is not None and stop_event.is_set()
+
+
+def _pause(stop_event, seconds):
+    """可被 stop_event 打断的 sleep"""
+    if stop_event is None:
+        time.sleep(seconds)
+    else:
+        stop_event.wait(seconds)
+
+
 def fetch_and_check_batch_with_trade_plan(
     batch_no, batch_time, batch_cfgs, config, account_asset_info, positions,
-    generate_trade_plan_final_func, xt_trader, account
+    generate_trade_plan_final_func, xt_trader, account, stop_event=None
 ):
     """
     批次任务主逻辑：
@@ -138,6 +174,7 @@ def fetch_and_check_batch_with_trade_plan(
     - 对满足条件（date >= today 且 操作为买卖）的策略生成 draft
     - 使用实时持仓/资金（优先）或传入 snapshot 生成最终 trade_plan 并保存到 TRADE_PLAN_DIR
     - 可选：自动执行（先卖后买）
+    stop_event（threading.Event，可选）：置位后在下一次等待/轮询处退出（replay_harness 超时收尾用）
     """
     print(f"批次{batch_no}任务已启动, 目标时间: {batch_time}, 当前时间: {datetime.now()}, 策略数: {len(batch_cfgs)}", flush=True)
 
@@ -147,19 +184,23 @@ def fetch_and_check_batch_with_trade_plan(
     max_retries = 10
     retry_count = 0
 
-    batch_status_at_start = load_batch_status()
-    if batch_status_at_start.get(str(batch_no)):
+    status_account = _status_account_id(account, config)
+    if _batch_store().is_done(today_str, status_account, batch_no):
         print(f"批次{batch_no}今日已执行，跳过。", flush=True)
         return
 
     # --- 新增去重字典 ---
     processed_strategy_keys = set()
+    # 自适应轮询：预计更新窗口内快速轮询，窗口外退避
+    cadence = PollCadence(batch_no)
 
     while session is None and retry_count < max_retries:
+        if _stopped(stop_event):
+            return
         session = login()
         if session is None:
             print(f"无法登录，{15}秒后重试 ({retry_count + 1}/{max_retries})", flush=True)
-            time.sleep(15)
+            _pause(stop_event, 15)
             retry_count += 1
 
     if session is None:
@@ -167,26 +208,31 @@ def fetch_and_check_batch_with_trade_plan(
         return
 
     while True:
+        if _stopped(stop_event):
+            print(f"批次{batch_no}任务收到停止信号，退出。", flush=True)
+            cadence.flush_observations()
+            return
         try:
-            resp = session.get(BASE_URL + '/F2/b_follow.aspx', headers=HEADERS, timeout=10, proxies={})
-            resp.encoding = resp.apparent_encoding
+            cadence.record_request()
+            _mark_stage('fetch_start', batch_no=batch_no)
+            strategies = _fetch_follow_strategies(session)
 
-            if not is_logged_in(resp.text):
+            if strategies is None:
                 print("登录失效，重新登录...", flush=True)
                 session = None
-                while session is None:
+                while session is None and not _stopped(stop_event):
                     session = login()
                     if session is None:
                         print("无法登录，15秒后重试", flush=True)
-                        time.sleep(15)
+                        _pause(stop_event, 15)
                 continue
 
-            strategies = parse_b_follow_page(resp.text)
+            strategy_index = StrategyIndex(strategies)
+            _mark_stage('parsed', batch_no=batch_no)
             all_cfgs_checked = True
-            time.sleep(5)
 
             for cfg in batch_cfgs:
-                s = find_strategy_by_id_and_bracket(cfg, strategies)
+                s = find_strategy_by_id_and_bracket(cfg, strategy_index)
                 if not s:
                     print(f"策略【{cfg['策略名称']}】未找到！", flush=True)
                     all_cfgs_checked = False
@@ -205,14 +251,17 @@ def fetch_and_check_batch_with_trade_plan(
                 # 只有第一次满足条件才处理
                 if strategy_date >= today_date and strategy_key not in processed_strategy_keys:
                     print(f"策略【{s['name']}】 操作日期: {s['date']} >= 今日日期: {today_str}", flush=True)
+                    cadence.record_detection(s['name'], s['time'])
+                    _mark_stage('detected', batch_no=batch_no, name=s['name'])
                     action = extract_operation_action(s['operation_block'])
                     if action == '买卖':
                         config_amount = cfg.get('配置仓位', 0)
                         sample_amount = round(config_amount * SAMPLE_ACCOUNT_AMOUNT, 2)
 
                         print(f"\n>>> 策略【{s['name']}】 操作时间: {s['time']}", flush=True)
-                        draft_plan_file_path = handle_trade_operation(s['operation_block'], name_to_code, batch_no,
+                        draft_plan_file_path = handle_trade_operation(s['operation_block'], get_symbol_table().name_to_code, batch_no,
                                                                       config_amount, sample_amount)
+                        _mark_stage('draft', batch_no=batch_no, name=s['name'])
                         print(f"配置仓位: {config_amount}，样板操作金额: {sample_amount}", flush=True)
                         print("当前持仓:")
                         for h in s['holding_block']:
@@ -280,6 +329,7 @@ def fetch_and_check_batch_with_trade_plan(
                             continue
 
                         print("生成最终交易计划完毕:", flush=True)
+                        _mark_stage('final_plan', batch_no=batch_no, name=s['name'])
 
                         # ====== 自动执行：改为先卖出再买入（确保卖单被提交并释放资金） ======
                         try:
@@ -293,16 +343,25 @@ def fetch_and_check_batch_with_trade_plan(
                         # 打印计划，方便核验
                         print(f"将要执行的最终交易计划: {json.dumps(trade_plan, ensure_ascii=False)}", flush=True)
 
+                        # 最终计划同时登记到内容寻址存储（按账户/批次/日期/策略可查，相同内容不重复保存）
+                        try:
+                            get_plan_store(os.path.join(TRADE_PLAN_DIR, "store")).put(
+                                trade_plan, KIND_FINAL, account_id=account_id_str, batch_no=batch_no,
+                                plan_date=trade_date, strategy_id=cfg.get('策略ID') or s['name'])
+                        except Exception as e_store:
+                            print(f"登记最终交易计划失败: {e_store}", flush=True)
+
                         try:
                             from processor.trade_plan_execution import execute_trade_plan
 
                             # ===== 卖出阶段 =====
                             print("开始执行 SELL 阶段（会提交卖单）...", flush=True)
                             execute_trade_plan(xt_trader, account, trade_plan, action='sell')
+                            _mark_stage('sell_submitted', batch_no=batch_no, name=s['name'])
                             print("SELL 阶段已发出委托（异步），等待回调并刷新账户...", flush=True)
 
                             # 等待一段时间让异步委托回调到来并稍作缓冲
-                            time.sleep(10.0)
+                            _pause(stop_event, 10.0)
 
                             # 刷新实时账户/持仓，获取卖出回笼后的可用资金与可售数量
                             try:
@@ -318,6 +377,7 @@ def fetch_and_check_batch_with_trade_plan(
                             # ===== 买入阶段 =====
                             print("开始执行 BUY 阶段（会提交买单）...", flush=True)
                             execute_trade_plan(xt_trader, account, trade_plan, action='buy')
+                            _mark_stage('buy_submitted', batch_no=batch_no, name=s['name'])
                             print("BUY 阶段已发出委托（异步）。", flush=True)
 
                         except Exception as e_exec:
@@ -332,35 +392,60 @@ def fetch_and_check_batch_with_trade_plan(
                     continue
                 else:
                     all_cfgs_checked = False
+                    cadence.watch(s['name'])
                     print(f"策略【{s['name']}】日期: {s['date']} < 今日日期: {today_str}，尚未更新...", flush=True)
 
             if all_cfgs_checked:
                 print(f"批次{batch_no}所有策略信息已更新到今日或未来，任务完成。", flush=True)
-                batch_status = load_batch_status()
-                batch_status[str(batch_no)] = True
-                save_batch_status(batch_status)
+                try:
+                    if not _batch_store().mark_done(today_str, status_account, batch_no):
+                        print(f"批次{batch_no}状态已被其他进程标记为完成", flush=True)
+                except Exception as e:
+                    print(f"保存批次状态失败: {e}", flush=True)
+                cadence.finish()
                 break
 
-            print("本批次部分策略还未更新到今日或未来，20秒后重试", flush=True)
-            time.sleep(20)
+            wait_seconds = cadence.next_interval()
+            print(f"本批次部分策略还未更新到今日或未来，{wait_seconds:.1f}秒后重试", flush=True)
+            _pause(stop_event, wait_seconds)
 
         except SSLError as e:
             print("遇到SSL错误:", e, flush=True)
             kill_and_reset_geph()
-            time.sleep(15)
+            _pause(stop_event, 15)
             session = None
-            while session is None:
+            while session is None and not _stopped(stop_event):
                 session = login()
                 if session is None:
                     print("无法登录，15秒后重试", flush=True)
-                    time.sleep(15)
+                    _pause(stop_event, 15)
         except Exception as e:
             print("抓取异常", e, flush=True)
-            print("30秒后重试", flush=True)
-            time.sleep(30)
+            wait_seconds = cadence.error_interval()
+            print(f"{wait_seconds:.1f}秒后重试", flush=True)
+            _pause(stop_event, wait_seconds)
 
 
 # ----------------- 以下为辅助函数，保持原样 -----------------
+def _fetch_follow_strategies(session):
+    """
+    抓取并解析策略页；未登录返回 None。
+    进程内共享：FEED_SHARE_TTL 秒内已有其他轮询抓到的结果则直接复用（等待中的轮询拿到的是刚抓取的结果）。
+    """
+    with _feed_lock:
+        cached = _feed_cache["strategies"]
+        if cached is not None and time.monotonic() - _feed_cache["ts"] < FEED_SHARE_TTL:
+            return cached
+        resp = session.get(BASE_URL + '/F2/b_follow.aspx', headers=HEADERS, timeout=10, proxies={})
+        resp.encoding = resp.apparent_encoding
+        if not is_logged_in(resp.text):
+            return None
+        strategies = parse_b_follow_page(resp.text)
+        _feed_cache["strategies"] = strategies
+        _feed_cache["ts"] = time.monotonic()
+        return strategies
+
+
 def get_value_by_name(soup, name):
     tag = soup.find('input', {'name': name})
     return tag['value'] if tag else ''
@@ -493,66 +578,46 @@ def get_bracket_content(s):
 
 
 # 【最终修正】策略查找逻辑 - 优先使用 endswith，次要使用 ID+括号 匹配
+# 实现见 yunfei_ball/strategy_index.py：每页构建一次索引，查找为 O(1)，语义与原线性扫描一致
 def find_strategy_by_id_and_bracket(cfg, strategies):
-    json_name = cfg['策略名称'].strip()  # 确保配置名称没有意外的空格
-    json_id = str(cfg.get('策略ID', '')).strip()
-
-    # 1. 最可靠的方法：尝试使用策略名称尾部进行灵活匹配 (忽略ID前缀和空格差异)
-    for s in strategies:
-        web_full_name = s['name'].strip()
-
-        # 只要网页策略名称的结尾部分与配置中的名称完全一致，就认为是匹配成功
-        if web_full_name.endswith(json_name):
-            return s
-
-    # 2. 回退到旧版逻辑：使用 ID 前缀和括号内容进行匹配
-    if not json_id:
-        return None
+    """
+    strategies 可以是 StrategyIndex（推荐：每次解析页面后构建一次），
+    也可以是策略 list（会复用同一 list 最近一次构建的索引）。
+    """
+    return get_strategy_index(strategies).find(cfg)
 
-    # ID 匹配：匹配除了最后一位数字之外的 ID 前缀（旧版逻辑）
-    json_id_prefix = json_id[:-1] if len(json_id) > 1 else json_id
-    json_bracket = get_bracket_content(json_name)
 
-    for s in strategies:
-        # 从网页名称中提取 ID，例如 L105181:
-        id_match = re.search(r"L?(\d+):", s['name'])
-        if not id_match:
-            continue
-        web_id = id_match.group(1)
+# ------------- 批次状态存取 -------------
+# 状态保存在 SQLite（yunfei_ball/batch_status_store.py），按 (日期, 账户, 批次) 单行读写；
+# 下面两个函数保留旧的“整天字典”接口，供外部脚本使用。
+def _batch_store():
+    return get_batch_status_store(BATCH_STATUS_DB, legacy_json_path=BATCH_STATUS_FILE)
 
-        # 匹配 ID 前缀
-        if web_id.startswith(json_id_prefix):
-            # 匹配括号内容
-            web_bracket = get_bracket_content(s['name'])
 
-            # 只有当括号内容都存在且相等时，才视为匹配成功
-            if json_bracket and web_bracket and json_bracket == web_bracket:
-                return s
-    return None
+def _status_account_id(account=None, config=None):
+    if account is not None and hasattr(account, "account_id"):
+        return str(getattr(account, "account_id"))
+    if config and config.get('account_id'):
+        return str(config.get('account_id'))
+    return ANY_ACCOUNT
 
 
-# ------------- 批次状态存取 -------------
-def load_batch_status():
+def load_batch_status(account_id=ANY_ACCOUNT):
     today = datetime.now().strftime("%Y-%m-%d")
     try:
-        with open(BATCH_STATUS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data.get(today, {})
+        day = _batch_store().get_day(today, account_id)
+        return {k: True for k, v in day.items() if v == "done"}
     except Exception:
         return {}
 
 
-def save_batch_status(batch_status):
+def save_batch_status(batch_status, account_id=ANY_ACCOUNT):
     today = datetime.now().strftime("%Y-%m-%d")
     try:
-        if os.path.exists(BATCH_STATUS_FILE):
-            with open(BATCH_STATUS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = {}
-        data[today] = batch_status
-        with open(BATCH_STATUS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        store = _batch_store()
+        for batch_no, done in (batch_status or {}).items():
+            if done:
+                store.mark_done(today, account_id, batch_no)
     except Exception as e:
         print(f"保存批次状态失败: {e}", flush=True)
 
@@ -15,6 +15,7 @@ import requests
 
 from .yunfei_login import login, BASE_URL, HEADERS, FOLLOW_URL, LOGIN_URL, is_logged_in
 from .parse_b_follow_page import parse_b_follow_page
+from .fetch_archive import append_page
 
 # New: helper for saving fetch artifacts
 def _ensure_cache_dir():
@@ -24,23 +25,17 @@ def _ensure_cache_dir():
 
 def _save_fetch_artifacts(html: str, items: Optional[list], ts_iso: str, logged_in: bool = False):
     """
-    Save raw html and parsed items to yunfei_ball/fetch_cache/
-    filenames:
-      - html_{ts}.html
-      - items_{ts}.json   (if items provided)
-    Additionally:
+    Save raw html and parsed items:
+      - appended to the rolling archive yunfei_ball/fetch_cache/archive/ (see fetch_archive.py):
+        daily gzip segment + time/hash index, identical pages stored once, old days pruned
       - if logged_in is True, update latest_html.html and latest_items.json (canonical)
       - if logged_in is False, write latest_html_login.html (so we don't overwrite canonical latest with login page)
     """
     base = _ensure_cache_dir()
-    # sanitize ts for filename (use ISO compact)
-    tsfn = ts_iso.replace(":", "").replace("-", "").replace("T", "_")
-    html_path = os.path.join(base, f"html_{tsfn}.html")
     try:
-        with open(html_path, "w", encoding="utf-8") as fh:
-            fh.write(html)
-    except Exception:
-        pass
+        append_page(html, items, ts_iso, logged_in=logged_in)
+    except Exception as e:
+        print(f"[yunfei_fetcher] archive append failed: {e}", flush=True)
 
     # choose latest filename depending on login state
     try:
@@ -54,12 +49,6 @@ def _save_fetch_artifacts(html: str, items: Optional[list], ts_iso: str, logged_
         pass
 
     if items is not None:
-        items_path = os.path.join(base, f"items_{tsfn}.json")
-        try:
-            with open(items_path, "w", encoding="utf-8") as fi:
-                json.dump(items, fi, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
         try:
             # only update canonical latest_items.json when logged_in
             latest_items_name = "latest_items.json" if logged_in else "latest_items_login.json"
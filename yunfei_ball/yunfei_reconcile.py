@@ -9,7 +9,7 @@ from .yunfei_fetcher import fetch_b_follow, parse_b_follow_page
 from .yunfei_login import login, is_logged_in, BASE_URL
 from collections import defaultdict
 from datetime import datetime
-from utils.name_code_loader import build_name_to_code_map
+from utils.symbol_table import get_symbol_table
 # 重用原来的 name->code 映射加载逻辑（从 code_index.json）
 CODE_INDEX_PATH = os.path.join(os.path.dirname(__file__), "code_index.json")
 
@@ -121,8 +121,8 @@ def reconcile_account(account: Any,
     strategies = fetch_result.get('strategies', [])
     fetched_at = fetch_result.get('fetched_at_iso', None)
 
-    # 2) 构造 name->code 映射
-    name_to_code = build_name_to_code_map(CODE_INDEX_PATH)
+    # 2) name->code 映射（进程内共享符号表）
+    name_to_code = get_symbol_table().name_to_code
 
     # 3) 获取账户持仓快照（尽量标准化成 code -> { qty, mkt_value, percent } 形式）
     account_holdings = {}